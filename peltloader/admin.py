@@ -1,7 +1,98 @@
 # Register your models here.
 from django.contrib import admin
-from .models import CarData
+from django.db.models import OuterRef, Subquery
+from . import ingest
+from .forms import CarDataAdminForm
+from .models import BackfillCheckpoint, CarData, CarDataVersion, ColdBody, ColourBaseline, ColourSequence, DriftAlarm, JournalEntry, MeasurementSession, RawUpload, RawUploadEntry, SpecLimit, ThroughputDaily, cars_ago
 
 @admin.register(CarData)
 class CarDataAdmin(admin.ModelAdmin):
+    form = CarDataAdminForm
     list_display = ('body_no', 'date', 'latest', 'primer', 'colour_code')
+
+    def get_queryset(self, request):
+        # The colour's last sequence number in the same query, instead of one query per listed body
+        last = ColourSequence.objects.filter(colour_code=OuterRef('colour_code')).values('last')[:1]
+        return super().get_queryset(request).annotate(colour_last=Subquery(last))
+
+    @admin.display(description='latest')
+    def latest(self, obj):
+        return cars_ago(obj.colour_last - obj.sequence + 1) if obj.colour_last and obj.sequence else ''
+
+    # Edits and deletions keep the derived state in step, like uploads (see ingest.py)
+    def save_model(self, request, obj, form, change):
+        ingest.store_edit(obj)
+
+    def delete_model(self, request, obj):
+        ingest.delete_car(obj)
+
+    def delete_queryset(self, request, queryset):
+        for car in queryset:
+            ingest.delete_car(car)
+
+@admin.register(CarDataVersion)
+class CarDataVersionAdmin(admin.ModelAdmin):
+    list_display = ('car', 'version', 'colour_code', 'measured_at', 'superseded_at')
+
+@admin.register(DriftAlarm)
+class DriftAlarmAdmin(admin.ModelAdmin):
+    list_display = ('raised_at', 'body_no', 'date', 'colour_code', 'point', 'layer', 'kind', 'value', 'target_mean', 'acknowledged')
+    list_filter = ('acknowledged', 'kind', 'colour_code')
+    list_editable = ('acknowledged',)
+
+@admin.register(SpecLimit)
+class SpecLimitAdmin(admin.ModelAdmin):
+    list_display = ('colour_code', 'point', 'layer', 'lsl', 'usl')
+    list_filter = ('layer', 'colour_code')
+
+@admin.register(RawUpload)
+class RawUploadAdmin(admin.ModelAdmin):
+    list_display = ('digest', 'compression', 'size', 'stored_size', 'created_at')
+
+@admin.register(RawUploadEntry)
+class RawUploadEntryAdmin(admin.ModelAdmin):
+    list_display = ('body_no', 'date', 'filename', 'raw', 'uploaded_at')
+    search_fields = ('body_no', 'raw__digest')
+
+@admin.register(MeasurementSession)
+class MeasurementSessionAdmin(admin.ModelAdmin):
+    list_display = ('car', 'gauge', 'operator', 'job', 'started_at', 'finished_at', 'points', 'active_seconds')
+    list_filter = ('gauge', 'operator')
+    exclude = ('point_offsets',)
+
+@admin.register(ThroughputDaily)
+class ThroughputDailyAdmin(admin.ModelAdmin):
+    list_display = ('day', 'gauge', 'operator', 'bodies', 'points', 'active_seconds', 'utilisation')
+    list_filter = ('gauge', 'operator')
+
+@admin.register(BackfillCheckpoint)
+class BackfillCheckpointAdmin(admin.ModelAdmin):
+    list_display = ('name', 'rows', 'last_id', 'started_at', 'updated_at', 'finished_at')
+
+@admin.register(ColdBody)
+class ColdBodyAdmin(admin.ModelAdmin):
+    list_display = ('body_no', 'date', 'colour_code', 'primer', 'archived_at')
+    search_fields = ('body_no',)
+    exclude = ('readings', 'history')
+
+@admin.register(JournalEntry)
+class JournalEntryAdmin(admin.ModelAdmin):
+    list_display = ('id', 'recorded_at', 'source', 'body_no', 'date', 'colour_code', 'sequence', 'merged')
+    list_filter = ('source', 'merged')
+    search_fields = ('body_no',)
+    exclude = ('readings', 'offsets')
+
+    # The journal is append-only
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+@admin.register(ColourBaseline)
+class ColourBaselineAdmin(admin.ModelAdmin):
+    list_display = ('colour_code', 'version', 'bodies', 'pending', 'updated_at')
+    exclude = ('median', 'spread')
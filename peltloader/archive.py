@@ -0,0 +1,85 @@
+"""
+Compressed, content-addressed archive of uploaded .prn files.
+
+Every upload is stored once under the SHA-256 of its raw bytes, compressed
+with zstd when the zstandard package is installed and gzip otherwise, and a
+RawUploadEntry records which body and date it was stored as. Re-uploading
+the same file only adds a manifest entry. The reprocess_archive command
+parses archived files again instead of asking for a re-upload.
+"""
+import gzip
+import hashlib
+import logging
+from pathlib import Path
+
+from django.conf import settings
+
+from .models import RawUpload, RawUploadEntry
+
+logger = logging.getLogger(__name__)
+
+
+def storage_root():
+    return Path(getattr(settings, 'PELTLOADER_ARCHIVE_ROOT', settings.BASE_DIR / 'uploads' / 'archive'))
+
+
+def _zstd():
+    try:
+        import zstandard
+    except ImportError:
+        return None
+    return zstandard
+
+
+def compress(content):
+    """Return (compression, compressed bytes), preferring zstd."""
+    zstandard = _zstd()
+    if zstandard is not None:
+        return RawUpload.ZSTD, zstandard.ZstdCompressor(level=19).compress(content)
+    return RawUpload.GZIP, gzip.compress(content, compresslevel=9, mtime=0)
+
+
+def decompress(compression, data):
+    if compression == RawUpload.ZSTD:
+        zstandard = _zstd()
+        if zstandard is None:
+            raise RuntimeError('zstandard is needed to read zstd-compressed archives.')
+        return zstandard.ZstdDecompressor().decompress(data)
+    return gzip.decompress(data)
+
+
+def path_for(raw):
+    return storage_root() / raw.digest[:2] / f'{raw.digest}.prn.{raw.compression}'
+
+
+def store(content):
+    """Archive raw file content unless already stored; return its RawUpload."""
+    digest = hashlib.sha256(content).hexdigest()
+    raw = RawUpload.objects.filter(digest=digest).first()
+    if raw is not None and path_for(raw).exists():
+        return raw
+
+    compression, data = compress(content)
+    if raw is None:
+        raw = RawUpload(digest=digest, compression=compression, size=len(content), stored_size=len(data))
+    else:
+        # Recorded but the file is gone: write it again
+        raw.compression, raw.stored_size = compression, len(data)
+    path = path_for(raw)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix('.tmp')
+    tmp.write_bytes(data)
+    tmp.replace(path)
+    raw.save()
+    return raw
+
+
+def record(content, car, filename=''):
+    """Archive an upload and link it to the CarData row it was stored as."""
+    raw = store(content)
+    return RawUploadEntry.objects.create(raw=raw, car=car, body_no=car.body_no, date=car.date, filename=filename)
+
+
+def read(raw):
+    """Return the original bytes of an archived file."""
+    return decompress(raw.compression, path_for(raw).read_bytes())
@@ -0,0 +1,213 @@
+"""
+Per-colour baseline profiles, and how far each body is from its baseline.
+
+Asking whether a body is normal means comparing its 516 readings with its
+colour's typical profile. ColourBaseline keeps that profile: per reading,
+the median of the colour's last PELTLOADER_BASELINE_BODIES bodies and their
+spread, the median absolute deviation scaled to a standard deviation (the
+standard deviation itself where that is 0), so a few bad bodies move
+neither. Ingest counts the bodies stored since the baseline was computed and
+computes it again from the window once PELTLOADER_BASELINE_REFRESH have
+been: one read of the colour's last bodies over the (colour_code, date)
+index, never a scan of its history. While the window is still filling, it
+does so once the bodies stored since reach a quarter of those the baseline
+has, so a new colour's baseline settles quickly without a refresh per body.
+
+Each stored body gets a BodyDeviation row: its readings in spreads from the
+baseline, the largest with the reading it was found at, and their root mean
+square. A refresh writes the deviations of the whole window again against
+the new baseline. Older bodies keep the ones they were stored with, and
+every row records the baseline version it was measured against. Comparing
+a body with its baseline is then one row, and finding a colour's worst
+bodies is a read of the (colour_code, worst) index. Archived bodies lose
+their deviations with their CarData row. The rebuild_baselines command
+computes every colour's baseline and every deviation again, e.g. for
+bodies stored before baselines were kept.
+
+Refreshes work on whole windows with numpy. The deviation of a body stored
+between refreshes is computed with the standard library, so most uploads
+do not load numpy at all.
+"""
+import itertools
+import logging
+import math
+import warnings
+
+from django.conf import settings
+from django.db.models import F
+
+from . import bulk, lines, readings, tiering
+from .models import BodyDeviation, CarData, ColourBaseline, READING_FIELDS, READING_KEYS
+
+logger = logging.getLogger(__name__)
+
+# Fewer bodies than this make no baseline
+MIN_BODIES = 5
+# Scales the median absolute deviation of normal data to its standard deviation
+MAD_SCALE = 1.4826
+# Deviations are stored clipped to this many spreads
+LIMIT = 1000.0
+# While the window fills, refresh once this share of the baseline's bodies have been stored since
+WARMUP_SHARE = 0.25
+BATCH_SIZE = 500
+
+DEVIATION_FIELDS = ['colour_code', 'date', 'baseline_version', 'deviations', 'worst', 'worst_field', 'rms']
+
+
+def window():
+    return getattr(settings, 'PELTLOADER_BASELINE_BODIES', 200)
+
+
+def refresh_every():
+    return getattr(settings, 'PELTLOADER_BASELINE_REFRESH', 20)
+
+
+def _array(packed):
+    import numpy as np
+
+    return np.array([np.nan if value is None else value for value in tiering.unpack(packed)])
+
+
+def deviations(values, median, spread):
+    """
+    Return a (bodies, readings) array of READING_FIELDS-ordered readings in
+    spreads from a baseline, NaN where a reading or the baseline is missing.
+    """
+    import numpy as np
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.clip((values - median) / np.where(spread > 0, spread, np.nan), -LIMIT, LIMIT)
+
+
+def _upsert(rows):
+    bulk.upsert_values(BodyDeviation, rows, unique_fields=['car'], update_fields=DEVIATION_FIELDS)
+
+
+def _store(bodies, devs, colour_code, version):
+    """Upsert the BodyDeviation rows of (car id, date) pairs and the rows of their deviations."""
+    import numpy as np
+
+    present = ~np.isnan(devs)
+    counts = present.sum(axis=1)
+    absolute = np.where(present, np.abs(devs), -1.0)
+    worst_at = absolute.argmax(axis=1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        rms = np.sqrt(np.where(present, devs * devs, 0.0).sum(axis=1) / counts)
+    _upsert([
+        (
+            car_id, colour_code, date, version, tiering.pack_array(row),
+            float(absolute[i, worst_at[i]]) if counts[i] else 0.0,
+            READING_FIELDS[worst_at[i]] if counts[i] else '',
+            float(rms[i]) if counts[i] else 0.0,
+        )
+        for i, ((car_id, date), row) in enumerate(zip(bodies, devs))
+    ])
+
+
+def _store_body(car, baseline):
+    """`_store` for one saved CarData, with the standard library."""
+    values = readings.to_floats([getattr(car, field) for field in READING_FIELDS])
+    devs = [
+        None if value is None or median is None or not spread else max(-LIMIT, min(LIMIT, (value - median) / spread))
+        for value, median, spread in zip(values, tiering.unpack(baseline.median), tiering.unpack(baseline.spread))
+    ]
+    present = [(abs(dev), field) for dev, field in zip(devs, READING_FIELDS) if dev is not None]
+    worst, worst_field = max(present, key=lambda item: item[0]) if present else (0.0, '')
+    rms = math.sqrt(sum(dev * dev for dev, _ in present) / len(present)) if present else 0.0
+    _upsert([(car.pk, car.colour_code, car.date, baseline.version, tiering.pack(devs), worst, worst_field, rms)])
+
+
+def refresh(colour_code):
+    """
+    Compute a colour's baseline again from its last bodies and store their
+    deviations from it. Returns the ColourBaseline, or None while the
+    colour has fewer than MIN_BODIES bodies.
+    """
+    import numpy as np
+
+    last = CarData.objects.filter(colour_code=colour_code).order_by('-date', '-id')[:window()]
+    bodies, values = readings.array(last, fields=('id', 'date'))
+    if len(bodies) < MIN_BODIES:
+        return None
+    values = values.reshape(len(bodies), len(READING_FIELDS))
+    with warnings.catch_warnings():
+        # Readings missing from every body of the window stay NaN
+        warnings.simplefilter('ignore', RuntimeWarning)
+        median = np.nanmedian(values, axis=0)
+        spread = MAD_SCALE * np.nanmedian(np.abs(values - median), axis=0)
+        spread = np.where(spread > 0, spread, np.nanstd(values, axis=0))
+
+    baseline, _ = ColourBaseline.objects.get_or_create(colour_code=colour_code, defaults={'median': b'', 'spread': b''})
+    baseline.version += 1
+    baseline.bodies = len(bodies)
+    baseline.pending = 0
+    baseline.median, baseline.spread = tiering.pack_array(median), tiering.pack_array(spread)
+    baseline.save()
+    # Measured against the baseline as stored, like the bodies that follow
+    _store(bodies, deviations(values, _array(baseline.median), _array(baseline.spread)), colour_code, baseline.version)
+    return baseline
+
+
+def due(baseline):
+    """How many bodies stored since a baseline was computed make it due for a refresh."""
+    if baseline.bodies >= window():
+        return refresh_every()
+    return max(1, min(refresh_every(), int(baseline.bodies * WARMUP_SHARE)))
+
+
+def record(car):
+    """Store the deviation of a saved CarData from its colour's baseline, refreshing the baseline when due."""
+    baseline = ColourBaseline.objects.filter(colour_code=car.colour_code).first()
+    if baseline is None and CarData.objects.filter(colour_code=car.colour_code)[:MIN_BODIES].count() < MIN_BODIES:
+        return None
+    if baseline is None or baseline.pending + 1 >= due(baseline):
+        baseline = refresh(car.colour_code)
+        if baseline is None:
+            return None
+    else:
+        ColourBaseline.objects.filter(pk=baseline.pk).update(pending=F('pending') + 1)
+    # The body may be older than the window the baseline was refreshed from
+    _store_body(car, baseline)
+    return baseline
+
+
+def profile(colour_code):
+    """
+    Return ({(point, layer): (median, spread)}, version) of a colour's
+    baseline, for readings with a spread; ({}, 0) without a baseline.
+    """
+    baseline = ColourBaseline.objects.filter(colour_code=colour_code).first()
+    if baseline is None:
+        return {}, 0
+    return {
+        (point, layer): (median, spread)
+        for (point, layer, _), median, spread in zip(READING_KEYS, tiering.unpack(baseline.median), tiering.unpack(baseline.spread))
+        if median is not None and spread
+    }, baseline.version
+
+
+@lines.atomic
+def rebuild(batch_size=BATCH_SIZE):
+    """
+    Compute every colour's baseline again, and the deviation of every hot
+    body from it. Returns the number of bodies.
+    """
+    import numpy as np
+
+    colours = sorted(set(CarData.objects.values_list('colour_code', flat=True)))
+    count = 0
+    for colour_code in colours:
+        baseline = refresh(colour_code)
+        if baseline is None:
+            BodyDeviation.objects.filter(colour_code=colour_code).delete()
+            continue
+        median, spread = _array(baseline.median), _array(baseline.spread)
+        queryset = CarData.objects.filter(colour_code=colour_code).order_by('id')
+        rows = readings.rows(queryset, fields=('id', 'date'), missing=float('nan'))
+        while batch := list(itertools.islice(rows, batch_size)):
+            values = np.array([profile for _, _, profile in batch])
+            _store([(car_id, date) for car_id, date, _ in batch], deviations(values, median, spread), colour_code, baseline.version)
+            count += len(batch)
+    ColourBaseline.objects.exclude(colour_code__in=colours).delete()
+    logger.info('Rebuilt the baselines of %d colours and %d body deviations.', len(colours), count)
+    return count
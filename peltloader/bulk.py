@@ -0,0 +1,80 @@
+"""
+Bulk INSERT ... ON CONFLICT DO UPDATE without per-value ORM compilation.
+
+bulk_create(update_conflicts=True) runs every value of every row through the
+SQL compiler. For the few hundred summary rows upserted on each ingest that
+costs about three times the database work, all of it while SQLite's write
+lock is held and every other upload waits. upsert() builds the statement
+once per model and field list and sends the rows with executemany; plain
+numeric and text values are passed through as they are, other fields still
+go through Field.pre_save and get_db_prep_save. upsert_values takes rows of
+values directly, for callers that would otherwise build instances only to
+write them.
+"""
+from django.db import connections, models, router
+from django.db.models.constants import OnConflict
+
+PLAIN_FIELDS = (models.CharField, models.IntegerField, models.FloatField, models.BooleanField)
+
+_statements = {}
+
+
+def _statement(model, connection, unique_fields, update_fields):
+    key = (model, connection.alias, tuple(unique_fields), tuple(update_fields))
+    if key not in _statements:
+        meta = model._meta
+        fields = [f for f in meta.concrete_fields if f is not meta.auto_field]
+        columns = [connection.ops.quote_name(f.column) for f in fields]
+        suffix = connection.ops.on_conflict_suffix_sql(
+            fields, OnConflict.UPDATE,
+            [meta.get_field(name).column for name in update_fields],
+            [meta.get_field(name).column for name in unique_fields],
+        )
+        sql = 'INSERT INTO %s (%s) VALUES (%s) %s' % (
+            connection.ops.quote_name(meta.db_table), ', '.join(columns), ', '.join(['%s'] * len(columns)), suffix,
+        )
+        _statements[key] = (sql, [(f, isinstance(f, PLAIN_FIELDS)) for f in fields])
+    return _statements[key]
+
+
+def upsert(model, objs, unique_fields, update_fields, using=None):
+    """Insert `objs`, updating `update_fields` of rows that clash on `unique_fields`."""
+    objs = list(objs)
+    if not objs:
+        return
+    using = using or router.db_for_write(model)
+    connection = connections[using]
+    if not connection.features.supports_update_conflicts_with_target:
+        model._base_manager.using(using).bulk_create(objs, update_conflicts=True, unique_fields=unique_fields, update_fields=update_fields)
+        return
+    sql, fields = _statement(model, connection, unique_fields, update_fields)
+    rows = [
+        [
+            getattr(obj, field.attname) if plain else field.get_db_prep_save(field.pre_save(obj, True), connection)
+            for field, plain in fields
+        ]
+        for obj in objs
+    ]
+    with connection.cursor() as cursor:
+        cursor.executemany(sql, rows)
+
+
+def upsert_values(model, rows, unique_fields, update_fields, using=None):
+    """
+    Like `upsert`, for rows of database values instead of model instances.
+
+    Each row holds a value for every concrete field but an automatic primary
+    key, in field order, so no instance has to be built for it.
+    """
+    rows = list(rows)
+    if not rows:
+        return
+    using = using or router.db_for_write(model)
+    connection = connections[using]
+    if not connection.features.supports_update_conflicts_with_target:
+        names = [f.attname for f in model._meta.concrete_fields if f is not model._meta.auto_field]
+        upsert(model, [model(**dict(zip(names, row))) for row in rows], unique_fields, update_fields, using)
+        return
+    sql, _ = _statement(model, connection, unique_fields, update_fields)
+    with connection.cursor() as cursor:
+        cursor.executemany(sql, rows)
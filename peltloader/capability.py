@@ -0,0 +1,57 @@
+"""
+Process capability (Cp/Cpk) per point from the running moments in PointStatistics.
+
+A colour's report is one query for its statistics plus the (few) spec
+limits, and is cached until the next ingest of that colour (see querycache.py).
+"""
+from . import querycache
+from .models import PointStatistics, SpecLimit
+from .routers import reports_db
+
+
+def resolve_limits(colour_code):
+    """Return a function (point, layer) -> SpecLimit or None, most specific limit first."""
+    limits = {}
+    for limit in SpecLimit.objects.using(reports_db()).filter(colour_code__in=['', colour_code]):
+        limits[(limit.colour_code, limit.point, limit.layer)] = limit
+
+    def lookup(point, layer):
+        for key in ((colour_code, point, layer), (colour_code, None, layer), ('', point, layer), ('', None, layer)):
+            if key in limits:
+                return limits[key]
+        return None
+
+    return lookup
+
+
+def indices(mean, std, lsl, usl):
+    """Return (Cp, Cpk) for the given moments and limits."""
+    if not std:
+        return None, None
+    return (usl - lsl) / (6 * std), min(usl - mean, mean - lsl) / (3 * std)
+
+
+def report(colour_code):
+    """Return the capability rows for every point and layer of a colour."""
+    return querycache.cached('capability', colour_code, (), lambda: _report(colour_code))
+
+
+def _report(colour_code):
+    limit_for = resolve_limits(colour_code)
+    rows = []
+    for stats in PointStatistics.objects.using(reports_db()).filter(colour_code=colour_code).order_by('point', 'layer'):
+        limit = limit_for(stats.point, stats.layer)
+        std = stats.std
+        cp, cpk = indices(stats.mean, std, limit.lsl, limit.usl) if limit else (None, None)
+        rows.append({
+            'point': stats.point,
+            'layer': stats.layer,
+            'count': stats.count,
+            'mean': stats.mean,
+            'std': std,
+            'lsl': limit.lsl if limit else None,
+            'usl': limit.usl if limit else None,
+            'cp': cp,
+            'cpk': cpk,
+        })
+    return rows
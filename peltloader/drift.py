@@ -0,0 +1,151 @@
+"""
+EWMA and CUSUM drift detection across consecutive bodies of the same colour.
+
+Each colour/point/layer has one PointStatistics row. Every new body updates
+it in O(1): the first `warmup` bodies only establish the target mean and
+standard deviation, after which each reading moves the EWMA and the
+two-sided CUSUM and raises a DriftAlarm when a limit is crossed. An EWMA
+alarm is raised once when the EWMA leaves its limits, not again for every
+body until it is back inside; a CUSUM starts again from 0 after its alarm.
+A re-measured body only corrects the running moments; it is not a new body
+in the sequence.
+
+Every body is checked against 516 series at once, so the defaults are set
+for the whole body rather than one series: a long warm-up, so the target
+standard deviations are not underestimated, and wide limits. On stationary
+bodies they raise an alarm about once in 250 bodies, where limits usual for
+a single chart would raise one for nearly every body.
+"""
+import logging
+
+from django.conf import settings
+
+from . import bulk
+from .models import DriftAlarm, PointStatistics
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'warmup': 100,  # bodies used to fix the target mean/std
+    'lambda': 0.2,  # EWMA weight of the newest body
+    'ewma_limit': 5.0,  # control limit in asymptotic EWMA standard deviations
+    'cusum_k': 0.75,  # CUSUM allowance, in target standard deviations
+    'cusum_h': 10.0,  # CUSUM decision interval, in target standard deviations
+}
+
+
+def get_config():
+    return {**DEFAULTS, **getattr(settings, 'PELTLOADER_DRIFT', {})}
+
+
+def _add(stats, x):
+    stats.count += 1
+    delta = x - stats.mean
+    stats.mean += delta / stats.count
+    stats.m2 += delta * (x - stats.mean)
+
+
+def _remove(stats, x):
+    if stats.count <= 1:
+        stats.count, stats.mean, stats.m2 = 0, 0.0, 0.0
+        return
+    mean = (stats.count * stats.mean - x) / (stats.count - 1)
+    stats.m2 = max(stats.m2 - (x - mean) * (x - stats.mean), 0.0)
+    stats.mean = mean
+    stats.count -= 1
+
+
+def _check(stats, x, config):
+    """Advance EWMA/CUSUM with reading x and return the alarm kinds raised."""
+    alarms = []
+    if stats.target_mean is None:
+        if stats.count >= config['warmup'] and stats.std:
+            stats.target_mean, stats.target_std = stats.mean, stats.std
+            stats.ewma = stats.mean
+        return alarms
+
+    lam = config['lambda']
+    stats.ewma = lam * x + (1 - lam) * stats.ewma
+    limit = config['ewma_limit'] * stats.target_std * (lam / (2 - lam)) ** 0.5
+    outside = abs(stats.ewma - stats.target_mean) > limit
+    if outside and not stats.ewma_alarmed:
+        alarms.append((DriftAlarm.EWMA, stats.ewma))
+    stats.ewma_alarmed = outside
+
+    z = (x - stats.target_mean) / stats.target_std
+    stats.cusum_high = max(0.0, stats.cusum_high + z - config['cusum_k'])
+    stats.cusum_low = max(0.0, stats.cusum_low - z - config['cusum_k'])
+    if stats.cusum_high > config['cusum_h']:
+        alarms.append((DriftAlarm.CUSUM_HIGH, stats.cusum_high))
+        stats.cusum_high = 0.0
+    if stats.cusum_low > config['cusum_h']:
+        alarms.append((DriftAlarm.CUSUM_LOW, stats.cusum_low))
+        stats.cusum_low = 0.0
+    return alarms
+
+
+class _States:
+    """The PointStatistics rows of one colour, loaded in one query and saved in one upsert."""
+
+    def __init__(self, colour_code):
+        self.colour_code = colour_code
+        self.rows = {(s.point, s.layer): s for s in PointStatistics.objects.filter(colour_code=colour_code)}
+
+    def get(self, point, layer):
+        stats = self.rows.get((point, layer))
+        if stats is None:
+            stats = self.rows[(point, layer)] = PointStatistics(colour_code=self.colour_code, point=point, layer=layer)
+        return stats
+
+    def save(self):
+        # Written back by the unique key; updated_at is set by its auto_now
+        bulk.upsert(
+            PointStatistics, self.rows.values(),
+            unique_fields=['colour_code', 'point', 'layer'],
+            update_fields=['count', 'mean', 'm2', 'target_mean', 'target_std', 'ewma', 'ewma_alarmed', 'cusum_high', 'cusum_low', 'updated_at'],
+        )
+
+
+def update(car, readings, previous=None):
+    """
+    Fold a stored body's (point, layer, value) readings into its colour's state.
+
+    `previous` is the (colour_code, readings) a re-measurement replaces; those
+    values are taken out of the running moments and no drift statistics are
+    advanced. Returns the DriftAlarms raised.
+    """
+    config = get_config()
+    states = _States(car.colour_code)
+    alarms = []
+
+    if previous is not None:
+        previous_colour, previous_readings = previous
+        previous_states = states if previous_colour == car.colour_code else _States(previous_colour)
+        for point, layer, x in previous_readings:
+            _remove(previous_states.get(point, layer), x)
+        if previous_states is not states:
+            previous_states.save()
+
+    for point, layer, x in readings:
+        stats = states.get(point, layer)
+        _add(stats, x)
+        if previous is None:
+            for kind, value in _check(stats, x, config):
+                alarms.append(DriftAlarm(
+                    car=car, body_no=car.body_no, date=car.date, colour_code=car.colour_code,
+                    point=point, layer=layer, kind=kind, value=value, target_mean=stats.target_mean,
+                ))
+
+    states.save()
+    if alarms:
+        DriftAlarm.objects.bulk_create(alarms)
+        logger.warning('Body %s raised %d drift alarm(s) for colour %s.', car.body_no, len(alarms), car.colour_code)
+    return alarms
+
+
+def remove(colour_code, readings):
+    """Take a deleted body's (point, layer, value) readings out of its colour's running moments."""
+    states = _States(colour_code)
+    for point, layer, x in readings:
+        _remove(states.get(point, layer), x)
+    states.save()
@@ -0,0 +1,172 @@
+"""
+Excel export of the stored measurements.
+
+The workbook is regenerated from the database instead of being read,
+changed and written back, so concurrent uploads cannot lose each other's
+rows. Writes run on one background thread and are coalesced: however many
+uploads commit while a write is running, one more write follows it. A lock
+file serialises writers across worker processes, and lets a process skip a
+write another one has already covered; each write replaces the workbook
+atomically. Each paint line (see lines.py) has a workbook of its own, next
+to the configured one with the line's name appended. openpyxl is imported
+inside the writer, so workers that never export do not pay for loading it.
+"""
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from pathlib import Path
+
+from django.conf import settings
+from django.db import connections
+from django.db.models import Max
+
+from . import lines, tiering
+from .models import CarData, ColdBody, ColourSequence, LAYERS, POINTS, READING_FIELDS, cars_ago
+from .routers import reports_db
+
+logger = logging.getLogger(__name__)
+
+HEADERS = ['Latest', 'Primer', 'URL', 'Date', 'Body No.', 'Colour Code']
+# The workbook lists every clearcoat reading, then every basecoat, then every primer
+EXPORT_FIELDS = [f'{i}{layer}' for layer in LAYERS for i in range(1, POINTS + 1)]
+# Where each EXPORT_FIELDS reading sits in READING_FIELDS order, as archived bodies are packed
+EXPORT_ORDER = [READING_FIELDS.index(field) for field in EXPORT_FIELDS]
+
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='export')
+_queue_lock = threading.Lock()
+# Lines with a write queued and not started yet
+_queued = set()
+
+
+def excel_path():
+    path = Path(getattr(settings, 'PELTLOADER_EXCEL_PATH', 'uploads/output.xlsx'))
+    line = lines.current()
+    return path if line is None else path.with_name(f'{path.stem}-{line}{path.suffix}')
+
+
+def export_enabled():
+    return getattr(settings, 'PELTLOADER_EXCEL_EXPORT', True)
+
+
+@contextmanager
+def _file_lock(path):
+    """Hold an exclusive lock on `path` across processes, yielding the open file."""
+    with open(path, 'a+b') as f:
+        if os.name == 'nt':
+            import msvcrt
+
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+            try:
+                yield f
+            finally:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            import fcntl
+
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield f
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def _cold_rows(last):
+    """Yield the workbook rows of the bodies in the cold database, skipping any still hot."""
+    newest = ColdBody.objects.aggregate(newest=Max('date'))['newest']
+    if newest is None:
+        return
+    # Bodies left in both tiers by an interrupted archive run; the hot row wins
+    hot = set(CarData.objects.using(reports_db()).filter(date__lte=newest).values_list('body_no', 'date'))
+    queryset = ColdBody.objects.order_by('car_id').values_list(
+        'sequence', 'primer', 'url', 'date', 'body_no', 'colour_code', 'readings',
+    )
+    for sequence, primer, url, date, body_no, colour_code, packed in queryset.iterator(chunk_size=2000):
+        if (body_no, date) in hot:
+            continue
+        values = tiering.unpack(packed)
+        latest = cars_ago(last[colour_code] - sequence + 1) if sequence and colour_code in last else ''
+        yield [latest, primer, url, date, body_no, colour_code] + [values[i] for i in EXPORT_ORDER]
+
+
+def rows():
+    """Yield the workbook rows of every stored body, archived ones included, in the order they were first stored."""
+    last = dict(ColourSequence.objects.using(reports_db()).values_list('colour_code', 'last'))
+    yield from _cold_rows(last)
+    queryset = CarData.objects.using(reports_db()).order_by('id').values_list(
+        'sequence', 'primer', 'url', 'date', 'body_no', 'colour_code', *EXPORT_FIELDS,
+    )
+    for sequence, primer, url, date, body_no, colour_code, *values in queryset.iterator(chunk_size=2000):
+        latest = cars_ago(last[colour_code] - sequence + 1) if sequence and colour_code in last else ''
+        yield [latest, primer, url, date, body_no, colour_code] + [float(v) if v not in (None, '') else None for v in values]
+
+
+def write_workbook(path=None, requested_at=None):
+    """
+    Regenerate the workbook from the database and atomically replace the old one.
+
+    The lock file holds the time the last write started reading the
+    database. If that is after `requested_at`, the workbook already includes
+    everything committed before then, possibly written by another process,
+    and nothing is done. Returns the number of bodies written, or None.
+    """
+    from openpyxl import Workbook
+
+    path = Path(path or excel_path())
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with _file_lock(path.with_name(f'.{path.name}.lock')) as lock:
+        lock.seek(0)
+        written_at = float(lock.read() or 0)
+        if requested_at is not None and written_at >= requested_at and path.exists():
+            logger.debug('%s is already up to date.', path)
+            return None
+
+        started_at = time.time()
+        workbook = Workbook(write_only=True)
+        sheet = workbook.create_sheet()
+        sheet.append(HEADERS + EXPORT_FIELDS)
+        count = 0
+        for row in rows():
+            sheet.append(row)
+            count += 1
+        tmp = path.with_name(f'.{path.name}.{os.getpid()}.tmp')
+        workbook.save(tmp)
+        os.replace(tmp, path)
+
+        lock.seek(0)
+        lock.truncate()
+        lock.write(repr(started_at).encode())
+        lock.flush()
+    logger.debug('Wrote %d bodies to %s.', count, path)
+    return count
+
+
+def _write_in_background():
+    with _queue_lock:
+        # Uploads committed from here on need another write
+        _queued.discard(lines.current())
+        requested_at = time.time()
+    try:
+        write_workbook(requested_at=requested_at)
+    except Exception:
+        logger.exception('Excel export failed.')
+    finally:
+        connections.close_all()
+
+
+def schedule():
+    """Regenerate the current line's workbook in the background, unless a write of it is already queued."""
+    with _queue_lock:
+        if lines.current() in _queued:
+            return
+        _queued.add(lines.current())
+    _executor.submit(lines.bound(_write_in_background))
+
+
+def drain():
+    """Wait until every scheduled write has finished."""
+    _executor.submit(lambda: None).result()
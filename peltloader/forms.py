@@ -1,10 +1,29 @@
 from django import forms
-from .models import CarData
+from . import prn, readings
+from .models import CarData, READING_FIELDS
 
-class FileUploadForm(forms.ModelForm):
+class FileUploadForm(forms.Form):
+    # A plain form rather than a ModelForm: re-measuring a body on the same
+    # date replaces its earlier row (see ingest.store_reading) instead of
+    # failing CarData's unique constraint.
+    body_no = forms.CharField(max_length=CarData._meta.get_field('body_no').max_length)
+    # Left blank, the date is taken from the file's own timestamp
+    date = forms.DateField(required=False, widget=forms.DateInput(attrs={'type': 'date'}))
+
+class CarDataAdminForm(forms.ModelForm):
+    # Readings are stored as text; only numbers may be entered, written the way the gauge writes them
     class Meta:
         model = CarData
-        fields = ['body_no', 'date']
-        widgets = {
-            'date': forms.DateInput(attrs={'type': 'date'}),
-        }
+        fields = '__all__'
+
+    def clean(self):
+        cleaned_data = super().clean()
+        for field in READING_FIELDS:
+            try:
+                value = readings.parse_reading(cleaned_data.get(field))
+            except ValueError as e:
+                self.add_error(field, str(e))
+            else:
+                if value is not None:
+                    cleaned_data[field] = prn.format_reading(value)
+        return cleaned_data
@@ -0,0 +1,212 @@
+"""
+Thickness heat-maps of a body against its colour's baseline.
+
+Each layer is drawn as a grid of the 172 points, coloured by how many
+spreads the reading is from the median of the colour's baseline (blue thin,
+red thick; see baselines.py). Images are rendered in the background after
+ingest, stored once under the SHA-256 of their content and recorded in
+HeatMap together with the version of the baseline they were drawn against.
+An image drawn against an older version is served as it is and rendered
+again in the background, so a baseline refresh never makes a request wait
+for a render; only a body without an image is rendered while the request
+waits. SVG and PNG are both produced with the standard library only.
+"""
+import hashlib
+import logging
+import struct
+import threading
+import zlib
+from xml.sax.saxutils import escape
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from django.conf import settings
+from django.db import connections
+
+from . import baselines, lines
+from .models import CarData, ColourBaseline, HeatMap, LAYERS, POINTS
+
+logger = logging.getLogger(__name__)
+
+COLUMNS = 12
+ROWS = -(-POINTS // COLUMNS)
+CELL = 12
+GAP = 24  # between layer panels
+CLIP = 3.0  # deviations beyond +-3 std share the end colour
+LAYER_NAMES = {'C': 'Clearcoat', 'B': 'Basecoat', 'P': 'Primer'}
+MISSING = (200, 200, 200)
+
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='heatmap')
+# (line, car id) of the bodies waiting for a background render
+_queued = set()
+_queue_lock = threading.Lock()
+
+
+def storage_root():
+    return Path(getattr(settings, 'PELTLOADER_HEATMAP_ROOT', settings.BASE_DIR / 'uploads' / 'heatmaps'))
+
+
+def deviations(car, reference):
+    """
+    Return {(point, layer): deviation in baseline spreads} for a body's
+    readings, leaving out readings whose spread is 0 or missing.
+    """
+    result = {}
+    for point, layer, value in car.readings():
+        median, spread = reference.get((point, layer), (None, None))
+        # NaN compares False, like 0
+        if median is not None and spread is not None and spread > 0:
+            result[(point, layer)] = (value - median) / spread
+    return result
+
+
+def colour_for(z):
+    """Map a deviation to an RGB colour: blue below, white at, red above the baseline."""
+    if z is None:
+        return MISSING
+    t = max(-1.0, min(1.0, z / CLIP))
+    fade = int(255 * (1 - abs(t)))
+    return (255, fade, fade) if t > 0 else (fade, fade, 255)
+
+
+def _cells(devs):
+    """Yield (x, y, rgb, point, layer, z) for every cell of the image."""
+    for panel, layer in enumerate(LAYERS):
+        x0 = panel * (COLUMNS * CELL + GAP)
+        for point in range(1, POINTS + 1):
+            row, col = divmod(point - 1, COLUMNS)
+            z = devs.get((point, layer))
+            yield x0 + col * CELL, row * CELL, colour_for(z), point, layer, z
+
+
+def image_size():
+    return len(LAYERS) * COLUMNS * CELL + (len(LAYERS) - 1) * GAP, ROWS * CELL
+
+
+def render_svg(car, devs):
+    width, height = image_size()
+    parts = [
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height + 16}" viewBox="0 0 {width} {height + 16}">',
+        # Body numbers and colour codes come from uploads and the admin
+        f'<title>Body {escape(car.body_no)} ({escape(car.colour_code)}) against baseline</title>',
+    ]
+    for panel, layer in enumerate(LAYERS):
+        x0 = panel * (COLUMNS * CELL + GAP)
+        parts.append(f'<text x="{x0}" y="{height + 12}" font-size="10">{escape(LAYER_NAMES[layer])}</text>')
+    for x, y, (r, g, b), point, layer, z in _cells(devs):
+        label = f'{point}{layer}: ' + (f'{z:+.2f} std' if z is not None else 'no baseline')
+        parts.append(f'<rect x="{x}" y="{y}" width="{CELL - 1}" height="{CELL - 1}" fill="#{r:02x}{g:02x}{b:02x}"><title>{escape(label)}</title></rect>')
+    parts.append('</svg>')
+    return '\n'.join(parts).encode()
+
+
+def _png_chunk(kind, data):
+    return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data) & 0xffffffff)
+
+
+def render_png(car, devs):
+    width, height = image_size()
+    pixels = [bytearray(b'\xff' * (width * 3)) for _ in range(height)]
+    for x, y, rgb, *_ in _cells(devs):
+        for dy in range(CELL - 1):
+            pixels[y + dy][x * 3:(x + CELL - 1) * 3] = bytes(rgb) * (CELL - 1)
+    raw = b''.join(b'\x00' + bytes(row) for row in pixels)
+    return (
+        b'\x89PNG\r\n\x1a\n'
+        + _png_chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0))
+        + _png_chunk(b'IDAT', zlib.compress(raw, 9))
+        + _png_chunk(b'IEND', b'')
+    )
+
+
+RENDERERS = {HeatMap.SVG: render_svg, HeatMap.PNG: render_png}
+
+
+def store(content, fmt):
+    """Write content under its SHA-256 unless already stored; return the digest."""
+    digest = hashlib.sha256(content).hexdigest()
+    path = storage_root() / digest[:2] / f'{digest}.{fmt}'
+    if not path.exists():
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix('.tmp')
+        tmp.write_bytes(content)
+        tmp.replace(path)
+    return digest
+
+
+def path_for(heatmap):
+    return storage_root() / heatmap.digest[:2] / f'{heatmap.digest}.{heatmap.format}'
+
+
+def render(car, formats=None, reference=None):
+    """
+    Render and store a body's heat-maps, returning {format: HeatMap}.
+    `reference` is a (profile, version) of `baselines.profile`, by default
+    the colour's current one.
+    """
+    reference, version = reference or baselines.profile(car.colour_code)
+    devs = deviations(car, reference)
+    result = {}
+    for fmt in formats or RENDERERS:
+        digest = store(RENDERERS[fmt](car, devs), fmt)
+        result[fmt], _ = HeatMap.objects.update_or_create(
+            car=car, format=fmt, defaults={'digest': digest, 'baseline_version': version},
+        )
+    return result
+
+
+def remove_unused(images):
+    """Delete the stored files of (digest, format) pairs that no HeatMap refers to any more."""
+    images = set(images)
+    used = set(HeatMap.objects.filter(digest__in={digest for digest, _ in images}).values_list('digest', 'format'))
+    for digest, fmt in images - used:
+        path_for(HeatMap(digest=digest, format=fmt)).unlink(missing_ok=True)
+
+
+def current(car, fmt):
+    """
+    Return a body's HeatMap in a format, rendering it if there is none and
+    scheduling it to be rendered again if the baseline has moved on.
+    """
+    heatmap = HeatMap.objects.filter(car=car, format=fmt).first()
+    if heatmap is None or not path_for(heatmap).exists():
+        return render(car, [fmt])[fmt]
+    version = ColourBaseline.objects.filter(colour_code=car.colour_code).values_list('version', flat=True).first() or 0
+    if heatmap.baseline_version != version:
+        schedule(car)
+    return heatmap
+
+
+def _render_in_background(car_id):
+    with _queue_lock:
+        _queued.discard((lines.current(), car_id))
+    try:
+        car = CarData.objects.filter(pk=car_id).first()
+        if car is not None:
+            render(car)
+    except Exception:
+        logger.exception('Heat-map rendering failed for body id %s.', car_id)
+    finally:
+        connections.close_all()
+
+
+def _submit(car_id):
+    # A body already waiting for its render is not queued twice
+    with _queue_lock:
+        if (lines.current(), car_id) in _queued:
+            return
+        _queued.add((lines.current(), car_id))
+    _executor.submit(lines.bound(_render_in_background), car_id)
+
+
+def schedule(car):
+    """Render a body's heat-maps in the background once the ingest commits."""
+    if getattr(settings, 'PELTLOADER_HEATMAP_BACKGROUND', True):
+        lines.on_commit(lambda: _submit(car.id))
+    else:
+        lines.on_commit(lambda: render(car))
+
+
+def drain():
+    """Wait until every scheduled background render has finished."""
+    _executor.submit(lambda: None).result()
@@ -0,0 +1,234 @@
+"""
+Storing parsed gauge readings in the database.
+
+Storing a body also brings what is derived from it up to date: the
+journal, the numeric copy, rollups, drift statistics, the baseline
+deviation, the report caches, the similarity index, heat-maps and the
+Excel export. Bodies edited or deleted in the admin go through store_edit
+and delete_car, so they do the same.
+"""
+import logging
+
+from django.core.exceptions import ValidationError
+from django.db.models import F
+from django.utils import timezone
+
+from . import archive, baselines, drift, export, heatmap, journal, lines, numeric, prn, querycache, readings, rollups, similarity, throughput, tiering
+from .models import CarData, CarDataVersion, ColourSequence, HeatMap, MeasurementSession, LAYERS, POINTS, READING_FIELDS
+
+logger = logging.getLogger(__name__)
+
+UPSERT_KEY = ['body_no', 'date']
+UPDATE_FIELDS = ['sequence', 'primer', 'url', 'colour_code', 'measured_at', 'missing_points', 'duplicate_points'] + READING_FIELDS
+PREVIOUS_FIELDS = ['id', 'sequence', 'primer', 'colour_code', 'measured_at'] + READING_FIELDS
+
+
+def get_url_for_colour(colour_code):
+    """Get the URL for the given colour code."""
+    urls = {
+        '8X5': 'https://myteams.toyota.com/:i:/r/sites/sTRiskManagement/Shared%20Documents/General/Kaizen/Car%20Colours/8X5.png?csf=1&web=1&e=m3Egzi',
+        '085': 'https://myteams.toyota.com/:i:/r/sites/sTRiskManagement/Shared%20Documents/General/Kaizen/Car%20Colours/85.png?csf=1&web=1&e=ANCzp4',
+        '4Y5': 'https://myteams.toyota.com/:i:/r/sites/sTRiskManagement/Shared%20Documents/General/Kaizen/Car%20Colours/4Y5.png?csf=1&web=1&e=D9VUKT',
+        '6X4': 'https://myteams.toyota.com/:i:/r/sites/sTRiskManagement/Shared%20Documents/General/Kaizen/Car%20Colours/6X4.png?csf=1&web=1&e=fORxuy',
+        '223': 'https://myteams.toyota.com/:i:/r/sites/sTRiskManagement/Shared%20Documents/General/Kaizen/Car%20Colours/223.png?csf=1&web=1&e=ViEknw',
+        '3R1': 'https://myteams.toyota.com/:i:/r/sites/sTRiskManagement/Shared%20Documents/General/Kaizen/Car%20Colours/3R1.png?csf=1&web=1&e=rW3o0j',
+        '1L2': 'https://myteams.toyota.com/:i:/r/sites/sTRiskManagement/Shared%20Documents/General/Kaizen/Car%20Colours/1L2.png?csf=1&web=1&e=BtQDQn',
+        '8Y6': 'https://myteams.toyota.com/:i:/r/sites/sTRiskManagement/Shared%20Documents/General/Kaizen/Car%20Colours/1L8.png?csf=1&web=1&e=TKqqFZ',
+        '1L8': 'https://myteams.toyota.com/:i:/r/sites/sTRiskManagement/Shared%20Documents/General/Kaizen/Car%20Colours/1L2.png?csf=1&web=1&e=BtQDQn',
+        '1L1': 'https://myteams.toyota.com/:i:/r/sites/sTRiskManagement/Shared%20Documents/General/Kaizen/Car%20Colours/1L1.png?csf=1&web=1&e=BLShcb',
+    }
+    return urls.get(colour_code, '')
+
+
+def build_car(reading, body_no, date, url):
+    """Build an unsaved CarData for a parsed reading."""
+    measured_at = reading.measured_at
+    if measured_at is not None and timezone.is_naive(measured_at):
+        measured_at = timezone.make_aware(measured_at)
+    car = CarData(
+        primer=reading.primer,
+        url=url,
+        date=date,
+        body_no=body_no,
+        colour_code=reading.colour_code,
+        measured_at=measured_at,
+        duplicate_points=list(reading.duplicates),
+    )
+    for i, values in enumerate(reading.points, start=1):
+        if values is not None:
+            for layer, value in zip(LAYERS, values):
+                setattr(car, f'{i}{layer}', prn.format_reading(value))
+    return car
+
+
+def check_readings(car):
+    """Raise ValidationError unless every reading of a CarData is empty or a decimal number."""
+    errors = {}
+    for field in READING_FIELDS:
+        try:
+            readings.parse_reading(getattr(car, field))
+        except ValueError as e:
+            errors[field] = str(e)
+    if errors:
+        raise ValidationError(errors)
+
+
+def missing_points(car):
+    """Return the points of a CarData without any reading."""
+    return [point for point in range(1, POINTS + 1) if all(getattr(car, f'{point}{layer}') in (None, '') for layer in LAYERS)]
+
+
+def next_sequence(colour_code):
+    """
+    Hand out the next sequence number of a colour.
+
+    Only that colour's counter row is written, so bodies of other colours
+    are not held up, and no other CarData row has to change.
+    """
+    ColourSequence.objects.get_or_create(colour_code=colour_code)
+    ColourSequence.objects.filter(colour_code=colour_code).update(last=F('last') + 1)
+    return ColourSequence.objects.values_list('last', flat=True).get(colour_code=colour_code)
+
+
+def snapshot(previous):
+    """Record the current values of an existing CarData row as a version."""
+    version = CarDataVersion.objects.filter(car_id=previous['id']).count() + 1
+    return CarDataVersion.objects.create(
+        car_id=previous['id'],
+        version=version,
+        primer=previous['primer'],
+        colour_code=previous['colour_code'],
+        measured_at=previous['measured_at'],
+        readings={field: previous[field] for field in READING_FIELDS},
+    )
+
+
+@lines.atomic
+def store_reading(reading, body_no, date, url='', raw=None, filename=''):
+    """
+    Insert or replace the measurement of `body_no` on `date`.
+
+    The row is written with a single INSERT ... ON CONFLICT DO UPDATE. A
+    re-measurement keeps its place in the colour sequence and the values it
+    replaces are kept as a CarDataVersion. A partial re-measurement of the
+    same colour only replaces the points it contains. A body archived to the
+    cold database is restored first and re-measured. `raw`, the uploaded
+    file's bytes, is archived and linked to the row. Returns (car, created).
+    """
+    car = build_car(reading, body_no, date, url)
+    check_readings(car)
+    replaced = None
+    merged = False
+    stored = CarData.objects.filter(body_no=body_no, date=date).values(*PREVIOUS_FIELDS)
+    previous = stored.first()
+    if previous is None and tiering.restore(body_no, date) is not None:
+        # Measured again after it was archived: back in the hot tier, it is re-measured like any other
+        previous = stored.first()
+    if previous is None or previous['colour_code'] != car.colour_code or previous['sequence'] is None:
+        car.sequence = next_sequence(car.colour_code)
+    else:
+        car.sequence = previous['sequence']
+    if previous is not None:
+        snapshot(previous)
+        replaced = (previous['colour_code'], CarData(**{field: previous[field] for field in READING_FIELDS}).readings())
+        if reading.missing and previous['colour_code'] == car.colour_code:
+            # Merge the session with the earlier one instead of losing the points it skipped
+            merged = True
+            for point in reading.missing:
+                for layer in LAYERS:
+                    setattr(car, f'{point}{layer}', previous[f'{point}{layer}'])
+            logger.info('Body %s on %s: merged %d re-measured points.', body_no, date, len(reading.points) - len(reading.missing))
+        rollups.apply(previous['colour_code'], date, replaced[1], sign=-1)
+        logger.info('Body %s on %s re-measured, previous values kept as a version.', body_no, date)
+
+    car.missing_points = missing_points(car)
+    if car.missing_points:
+        logger.warning('Body %s on %s has no readings for points %s.', body_no, date, car.missing_points)
+    journal.record(car, reading, merged)
+    CarData.objects.bulk_create([car], update_conflicts=True, unique_fields=UPSERT_KEY, update_fields=UPDATE_FIELDS)
+    if car.pk is None:
+        car.pk = CarData.objects.values_list('pk', flat=True).get(body_no=body_no, date=date)
+    numeric.store_car(car)
+    if raw is not None:
+        archive.record(raw, car, filename)
+    throughput.record(car, reading, merge=merged)
+
+    _derive(car, replaced)
+    return car, previous is None
+
+
+def _derive(car, replaced):
+    """
+    Add a saved CarData to the state derived from the stored bodies.
+    `replaced` is the (colour_code, readings) it replaces, already taken
+    out of the rollups.
+    """
+    readings = car.readings()
+    rollups.apply(car.colour_code, car.date, readings)
+    drift.update(car, readings, previous=replaced)
+    baselines.record(car)
+    querycache.bump(car.colour_code, car.date)
+    if replaced is not None and replaced[0] != car.colour_code:
+        querycache.bump(replaced[0], car.date)
+    index = similarity.index()
+    lines.on_commit(lambda: index.add(car))
+    heatmap.schedule(car)
+
+    if export.export_enabled():
+        lines.on_commit(export.schedule)
+
+
+@lines.atomic
+def store_edit(car):
+    """
+    Save a CarData edited by hand, e.g. in the admin, the way store_reading
+    stores a re-measurement: the values it replaces are kept as a version
+    and taken out of the rollups and drift statistics, and the edit is
+    journalled. A body given another colour gets the next sequence number
+    of that colour. Raises ValidationError if a reading is not a number.
+    Returns the car.
+    """
+    check_readings(car)
+    previous = CarData.objects.filter(pk=car.pk).values('date', *PREVIOUS_FIELDS).first() if car.pk else None
+    replaced = None
+    if car.sequence is None or (previous is not None and previous['colour_code'] != car.colour_code):
+        car.sequence = next_sequence(car.colour_code)
+    if previous is not None:
+        snapshot(previous)
+        replaced = (previous['colour_code'], CarData(**{field: previous[field] for field in READING_FIELDS}).readings())
+        rollups.apply(previous['colour_code'], previous['date'], replaced[1], sign=-1)
+        if previous['date'] != car.date:
+            querycache.bump(previous['colour_code'], previous['date'])
+        logger.info('Body %s on %s edited, previous values kept as a version.', car.body_no, car.date)
+
+    car.missing_points = missing_points(car)
+    journal.record(car)
+    car.save()
+    numeric.store_car(car)
+    _derive(car, replaced)
+    return car
+
+
+@lines.atomic
+def delete_car(car):
+    """
+    Delete a stored body, journalling a tombstone and taking it out of the
+    rollups, drift statistics, throughput summaries, report caches and
+    similarity index. Its colour's baseline drops it at its next refresh.
+    """
+    journal.record_deletion(car)
+    readings = car.readings()
+    rollups.apply(car.colour_code, car.date, readings, sign=-1)
+    drift.remove(car.colour_code, readings)
+    throughput.remove(MeasurementSession.objects.filter(car=car))
+    querycache.bump(car.colour_code, car.date)
+    car_id = car.pk
+    images = list(HeatMap.objects.filter(car=car).values_list('digest', 'format'))
+    car.delete()
+    index = similarity.index()
+    lines.on_commit(lambda: index.discard(car_id))
+    lines.on_commit(lambda: heatmap.remove_unused(images))
+    logger.info('Body %s on %s deleted.', car.body_no, car.date)
+
+    if export.export_enabled():
+        lines.on_commit(export.schedule)
@@ -0,0 +1,215 @@
+"""
+Append-only journal of ingested measurements, and replaying it.
+
+Most of what ingest writes is derived state: the stored body, its 'N cars
+ago' label (from the colour sequence), the numeric copy, the rollups and
+the Excel workbook. Before any of that, store_reading appends a
+JournalEntry holding the parsed reading, the sequence the body was given and
+whether its earlier values filled in missing points. The entry is written in
+the same transaction as everything else, so the journal holds exactly the
+ingests that committed. Entries are never changed or deleted; edits made in
+the admin are journalled too, deleting a body appends a tombstone entry,
+and the migration that created the journal seeded it with one entry per
+body already stored. Archiving a body is not a deletion.
+
+`replay` rebuilds derived state from the journal in one sequential pass over
+its (body_no, date, id) index. Each body's entries are folded in order, the
+way ingest applied them, a tombstone dropping what came before it, and the
+results are written in batches:
+
+- cars: CarData, CarReadings and the colour sequences. Bodies archived to
+  the cold database stay there, bodies whose last entry is a tombstone are
+  deleted, and bodies not in the journal are left alone.
+- rollups: PointRollup, from the journal alone.
+- baselines: ColourBaseline and BodyDeviation, computed again from the
+  stored bodies once the cars are (see baselines.py).
+- export: the Excel workbook, written once the rest has been committed.
+
+Drift statistics and alarms (PointStatistics, DriftAlarm) and the
+throughput summaries are not replayed: they follow the order bodies were
+measured in and the gauge sessions as they happened, which folding the
+journal body by body does not reproduce. They are left as ingest built them.
+"""
+import logging
+from collections import defaultdict, namedtuple
+
+from django.db import transaction
+
+from . import baselines, bulk, export, lines, numeric, prn, querycache, readings, rollups, throughput, tiering
+from .models import CarData, ColdBody, ColourSequence, JournalEntry, LAYERS, POINTS, READING_FIELDS
+
+logger = logging.getLogger(__name__)
+
+TARGETS = ('cars', 'rollups', 'baselines', 'export')
+BATCH_SIZE = 500
+
+ENTRY_FIELDS = ('source', 'body_no', 'date', 'url', 'colour_code', 'primer', 'measured_at', 'sequence', 'merged', 'missing', 'duplicates', 'readings')
+# A body as its journal entries leave it; `values` in READING_FIELDS order, None where missing
+Body = namedtuple('Body', ['body_no', 'date', 'url', 'colour_code', 'primer', 'measured_at', 'sequence', 'duplicates', 'values'])
+
+CAR_FIELDS = ['sequence', 'primer', 'url', 'colour_code', 'measured_at', 'missing_points', 'duplicate_points'] + READING_FIELDS
+
+
+def missing_points(values):
+    """Return the points without any reading in READING_FIELDS-ordered values."""
+    width = len(LAYERS)
+    return [point for point in range(1, POINTS + 1) if all(value is None for value in values[(point - 1) * width:point * width])]
+
+
+def record(car, reading=None, merged=False):
+    """
+    Append a journal entry for a CarData about to be stored.
+
+    With `reading`, the parsed PrnReading it was built from; without, the
+    entry records the car's own readings, e.g. after an edit in the admin.
+    """
+    if reading is None:
+        values = readings.to_floats([getattr(car, field) for field in READING_FIELDS])
+        entry = JournalEntry(source=JournalEntry.ADMIN, missing=missing_points(values), duplicates=list(car.duplicate_points))
+    else:
+        values = [value for point in reading.points for value in (point or (None,) * len(LAYERS))]
+        entry = JournalEntry(
+            gauge=reading.gauge, operator=reading.operator, job=reading.job,
+            missing=list(reading.missing), duplicates=list(reading.duplicates),
+            offsets=throughput.pack(reading.offsets) if reading.offsets else None,
+        )
+    entry.body_no, entry.date, entry.url = car.body_no, car.date, car.url
+    entry.colour_code, entry.primer, entry.measured_at, entry.sequence = car.colour_code, car.primer, car.measured_at, car.sequence
+    entry.merged = merged
+    entry.readings = tiering.pack(values)
+    entry.save()
+    return entry
+
+
+def record_deletion(car):
+    """Append a tombstone entry for a CarData about to be deleted."""
+    return JournalEntry.objects.create(
+        source=JournalEntry.DELETE, body_no=car.body_no, date=car.date, url=car.url,
+        colour_code=car.colour_code, primer=car.primer, measured_at=car.measured_at, sequence=car.sequence,
+        readings=tiering.pack(()),
+    )
+
+
+def bodies(entries=None, deleted=None):
+    """
+    Fold journal entries, in (body_no, date, id) order, into the Body each
+    leaves behind. The (body_no, date) of bodies whose last entry is a
+    tombstone are added to the set `deleted`, if given.
+    """
+    if entries is None:
+        entries = JournalEntry.objects.order_by('body_no', 'date', 'id').values_list(*ENTRY_FIELDS).iterator(chunk_size=2000)
+    deleted = set() if deleted is None else deleted
+    width = len(LAYERS)
+    body = None
+    tombstone = None
+    for source, body_no, date, url, colour_code, primer, measured_at, sequence, merged, missing, duplicates, packed in entries:
+        if tombstone is not None and tombstone != (body_no, date):
+            deleted.add(tombstone)
+        tombstone = None
+        if source == JournalEntry.DELETE:
+            if body is not None and (body.body_no, body.date) != (body_no, date):
+                yield body
+            body = None
+            tombstone = (body_no, date)
+            continue
+        values = tiering.unpack(packed)
+        if body is not None and (body.body_no, body.date) == (body_no, date):
+            if merged:
+                # As in ingest: the points this session skipped keep their earlier values
+                values = list(values)
+                for point in missing:
+                    start = (point - 1) * width
+                    values[start:start + width] = body.values[start:start + width]
+                values = tuple(values)
+        elif body is not None:
+            yield body
+        body = Body(body_no, date, url, colour_code, primer, measured_at, sequence, duplicates, values)
+    if tombstone is not None:
+        deleted.add(tombstone)
+    if body is not None:
+        yield body
+
+
+def _store_cars(batch):
+    """Upsert the CarData and CarReadings of a batch of Bodies."""
+    cars = []
+    for body in batch:
+        car = CarData(
+            body_no=body.body_no, date=body.date, url=body.url, colour_code=body.colour_code, primer=body.primer,
+            measured_at=body.measured_at, sequence=body.sequence,
+            missing_points=missing_points(body.values), duplicate_points=body.duplicates,
+        )
+        for field, value in zip(READING_FIELDS, body.values):
+            setattr(car, field, None if value is None else prn.format_reading(value))
+        cars.append(car)
+    bulk.upsert(CarData, cars, unique_fields=['body_no', 'date'], update_fields=CAR_FIELDS)
+    ids = {
+        (body_no, date): car_id
+        for car_id, body_no, date in CarData.objects.filter(body_no__in={body.body_no for body in batch}).values_list('id', 'body_no', 'date')
+    }
+    numeric.store([(ids[(car.body_no, car.date)], [getattr(car, field) for field in READING_FIELDS]) for car in cars])
+
+
+def _delete_cars(deleted):
+    """Delete the CarData of (body_no, date) pairs; returns the (colour, month) of each deleted."""
+    months = set()
+    for body_no, date in deleted:
+        cars = CarData.objects.filter(body_no=body_no, date=date)
+        months.update((colour_code, date.replace(day=1)) for colour_code in cars.values_list('colour_code', flat=True))
+        cars.delete()
+    return months
+
+
+def _store_sequences(last):
+    """Raise each colour's last handed-out sequence number to at least the highest replayed."""
+    for colour_code, top in last.items():
+        ColourSequence.objects.get_or_create(colour_code=colour_code)
+        ColourSequence.objects.filter(colour_code=colour_code, last__lt=top).update(last=top)
+
+
+def replay(targets=TARGETS, batch_size=BATCH_SIZE):
+    """
+    Rebuild the given targets from the journal. Returns the number of bodies replayed.
+
+    Runs in one transaction, so uploads wait for it rather than interleave;
+    the baselines are computed and the workbook is written after it commits.
+    """
+    unknown = set(targets) - set(TARGETS)
+    if unknown:
+        raise ValueError(f'Unknown replay targets: {", ".join(sorted(unknown))}')
+    count = 0
+    if 'cars' in targets or 'rollups' in targets:
+        with transaction.atomic(using=lines.database()):
+            archived = set(ColdBody.objects.values_list('body_no', 'date')) if 'cars' in targets else set()
+            table = {}
+            last = defaultdict(int)
+            months = set()
+            batch = []
+            deleted = set()
+            for body in bodies(deleted=deleted):
+                count += 1
+                months.add((body.colour_code, body.date.replace(day=1)))
+                if 'rollups' in targets:
+                    rollups.add(table, body.colour_code, body.date, body.values)
+                if body.sequence:
+                    last[body.colour_code] = max(last[body.colour_code], body.sequence)
+                if 'cars' in targets and (body.body_no, body.date) not in archived:
+                    batch.append(body)
+                    if len(batch) >= batch_size:
+                        _store_cars(batch)
+                        batch = []
+            if batch:
+                _store_cars(batch)
+            if 'cars' in targets:
+                _store_sequences(last)
+                months.update(_delete_cars(deleted))
+            if 'rollups' in targets:
+                rollups.replace(table)
+            for colour_code, month in months:
+                querycache.bump(colour_code, month)
+        logger.info('Replayed %d bodies from the journal into %s.', count, ', '.join(t for t in targets if t in ('cars', 'rollups')))
+    if 'baselines' in targets:
+        baselines.rebuild()
+    if 'export' in targets:
+        export.write_workbook()
+    return count
@@ -0,0 +1,120 @@
+"""
+Paint lines partitioned into databases of their own.
+
+One deployment can take the measurements of several paint lines or plants.
+Body numbers are only unique within a line and each colour's 'N cars ago'
+sequence counts that line's bodies, so every line keeps all of peltloader's
+tables in a database of its own: PELTLOADER_LINES maps a line's name to the
+alias of that database. The line being worked on is kept in a context
+variable, and ReportRouter (see routers.py) sends every peltloader query to
+its database, so an upload to one line never scans another line's tables
+or waits for its write lock. With no current line, queries go to 'default'
+as before; a line may be mapped to 'default' too, e.g. the line whose
+bodies were stored before lines were configured.
+
+A line's read-only reports connection and its cold store are the aliases
+'<alias>_reports' and '<alias>_cold', where configured; qateam/settings.py
+adds both along with the line's database. Adding a line is adding it to
+PELTLOADER_LINES and running `migrate --database` for its database and its
+cold store.
+
+Requests choose their line by URL: LineMiddleware serves /lines/<line>/...
+like the site serves /..., on that line's databases, and URLs reversed
+during the request keep the prefix. Commands run on a line through
+`manage.py run_on_line <line> <command> ...`. Work handed to another thread
+does not inherit the line unless wrapped with `bound`.
+"""
+import contextvars
+import functools
+import re
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import transaction
+from django.http import HttpResponseNotFound
+from django.urls import get_script_prefix, set_script_prefix
+
+PREFIX_RE = re.compile(r'^/lines/(?P<line>[^/]+)(?P<path>/.*)$')
+
+_line = contextvars.ContextVar('peltloader_line', default=None)
+
+
+def configured():
+    """Return {line: database alias} of the configured lines."""
+    return getattr(settings, 'PELTLOADER_LINES', {})
+
+
+def current():
+    """Return the line being worked on, or None."""
+    return _line.get()
+
+
+def database(line=None):
+    """Alias of the database holding `line` (default: the current line), 'default' without one."""
+    line = current() if line is None else line
+    return 'default' if line is None else configured()[line]
+
+
+@contextmanager
+def using(line):
+    """Work on `line` (None: no line) inside the block."""
+    if line is not None and line not in configured():
+        raise ValueError(f'Unknown line: {line}')
+    token = _line.set(line)
+    try:
+        yield
+    finally:
+        _line.reset(token)
+
+
+def bound(func):
+    """Return `func` made to run on the current line, e.g. to hand it to a worker thread."""
+    line = current()
+
+    @functools.wraps(func)
+    def inner(*args, **kwargs):
+        with using(line):
+            return func(*args, **kwargs)
+
+    return inner
+
+
+def atomic(func):
+    """Like transaction.atomic, on the database of the line current when `func` is called."""
+
+    @functools.wraps(func)
+    def inner(*args, **kwargs):
+        with transaction.atomic(using=database()):
+            return func(*args, **kwargs)
+
+    return inner
+
+
+def on_commit(func):
+    """Like transaction.on_commit, for the transaction open on the current line's database."""
+    transaction.on_commit(func, using=database())
+
+
+class LineMiddleware:
+    def __init__(self, get_response):
+        if not configured():
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        match = PREFIX_RE.match(request.path_info)
+        if match is None:
+            return self.get_response(request)
+        line = match['line']
+        if line not in configured():
+            return HttpResponseNotFound('Unknown line.', content_type='text/plain')
+        request.line = line
+        request.path_info = match['path']
+        prefix = get_script_prefix()
+        set_script_prefix(f'{prefix}lines/{line}/')
+        try:
+            with using(line):
+                return self.get_response(request)
+        finally:
+            set_script_prefix(prefix)
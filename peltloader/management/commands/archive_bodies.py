@@ -0,0 +1,45 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from peltloader import tiering
+from peltloader.routers import line_db
+from peltloader.models import CarData, ColdBody
+
+
+class Command(BaseCommand):
+    help = (
+        'Move bodies measured more than PELTLOADER_HOT_DAYS ago from CarData into the '
+        'compressed cold database. Safe to stop and run again.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=None, help='Keep this many days hot instead of PELTLOADER_HOT_DAYS.')
+        parser.add_argument('--before', default=None, help='Archive the bodies measured before this ISO date.')
+        parser.add_argument('--batch-size', type=int, default=tiering.BATCH_SIZE)
+        parser.add_argument('--dry-run', action='store_true', help='Only count the bodies that would be archived.')
+        parser.add_argument('--vacuum', action='store_true', help='VACUUM the main database afterwards to give the space back.')
+
+    def handle(self, *args, **options):
+        if options['before'] and options['days'] is not None:
+            raise CommandError('Give --before or --days, not both.')
+        try:
+            before = date.fromisoformat(options['before']) if options['before'] else None
+        except ValueError:
+            raise CommandError('--before must be an ISO date.')
+        before = before or tiering.cutoff(days=options['days'])
+
+        if options['dry_run']:
+            count = CarData.objects.filter(date__lt=before).count()
+            self.stdout.write(f'{count} bodies measured before {before} would be archived.')
+            return
+
+        moved = tiering.archive(before, options['batch_size'])
+        if options['vacuum'] and moved:
+            with connections[line_db()].cursor() as cursor:
+                cursor.execute('VACUUM')
+        self.stdout.write(self.style.SUCCESS(
+            f'Archived {moved} bodies measured before {before}; '
+            f'{CarData.objects.count()} hot, {ColdBody.objects.count()} cold.'
+        ))
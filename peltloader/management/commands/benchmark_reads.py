@@ -0,0 +1,54 @@
+import importlib.util
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from peltloader import readings
+from peltloader.models import CarData
+from peltloader.routers import reports_db
+
+
+class Command(BaseCommand):
+    help = (
+        'Time reading the stored bodies with their readings as CarData instances and '
+        'through peltloader.readings (tuples, records and a numpy array).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--runs', type=int, default=3)
+        parser.add_argument('--limit', type=int, default=None, help='Read at most this many bodies.')
+
+    def handle(self, *args, **options):
+        queryset = CarData.objects.using(reports_db()).order_by('id')
+        if options['limit']:
+            queryset = queryset[:options['limit']]
+        bodies = queryset.count()
+        if not bodies:
+            raise CommandError('No bodies stored.')
+
+        candidates = {
+            'CarData.objects.all()': lambda: sum(1 for _ in queryset.all()),
+            'objects + readings()': lambda: sum(len(car.readings()) for car in queryset.all()),
+            'readings.rows': lambda: sum(1 for _ in readings.rows(queryset)),
+            'readings.records': lambda: sum(1 for _ in readings.records(queryset)),
+        }
+        if importlib.util.find_spec('numpy') is None:
+            self.stdout.write('numpy is not installed; skipping readings.array.')
+        else:
+            candidates['readings.array'] = lambda: readings.array(queryset)[1].shape
+
+        self.stdout.write(f'{bodies} bodies, best of {options["runs"]} runs')
+        baseline = None
+        for name, read in candidates.items():
+            seconds = []
+            for _ in range(options['runs']):
+                start = time.perf_counter()
+                read()
+                seconds.append(time.perf_counter() - start)
+            best = min(seconds)
+            baseline = baseline or best
+            self.stdout.write(
+                f'{name:24} {best * 1000:8.1f} ms  {best / bodies * 1e6:7.1f} us/body  '
+                f'median {statistics.median(seconds) * 1000:8.1f} ms  {baseline / best:5.2f}x'
+            )
@@ -0,0 +1,45 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from peltloader import numeric
+from peltloader.models import CarData
+
+
+class Command(BaseCommand):
+    help = (
+        'Copy the stored readings into the numeric CarReadings table in small batches. '
+        'Progress is checkpointed after every batch, so the command can be stopped and '
+        'run again to carry on; uploads keep working while it runs.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=numeric.BATCH_SIZE)
+        parser.add_argument('--pause', type=float, default=0.05, help='Seconds to wait between batches.')
+        parser.add_argument('--max-batches', type=int, default=None, help='Stop after this many batches.')
+        parser.add_argument('--restart', action='store_true', help='Start again from the first body.')
+
+    def handle(self, *args, **options):
+        if options['restart']:
+            numeric.restart()
+        progress = numeric.checkpoint()
+        if progress is not None and progress.finished_at is not None:
+            self.stdout.write(self.style.SUCCESS(f'Already converted ({progress.rows} bodies); use --restart to convert again.'))
+            return
+
+        batches = 0
+        start = time.perf_counter()
+        while True:
+            progress = numeric.convert_batch(options['batch_size'])
+            batches += 1
+            if progress.finished_at is not None:
+                break
+            remaining = CarData.objects.filter(id__gt=progress.last_id).count()
+            self.stdout.write(f'{progress.rows} bodies converted, up to id {progress.last_id}, {remaining} to go')
+            if options['max_batches'] and batches >= options['max_batches']:
+                self.stdout.write('Stopping; run again to continue.')
+                return
+            time.sleep(options['pause'])
+
+        seconds = time.perf_counter() - start
+        self.stdout.write(self.style.SUCCESS(f'Converted {progress.rows} bodies in {batches} batches ({seconds:.1f} s).'))
@@ -0,0 +1,157 @@
+import http.cookiejar
+import itertools
+import random
+import re
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+import uuid
+from datetime import datetime, timedelta
+
+from django.core.management.base import BaseCommand
+
+from peltloader import synthetic
+
+CSRF_INPUT = re.compile(r'name="csrfmiddlewaretoken" value="([^"]+)"')
+COLOURS = ['8X5', '6X4', '223', '1L1', '4Y5']
+
+
+class NoRedirect(urllib.request.HTTPRedirectHandler):
+    """Report the upload's own 302 instead of following it to the success page."""
+
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        return None
+
+
+def multipart(fields, files):
+    boundary = uuid.uuid4().hex
+    parts = []
+    for name, value in fields.items():
+        parts.append(f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode())
+    for name, (filename, content) in files.items():
+        parts.append(
+            f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"; filename="{filename}"\r\n'
+            f'Content-Type: application/octet-stream\r\n\r\n'.encode() + content + b'\r\n'
+        )
+    parts.append(f'--{boundary}--\r\n'.encode())
+    return b''.join(parts), f'multipart/form-data; boundary={boundary}'
+
+
+class Client:
+    """One simulated gauge: its own cookies and CSRF token, uploading PRN files."""
+
+    def __init__(self, url, timeout):
+        self.url = url
+        self.timeout = timeout
+        self.cookies = http.cookiejar.CookieJar()
+        self.opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(self.cookies), NoRedirect)
+        self.token = None
+
+    def fetch_token(self):
+        with self.opener.open(self.url, timeout=self.timeout) as response:
+            html = response.read().decode()
+        match = CSRF_INPUT.search(html)
+        if not match:
+            raise RuntimeError('no csrfmiddlewaretoken on the upload page')
+        self.token = match.group(1)
+
+    def upload(self, body_no, prn_text):
+        """POST one file; return the HTTP status (302 means stored)."""
+        if self.token is None:
+            self.fetch_token()
+        body, content_type = multipart(
+            {'csrfmiddlewaretoken': self.token, 'body_no': body_no, 'date': ''},
+            {'file': (f'{body_no}.prn', prn_text.encode())},
+        )
+        request = urllib.request.Request(self.url, data=body, headers={'Content-Type': content_type, 'Referer': self.url})
+        try:
+            with self.opener.open(request, timeout=self.timeout) as response:
+                response.read()
+                return response.status
+        except urllib.error.HTTPError as e:
+            if e.code == 403:
+                self.token = None  # fetch a fresh token next time
+            return e.code
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q / 100 * len(values)))] if values else float('nan')
+
+
+class Command(BaseCommand):
+    help = (
+        'Replay synthetic PRN uploads against a running server from many concurrent '
+        'clients and report throughput, latency percentiles and error rate per window '
+        'of uploads, so the effect of a growing history is visible. Works against any '
+        'server serving the upload page, e.g. "manage.py runserver", '
+        '"gunicorn qateam.wsgi" or "uvicorn qateam.asgi:application".'
+    )
+    requires_system_checks = []
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://127.0.0.1:8000/', help='URL of the upload page.')
+        parser.add_argument('--clients', type=int, default=8)
+        parser.add_argument('--uploads', type=int, default=200, help='Total uploads to send.')
+        parser.add_argument('--window', type=int, default=50, help='Report every this many completed uploads.')
+        parser.add_argument('--timeout', type=float, default=60)
+        parser.add_argument('--seed', type=int, default=None)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        run = uuid.uuid4().hex[:6]
+        counter = itertools.count()
+        lock = threading.Lock()
+        results = []  # (finished_at, seconds, ok)
+        start_time = datetime(2024, 1, 1)
+
+        def report(window):
+            latencies = [seconds * 1000 for _, seconds, _ in window]
+            elapsed = window[-1][0] - window[0][0] if len(window) > 1 else float('nan')
+            errors = sum(1 for *_, ok in window if not ok)
+            self.stdout.write(
+                f'{len(results):6d}  {(len(window) - 1) / elapsed if elapsed else float("nan"):7.2f}/s  '
+                f'p50 {percentile(latencies, 50):8.1f}  p95 {percentile(latencies, 95):8.1f}  '
+                f'p99 {percentile(latencies, 99):8.1f} ms  errors {errors / len(window):6.1%}'
+            )
+
+        def worker():
+            client = Client(options['url'], options['timeout'])
+            while True:
+                n = next(counter)
+                if n >= options['uploads']:
+                    return
+                with lock:
+                    colour = rng.choice(COLOURS)
+                    text = synthetic.make_prn(colour_code=colour, start=start_time + timedelta(minutes=n), job=f'load-{run}', rng=random.Random(rng.random()))
+                began = time.perf_counter()
+                try:
+                    ok = client.upload(f'load-{run}-{n}', text) == 302
+                except Exception as e:
+                    ok = False
+                    self.stderr.write(f'upload {n}: {e!r}')
+                finished = time.perf_counter()
+                with lock:
+                    results.append((finished, finished - began, ok))
+                    if len(results) % options['window'] == 0:
+                        report(results[-options['window']:])
+
+        self.stdout.write(f'{options["clients"]} clients -> {options["url"]}')
+        self.stdout.write(' done    rate       latency (ms)                       errors')
+        began = time.perf_counter()
+        threads = [threading.Thread(target=worker) for _ in range(options['clients'])]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        total = time.perf_counter() - began
+
+        latencies = [seconds * 1000 for _, seconds, _ in results]
+        errors = sum(1 for *_, ok in results if not ok)
+        self.stdout.write(
+            f'total {len(results)} uploads in {total:.1f} s: {len(results) / total:.2f}/s, '
+            f'p50 {percentile(latencies, 50):.1f} ms, p95 {percentile(latencies, 95):.1f} ms, '
+            f'p99 {percentile(latencies, 99):.1f} ms, errors {errors / max(len(results), 1):.1%}'
+        )
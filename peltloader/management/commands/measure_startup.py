@@ -0,0 +1,47 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+# Run in a fresh interpreter so nothing is already imported.
+PROBE = '''
+import json, os, resource, sys, time
+start = time.perf_counter()
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', %(settings)r)
+from django.core.wsgi import get_wsgi_application
+get_wsgi_application()
+from django.urls import get_resolver
+get_resolver().url_patterns
+print(json.dumps({
+    'seconds': time.perf_counter() - start,
+    'maxrss_kib': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    'modules': [m for m in %(modules)r if m in sys.modules],
+}))
+'''
+
+
+class Command(BaseCommand):
+    help = 'Measure worker cold-start time and peak RSS for loading the WSGI app and URLconf.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--runs', type=int, default=5)
+        parser.add_argument('--watch', nargs='*', default=['pandas', 'numpy', 'openpyxl'],
+                            help='Modules to report as loaded at startup.')
+
+    def handle(self, *args, **options):
+        code = PROBE % {'settings': os.environ['DJANGO_SETTINGS_MODULE'], 'modules': options['watch']}
+        results = []
+        for _ in range(options['runs']):
+            out = subprocess.run([sys.executable, '-c', code], cwd=settings.BASE_DIR, capture_output=True, text=True, check=True)
+            results.append(json.loads(out.stdout.strip().splitlines()[-1]))
+
+        seconds = [r['seconds'] for r in results]
+        rss = [r['maxrss_kib'] / 1024 for r in results]
+        self.stdout.write(f'runs:          {len(results)}')
+        self.stdout.write(f'cold start:    median {statistics.median(seconds) * 1000:.0f} ms, min {min(seconds) * 1000:.0f} ms')
+        self.stdout.write(f'peak RSS:      median {statistics.median(rss):.1f} MiB')
+        self.stdout.write(f'heavy modules: {", ".join(results[0]["modules"]) or "none"}')
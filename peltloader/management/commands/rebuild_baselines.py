@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from peltloader import baselines
+
+
+class Command(BaseCommand):
+    help = 'Recompute every colour\'s baseline profile and the deviation of every stored body from it.'
+
+    def handle(self, *args, **options):
+        count = baselines.rebuild()
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt baselines and {count} body deviations.'))
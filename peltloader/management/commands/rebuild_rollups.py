@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from peltloader import rollups
+
+
+class Command(BaseCommand):
+    help = 'Recompute the daily and weekly PointRollup tables from the stored bodies, archived ones included.'
+
+    def handle(self, *args, **options):
+        count = rollups.rebuild()
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt rollups from {count} bodies.'))
@@ -0,0 +1,61 @@
+import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from peltloader import archive, ingest, prn
+from peltloader.models import ColdBody, RawUploadEntry
+
+
+class Command(BaseCommand):
+    help = (
+        'Parse archived .prn uploads again and store the results, e.g. after a parser fix. '
+        'For each body and date only the most recent upload is used. Bodies archived to the '
+        'cold database are skipped unless --include-archived is given, which restores them '
+        'to CarData like a new upload would; deleted bodies are always skipped.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--body', help='Only this body number.')
+        parser.add_argument('--since', help='Only measurements on or after this ISO date.')
+        parser.add_argument('--digest', help='Only uploads of the archived file with this SHA-256 (or prefix).')
+        parser.add_argument('--include-archived', action='store_true', help='Also reprocess archived bodies, restoring them to CarData.')
+        parser.add_argument('--dry-run', action='store_true', help='Parse only, do not store.')
+
+    def handle(self, *args, **options):
+        entries = RawUploadEntry.objects.select_related('raw').order_by('uploaded_at', 'id')
+        if options['body']:
+            entries = entries.filter(body_no=options['body'])
+        if options['since']:
+            try:
+                entries = entries.filter(date__gte=datetime.date.fromisoformat(options['since']))
+            except ValueError:
+                raise CommandError('--since must be an ISO date.')
+        if options['digest']:
+            entries = entries.filter(raw__digest__startswith=options['digest'])
+        latest = {(entry.body_no, entry.date): entry for entry in entries}
+        if not latest:
+            raise CommandError('No archived uploads match.')
+
+        # An entry loses its car when the body is archived or deleted
+        unlinked = {(entry.body_no, entry.date) for entry in latest.values() if entry.car_id is None}
+        archived = {
+            (body_no, date) for body_no, date in ColdBody.objects.filter(body_no__in={body_no for body_no, _ in unlinked}).values_list('body_no', 'date')
+            if (body_no, date) in unlinked
+        }
+        stored = failed = skipped = 0
+        for (body_no, date), entry in latest.items():
+            if (body_no, date) in unlinked and ((body_no, date) not in archived or not options['include_archived']):
+                skipped += 1
+                continue
+            try:
+                reading = prn.parse(archive.read(entry.raw))
+            except (OSError, prn.PrnValidationError) as e:
+                failed += 1
+                self.stderr.write(f'{body_no} {date}: {e}')
+                continue
+            if not options['dry_run']:
+                ingest.store_reading(reading, body_no, date, url=ingest.get_url_for_colour(reading.colour_code))
+            stored += 1
+
+        verb = 'Parsed' if options['dry_run'] else 'Reprocessed'
+        self.stdout.write(self.style.SUCCESS(f'{verb} {stored} uploads, {failed} failed, {skipped} archived or deleted skipped.'))
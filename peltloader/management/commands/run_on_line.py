@@ -0,0 +1,26 @@
+import argparse
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+
+from peltloader import lines
+
+
+class Command(BaseCommand):
+    help = (
+        'Run another management command on one paint line\'s databases, e.g. '
+        '`run_on_line paint2 archive_bodies --days 90`. Create a line\'s tables with '
+        '`migrate --database <alias>` instead.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('line', help='A line of PELTLOADER_LINES.')
+        parser.add_argument('command_name', help='The command to run.')
+        parser.add_argument('arguments', nargs=argparse.REMAINDER, help='Its arguments and options.')
+
+    def handle(self, *args, **options):
+        line = options['line']
+        if line not in lines.configured():
+            raise CommandError(f'Unknown line {line}; configured: {", ".join(lines.configured()) or "none"}.')
+        with lines.using(line):
+            call_command(options['command_name'], *options['arguments'], stdout=self.stdout, stderr=self.stderr)
@@ -0,0 +1,115 @@
+import threading
+import time
+import uuid
+from datetime import date
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from peltloader import export, heatmap, ingest, lines, prn, querycache, synthetic, throughput
+from peltloader.models import (
+    BodyDeviation, CarData, ColourBaseline, ColourSequence, DriftAlarm, HeatMap, JournalEntry, MeasurementSession,
+    PointRollup, PointStatistics, READING_FIELDS,
+)
+from peltloader.routers import reports_db
+
+
+def percentile(values, q):
+    if not values:
+        return float('nan')
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q / 100 * len(values)))]
+
+
+class Command(BaseCommand):
+    help = (
+        'Run continuous ingest and heavy report queries at the same time and report '
+        'ingest latency, report latency and lock errors. Writes synthetic bodies of '
+        'colour --colour to the configured database and afterwards removes them and '
+        'everything ingest derived from them, journal entries included, so --colour '
+        'must not be a colour in production.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seconds', type=float, default=10)
+        parser.add_argument('--readers', type=int, default=4)
+        parser.add_argument('--read-db', default=None, help='Alias for report queries (default: the reports connection).')
+        parser.add_argument('--colour', default='STRESS')
+        parser.add_argument('--keep', action='store_true', help='Keep the synthetic bodies.')
+
+    def handle(self, *args, **options):
+        read_db = options['read_db'] or reports_db()
+        colour = options['colour']
+        stop = threading.Event()
+        results = {'ingest': [], 'report': [], 'ingest_errors': [], 'report_errors': []}
+
+        def writer():
+            try:
+                while not stop.is_set():
+                    reading = prn.parse(synthetic.make_prn(colour_code=colour))
+                    start = time.perf_counter()
+                    try:
+                        ingest.store_reading(reading, f'stress-{uuid.uuid4().hex[:12]}', date.today())
+                        results['ingest'].append(time.perf_counter() - start)
+                    except Exception as e:
+                        results['ingest_errors'].append(repr(e))
+            finally:
+                connections.close_all()
+
+        def reader():
+            try:
+                while not stop.is_set():
+                    start = time.perf_counter()
+                    try:
+                        # A full scan of the readings plus a rollup read, like a long report
+                        rows = CarData.objects.using(read_db).values_list(*READING_FIELDS[:129])
+                        sum(1 for _ in rows.iterator(chunk_size=500))
+                        list(PointRollup.objects.using(read_db).filter(colour_code=colour).values_list('count', 'total'))
+                        results['report'].append(time.perf_counter() - start)
+                    except Exception as e:
+                        results['report_errors'].append(repr(e))
+            finally:
+                connections.close_all()
+
+        # Run on the line the command was started on, see run_on_line
+        threads = [threading.Thread(target=lines.bound(writer))] + [
+            threading.Thread(target=lines.bound(reader)) for _ in range(options['readers'])
+        ]
+        for thread in threads:
+            thread.start()
+        time.sleep(options['seconds'])
+        stop.set()
+        for thread in threads:
+            thread.join()
+
+        seconds = options['seconds']
+        self.stdout.write(f'report connection: {read_db}, readers: {options["readers"]}, {seconds:.0f} s')
+        for kind in ('ingest', 'report'):
+            latencies = [t * 1000 for t in results[kind]]
+            self.stdout.write(
+                f'{kind:7} {len(latencies) / seconds:7.1f}/s  p50 {percentile(latencies, 50):7.1f} ms  '
+                f'p95 {percentile(latencies, 95):7.1f} ms  max {max(latencies, default=float("nan")):7.1f} ms  '
+                f'errors {len(results[kind + "_errors"])}'
+            )
+            for error in sorted(set(results[kind + '_errors']))[:3]:
+                self.stdout.write(f'        {error}')
+
+        heatmap.drain()
+        export.drain()
+        if not options['keep']:
+            self.clean_up(colour)
+            if export.export_enabled():
+                export.schedule()
+
+    def clean_up(self, colour):
+        """Remove the synthetic bodies of `colour` and every row ingest wrote for them."""
+        cars = CarData.objects.filter(colour_code=colour)
+        # Their gauge sessions are summed into rows shared with real bodies
+        throughput.remove(MeasurementSession.objects.filter(car__in=cars))
+        images = list(HeatMap.objects.filter(car__in=cars).values_list('digest', 'format'))
+        for day in set(cars.values_list('date', flat=True)):
+            querycache.bump(colour, day)
+        cars.delete()
+        heatmap.remove_unused(images)
+        for model in (JournalEntry, BodyDeviation, ColourBaseline, PointRollup, PointStatistics, DriftAlarm, ColourSequence):
+            model.objects.filter(colour_code=colour).delete()
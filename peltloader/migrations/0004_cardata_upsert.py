@@ -0,0 +1,69 @@
+# Generated by Django 5.2.18 on 2026-10-19 14:43
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def merge_duplicate_measurements(apps, schema_editor):
+    """Keep the newest row per (body_no, date) and store the older ones as versions."""
+    CarData = apps.get_model('peltloader', 'CarData')
+    CarDataVersion = apps.get_model('peltloader', 'CarDataVersion')
+    db = schema_editor.connection.alias
+    fields = [f'{i}{layer}' for i in range(1, 173) for layer in 'CBP']
+    duplicates = (
+        CarData.objects.using(db).values('body_no', 'date')
+        .annotate(n=models.Count('id'), keep=models.Max('id'))
+        .filter(n__gt=1)
+    )
+    for dup in duplicates:
+        rows = CarData.objects.using(db).filter(body_no=dup['body_no'], date=dup['date']).exclude(id=dup['keep']).order_by('id')
+        for version, row in enumerate(rows, start=1):
+            CarDataVersion.objects.using(db).create(
+                car_id=dup['keep'],
+                version=version,
+                primer=row.primer,
+                colour_code=row.colour_code,
+                readings={field: getattr(row, field) for field in fields},
+            )
+        rows.delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('peltloader', '0003_cardata_delete_fileupload'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CarDataVersion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('version', models.PositiveIntegerField()),
+                ('primer', models.CharField(max_length=50)),
+                ('colour_code', models.CharField(max_length=10)),
+                ('measured_at', models.DateTimeField(blank=True, null=True)),
+                ('readings', models.JSONField()),
+                ('superseded_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='cardata',
+            name='measured_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='cardataversion',
+            name='car',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='versions', to='peltloader.cardata'),
+        ),
+        migrations.RunPython(merge_duplicate_measurements, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='cardata',
+            constraint=models.UniqueConstraint(fields=('body_no', 'date'), name='unique_body_measurement'),
+        ),
+        migrations.AddConstraint(
+            model_name='cardataversion',
+            constraint=models.UniqueConstraint(fields=('car', 'version'), name='unique_car_version'),
+        ),
+    ]
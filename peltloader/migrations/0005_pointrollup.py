@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-19 14:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('peltloader', '0004_cardata_upsert'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PointRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.CharField(choices=[('day', 'Day'), ('week', 'Week')], max_length=4)),
+                ('period_start', models.DateField()),
+                ('colour_code', models.CharField(max_length=10)),
+                ('point', models.PositiveSmallIntegerField()),
+                ('layer', models.CharField(max_length=1)),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('total', models.FloatField(default=0)),
+                ('total_sq', models.FloatField(default=0)),
+                ('histogram', models.JSONField(default=dict)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['colour_code', 'period', 'period_start'], name='rollup_colour_period')],
+                'constraints': [models.UniqueConstraint(fields=('period', 'period_start', 'colour_code', 'point', 'layer'), name='unique_point_rollup')],
+            },
+        ),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 5.2.18 on 2026-10-19 14:48
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('peltloader', '0005_pointrollup'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PointStatistics',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('colour_code', models.CharField(max_length=10)),
+                ('point', models.PositiveSmallIntegerField()),
+                ('layer', models.CharField(max_length=1)),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('mean', models.FloatField(default=0)),
+                ('m2', models.FloatField(default=0)),
+                ('target_mean', models.FloatField(blank=True, null=True)),
+                ('target_std', models.FloatField(blank=True, null=True)),
+                ('ewma', models.FloatField(blank=True, null=True)),
+                ('cusum_high', models.FloatField(default=0)),
+                ('cusum_low', models.FloatField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('colour_code', 'point', 'layer'), name='unique_point_statistics')],
+            },
+        ),
+        migrations.CreateModel(
+            name='DriftAlarm',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('colour_code', models.CharField(max_length=10)),
+                ('point', models.PositiveSmallIntegerField()),
+                ('layer', models.CharField(max_length=1)),
+                ('kind', models.CharField(choices=[('ewma', 'EWMA'), ('cusum_high', 'CUSUM high'), ('cusum_low', 'CUSUM low')], max_length=10)),
+                ('value', models.FloatField()),
+                ('target_mean', models.FloatField()),
+                ('raised_at', models.DateTimeField(auto_now_add=True)),
+                ('acknowledged', models.BooleanField(default=False)),
+                ('car', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='drift_alarms', to='peltloader.cardata')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['colour_code', 'raised_at'], name='alarm_colour_raised')],
+            },
+        ),
+    ]
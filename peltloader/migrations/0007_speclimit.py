@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-19 14:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('peltloader', '0006_drift_detection'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SpecLimit',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('colour_code', models.CharField(blank=True, max_length=10)),
+                ('point', models.PositiveSmallIntegerField(blank=True, null=True)),
+                ('layer', models.CharField(choices=[('C', 'Clearcoat'), ('B', 'Basecoat'), ('P', 'Primer')], max_length=1)),
+                ('lsl', models.FloatField(verbose_name='lower limit')),
+                ('usl', models.FloatField(verbose_name='upper limit')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('colour_code', 'point', 'layer'), name='unique_spec_limit')],
+            },
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-19 14:57
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('peltloader', '0007_speclimit'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HeatMap',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('format', models.CharField(choices=[('svg', 'SVG'), ('png', 'PNG')], max_length=3)),
+                ('digest', models.CharField(max_length=64)),
+                ('baseline_digest', models.CharField(max_length=64)),
+                ('rendered_at', models.DateTimeField(auto_now=True)),
+                ('car', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='heatmaps', to='peltloader.cardata')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('car', 'format'), name='unique_heatmap_format')],
+            },
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.18 on 2026-10-19 15:07
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('peltloader', '0008_heatmap'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RawUpload',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('digest', models.CharField(max_length=64, unique=True)),
+                ('compression', models.CharField(choices=[('gz', 'gzip'), ('zst', 'zstd')], max_length=3)),
+                ('size', models.PositiveIntegerField()),
+                ('stored_size', models.PositiveIntegerField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='RawUploadEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('body_no', models.CharField(max_length=50)),
+                ('date', models.DateField()),
+                ('filename', models.CharField(blank=True, max_length=255)),
+                ('uploaded_at', models.DateTimeField(auto_now_add=True)),
+                ('car', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='raw_uploads', to='peltloader.cardata')),
+                ('raw', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='entries', to='peltloader.rawupload')),
+            ],
+            options={
+                'verbose_name_plural': 'raw upload entries',
+                'indexes': [models.Index(fields=['body_no', 'date'], name='raw_entry_body_date')],
+            },
+        ),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 5.2.18 on 2026-10-19 15:11
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('peltloader', '0009_raw_upload_archive'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PointTiming',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('point', models.PositiveSmallIntegerField(unique=True)),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('total', models.FloatField(default=0)),
+                ('total_sq', models.FloatField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ThroughputDaily',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('gauge', models.CharField(blank=True, max_length=50)),
+                ('operator', models.CharField(blank=True, max_length=50)),
+                ('bodies', models.PositiveIntegerField(default=0)),
+                ('points', models.PositiveIntegerField(default=0)),
+                ('active_seconds', models.PositiveIntegerField(default=0)),
+                ('first_started_at', models.DateTimeField(null=True)),
+                ('last_finished_at', models.DateTimeField(null=True)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('day', 'gauge', 'operator'), name='unique_throughput_daily')],
+            },
+        ),
+        migrations.CreateModel(
+            name='MeasurementSession',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('gauge', models.CharField(blank=True, max_length=50)),
+                ('operator', models.CharField(blank=True, max_length=50)),
+                ('job', models.CharField(blank=True, max_length=50)),
+                ('started_at', models.DateTimeField()),
+                ('finished_at', models.DateTimeField()),
+                ('points', models.PositiveSmallIntegerField()),
+                ('active_seconds', models.PositiveIntegerField()),
+                ('point_offsets', models.BinaryField()),
+                ('car', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='session', to='peltloader.cardata')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['started_at', 'gauge', 'operator'], name='session_started_gauge')],
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-19 15:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('peltloader', '0010_measurement_sessions'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cardata',
+            name='duplicate_points',
+            field=models.JSONField(blank=True, default=list),
+        ),
+        migrations.AddField(
+            model_name='cardata',
+            name='missing_points',
+            field=models.JSONField(blank=True, default=list),
+        ),
+    ]
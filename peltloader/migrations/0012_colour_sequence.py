@@ -0,0 +1,59 @@
+# Generated by Django 5.2.18 on 2026-10-19 15:15
+
+from django.db import migrations, models
+
+
+def number_bodies(apps, schema_editor):
+    """Number each colour's bodies in the order they were stored, as 'latest' counted them."""
+    CarData = apps.get_model('peltloader', 'CarData')
+    ColourSequence = apps.get_model('peltloader', 'ColourSequence')
+    db = schema_editor.connection.alias
+    last = {}
+    for car in CarData.objects.using(db).order_by('id').only('id', 'colour_code'):
+        last[car.colour_code] = last.get(car.colour_code, 0) + 1
+        CarData.objects.using(db).filter(id=car.id).update(sequence=last[car.colour_code])
+    ColourSequence.objects.using(db).bulk_create([ColourSequence(colour_code=colour, last=n) for colour, n in last.items()])
+
+
+def label_bodies(apps, schema_editor):
+    CarData = apps.get_model('peltloader', 'CarData')
+    ColourSequence = apps.get_model('peltloader', 'ColourSequence')
+    db = schema_editor.connection.alias
+    last = dict(ColourSequence.objects.using(db).values_list('colour_code', 'last'))
+    for car in CarData.objects.using(db).exclude(sequence=None).only('id', 'colour_code', 'sequence'):
+        n = last[car.colour_code] - car.sequence + 1
+        CarData.objects.using(db).filter(id=car.id).update(latest='1 car ago' if n == 1 else f'{n} cars ago')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('peltloader', '0011_missing_points'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ColourSequence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('colour_code', models.CharField(max_length=10, unique=True)),
+                ('last', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='cardata',
+            name='sequence',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.RunPython(number_bodies, label_bodies),
+        # Gives the column a default, so that it can be added back when unapplying
+        migrations.AlterField(
+            model_name='cardata',
+            name='latest',
+            field=models.CharField(default='', max_length=50),
+        ),
+        migrations.RemoveField(
+            model_name='cardata',
+            name='latest',
+        ),
+    ]
@@ -0,0 +1,559 @@
+# Generated by Django 5.2.18 on 2026-10-19 15:34
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def finish_if_empty(apps, schema_editor):
+    """With no bodies stored yet there is nothing to convert: ingest writes CarReadings from here on."""
+    CarData = apps.get_model('peltloader', 'CarData')
+    BackfillCheckpoint = apps.get_model('peltloader', 'BackfillCheckpoint')
+    db = schema_editor.connection.alias
+    if not CarData.objects.using(db).exists():
+        BackfillCheckpoint.objects.using(db).create(name='car_readings', finished_at=timezone.now())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('peltloader', '0012_colour_sequence'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BackfillCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+                ('last_id', models.BigIntegerField(default=0)),
+                ('rows', models.PositiveIntegerField(default=0)),
+                ('started_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='CarReadings',
+            fields=[
+                ('car', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='numeric', serialize=False, to='peltloader.cardata')),
+                ('1C', models.FloatField(blank=True, null=True)),
+                ('1B', models.FloatField(blank=True, null=True)),
+                ('1P', models.FloatField(blank=True, null=True)),
+                ('2C', models.FloatField(blank=True, null=True)),
+                ('2B', models.FloatField(blank=True, null=True)),
+                ('2P', models.FloatField(blank=True, null=True)),
+                ('3C', models.FloatField(blank=True, null=True)),
+                ('3B', models.FloatField(blank=True, null=True)),
+                ('3P', models.FloatField(blank=True, null=True)),
+                ('4C', models.FloatField(blank=True, null=True)),
+                ('4B', models.FloatField(blank=True, null=True)),
+                ('4P', models.FloatField(blank=True, null=True)),
+                ('5C', models.FloatField(blank=True, null=True)),
+                ('5B', models.FloatField(blank=True, null=True)),
+                ('5P', models.FloatField(blank=True, null=True)),
+                ('6C', models.FloatField(blank=True, null=True)),
+                ('6B', models.FloatField(blank=True, null=True)),
+                ('6P', models.FloatField(blank=True, null=True)),
+                ('7C', models.FloatField(blank=True, null=True)),
+                ('7B', models.FloatField(blank=True, null=True)),
+                ('7P', models.FloatField(blank=True, null=True)),
+                ('8C', models.FloatField(blank=True, null=True)),
+                ('8B', models.FloatField(blank=True, null=True)),
+                ('8P', models.FloatField(blank=True, null=True)),
+                ('9C', models.FloatField(blank=True, null=True)),
+                ('9B', models.FloatField(blank=True, null=True)),
+                ('9P', models.FloatField(blank=True, null=True)),
+                ('10C', models.FloatField(blank=True, null=True)),
+                ('10B', models.FloatField(blank=True, null=True)),
+                ('10P', models.FloatField(blank=True, null=True)),
+                ('11C', models.FloatField(blank=True, null=True)),
+                ('11B', models.FloatField(blank=True, null=True)),
+                ('11P', models.FloatField(blank=True, null=True)),
+                ('12C', models.FloatField(blank=True, null=True)),
+                ('12B', models.FloatField(blank=True, null=True)),
+                ('12P', models.FloatField(blank=True, null=True)),
+                ('13C', models.FloatField(blank=True, null=True)),
+                ('13B', models.FloatField(blank=True, null=True)),
+                ('13P', models.FloatField(blank=True, null=True)),
+                ('14C', models.FloatField(blank=True, null=True)),
+                ('14B', models.FloatField(blank=True, null=True)),
+                ('14P', models.FloatField(blank=True, null=True)),
+                ('15C', models.FloatField(blank=True, null=True)),
+                ('15B', models.FloatField(blank=True, null=True)),
+                ('15P', models.FloatField(blank=True, null=True)),
+                ('16C', models.FloatField(blank=True, null=True)),
+                ('16B', models.FloatField(blank=True, null=True)),
+                ('16P', models.FloatField(blank=True, null=True)),
+                ('17C', models.FloatField(blank=True, null=True)),
+                ('17B', models.FloatField(blank=True, null=True)),
+                ('17P', models.FloatField(blank=True, null=True)),
+                ('18C', models.FloatField(blank=True, null=True)),
+                ('18B', models.FloatField(blank=True, null=True)),
+                ('18P', models.FloatField(blank=True, null=True)),
+                ('19C', models.FloatField(blank=True, null=True)),
+                ('19B', models.FloatField(blank=True, null=True)),
+                ('19P', models.FloatField(blank=True, null=True)),
+                ('20C', models.FloatField(blank=True, null=True)),
+                ('20B', models.FloatField(blank=True, null=True)),
+                ('20P', models.FloatField(blank=True, null=True)),
+                ('21C', models.FloatField(blank=True, null=True)),
+                ('21B', models.FloatField(blank=True, null=True)),
+                ('21P', models.FloatField(blank=True, null=True)),
+                ('22C', models.FloatField(blank=True, null=True)),
+                ('22B', models.FloatField(blank=True, null=True)),
+                ('22P', models.FloatField(blank=True, null=True)),
+                ('23C', models.FloatField(blank=True, null=True)),
+                ('23B', models.FloatField(blank=True, null=True)),
+                ('23P', models.FloatField(blank=True, null=True)),
+                ('24C', models.FloatField(blank=True, null=True)),
+                ('24B', models.FloatField(blank=True, null=True)),
+                ('24P', models.FloatField(blank=True, null=True)),
+                ('25C', models.FloatField(blank=True, null=True)),
+                ('25B', models.FloatField(blank=True, null=True)),
+                ('25P', models.FloatField(blank=True, null=True)),
+                ('26C', models.FloatField(blank=True, null=True)),
+                ('26B', models.FloatField(blank=True, null=True)),
+                ('26P', models.FloatField(blank=True, null=True)),
+                ('27C', models.FloatField(blank=True, null=True)),
+                ('27B', models.FloatField(blank=True, null=True)),
+                ('27P', models.FloatField(blank=True, null=True)),
+                ('28C', models.FloatField(blank=True, null=True)),
+                ('28B', models.FloatField(blank=True, null=True)),
+                ('28P', models.FloatField(blank=True, null=True)),
+                ('29C', models.FloatField(blank=True, null=True)),
+                ('29B', models.FloatField(blank=True, null=True)),
+                ('29P', models.FloatField(blank=True, null=True)),
+                ('30C', models.FloatField(blank=True, null=True)),
+                ('30B', models.FloatField(blank=True, null=True)),
+                ('30P', models.FloatField(blank=True, null=True)),
+                ('31C', models.FloatField(blank=True, null=True)),
+                ('31B', models.FloatField(blank=True, null=True)),
+                ('31P', models.FloatField(blank=True, null=True)),
+                ('32C', models.FloatField(blank=True, null=True)),
+                ('32B', models.FloatField(blank=True, null=True)),
+                ('32P', models.FloatField(blank=True, null=True)),
+                ('33C', models.FloatField(blank=True, null=True)),
+                ('33B', models.FloatField(blank=True, null=True)),
+                ('33P', models.FloatField(blank=True, null=True)),
+                ('34C', models.FloatField(blank=True, null=True)),
+                ('34B', models.FloatField(blank=True, null=True)),
+                ('34P', models.FloatField(blank=True, null=True)),
+                ('35C', models.FloatField(blank=True, null=True)),
+                ('35B', models.FloatField(blank=True, null=True)),
+                ('35P', models.FloatField(blank=True, null=True)),
+                ('36C', models.FloatField(blank=True, null=True)),
+                ('36B', models.FloatField(blank=True, null=True)),
+                ('36P', models.FloatField(blank=True, null=True)),
+                ('37C', models.FloatField(blank=True, null=True)),
+                ('37B', models.FloatField(blank=True, null=True)),
+                ('37P', models.FloatField(blank=True, null=True)),
+                ('38C', models.FloatField(blank=True, null=True)),
+                ('38B', models.FloatField(blank=True, null=True)),
+                ('38P', models.FloatField(blank=True, null=True)),
+                ('39C', models.FloatField(blank=True, null=True)),
+                ('39B', models.FloatField(blank=True, null=True)),
+                ('39P', models.FloatField(blank=True, null=True)),
+                ('40C', models.FloatField(blank=True, null=True)),
+                ('40B', models.FloatField(blank=True, null=True)),
+                ('40P', models.FloatField(blank=True, null=True)),
+                ('41C', models.FloatField(blank=True, null=True)),
+                ('41B', models.FloatField(blank=True, null=True)),
+                ('41P', models.FloatField(blank=True, null=True)),
+                ('42C', models.FloatField(blank=True, null=True)),
+                ('42B', models.FloatField(blank=True, null=True)),
+                ('42P', models.FloatField(blank=True, null=True)),
+                ('43C', models.FloatField(blank=True, null=True)),
+                ('43B', models.FloatField(blank=True, null=True)),
+                ('43P', models.FloatField(blank=True, null=True)),
+                ('44C', models.FloatField(blank=True, null=True)),
+                ('44B', models.FloatField(blank=True, null=True)),
+                ('44P', models.FloatField(blank=True, null=True)),
+                ('45C', models.FloatField(blank=True, null=True)),
+                ('45B', models.FloatField(blank=True, null=True)),
+                ('45P', models.FloatField(blank=True, null=True)),
+                ('46C', models.FloatField(blank=True, null=True)),
+                ('46B', models.FloatField(blank=True, null=True)),
+                ('46P', models.FloatField(blank=True, null=True)),
+                ('47C', models.FloatField(blank=True, null=True)),
+                ('47B', models.FloatField(blank=True, null=True)),
+                ('47P', models.FloatField(blank=True, null=True)),
+                ('48C', models.FloatField(blank=True, null=True)),
+                ('48B', models.FloatField(blank=True, null=True)),
+                ('48P', models.FloatField(blank=True, null=True)),
+                ('49C', models.FloatField(blank=True, null=True)),
+                ('49B', models.FloatField(blank=True, null=True)),
+                ('49P', models.FloatField(blank=True, null=True)),
+                ('50C', models.FloatField(blank=True, null=True)),
+                ('50B', models.FloatField(blank=True, null=True)),
+                ('50P', models.FloatField(blank=True, null=True)),
+                ('51C', models.FloatField(blank=True, null=True)),
+                ('51B', models.FloatField(blank=True, null=True)),
+                ('51P', models.FloatField(blank=True, null=True)),
+                ('52C', models.FloatField(blank=True, null=True)),
+                ('52B', models.FloatField(blank=True, null=True)),
+                ('52P', models.FloatField(blank=True, null=True)),
+                ('53C', models.FloatField(blank=True, null=True)),
+                ('53B', models.FloatField(blank=True, null=True)),
+                ('53P', models.FloatField(blank=True, null=True)),
+                ('54C', models.FloatField(blank=True, null=True)),
+                ('54B', models.FloatField(blank=True, null=True)),
+                ('54P', models.FloatField(blank=True, null=True)),
+                ('55C', models.FloatField(blank=True, null=True)),
+                ('55B', models.FloatField(blank=True, null=True)),
+                ('55P', models.FloatField(blank=True, null=True)),
+                ('56C', models.FloatField(blank=True, null=True)),
+                ('56B', models.FloatField(blank=True, null=True)),
+                ('56P', models.FloatField(blank=True, null=True)),
+                ('57C', models.FloatField(blank=True, null=True)),
+                ('57B', models.FloatField(blank=True, null=True)),
+                ('57P', models.FloatField(blank=True, null=True)),
+                ('58C', models.FloatField(blank=True, null=True)),
+                ('58B', models.FloatField(blank=True, null=True)),
+                ('58P', models.FloatField(blank=True, null=True)),
+                ('59C', models.FloatField(blank=True, null=True)),
+                ('59B', models.FloatField(blank=True, null=True)),
+                ('59P', models.FloatField(blank=True, null=True)),
+                ('60C', models.FloatField(blank=True, null=True)),
+                ('60B', models.FloatField(blank=True, null=True)),
+                ('60P', models.FloatField(blank=True, null=True)),
+                ('61C', models.FloatField(blank=True, null=True)),
+                ('61B', models.FloatField(blank=True, null=True)),
+                ('61P', models.FloatField(blank=True, null=True)),
+                ('62C', models.FloatField(blank=True, null=True)),
+                ('62B', models.FloatField(blank=True, null=True)),
+                ('62P', models.FloatField(blank=True, null=True)),
+                ('63C', models.FloatField(blank=True, null=True)),
+                ('63B', models.FloatField(blank=True, null=True)),
+                ('63P', models.FloatField(blank=True, null=True)),
+                ('64C', models.FloatField(blank=True, null=True)),
+                ('64B', models.FloatField(blank=True, null=True)),
+                ('64P', models.FloatField(blank=True, null=True)),
+                ('65C', models.FloatField(blank=True, null=True)),
+                ('65B', models.FloatField(blank=True, null=True)),
+                ('65P', models.FloatField(blank=True, null=True)),
+                ('66C', models.FloatField(blank=True, null=True)),
+                ('66B', models.FloatField(blank=True, null=True)),
+                ('66P', models.FloatField(blank=True, null=True)),
+                ('67C', models.FloatField(blank=True, null=True)),
+                ('67B', models.FloatField(blank=True, null=True)),
+                ('67P', models.FloatField(blank=True, null=True)),
+                ('68C', models.FloatField(blank=True, null=True)),
+                ('68B', models.FloatField(blank=True, null=True)),
+                ('68P', models.FloatField(blank=True, null=True)),
+                ('69C', models.FloatField(blank=True, null=True)),
+                ('69B', models.FloatField(blank=True, null=True)),
+                ('69P', models.FloatField(blank=True, null=True)),
+                ('70C', models.FloatField(blank=True, null=True)),
+                ('70B', models.FloatField(blank=True, null=True)),
+                ('70P', models.FloatField(blank=True, null=True)),
+                ('71C', models.FloatField(blank=True, null=True)),
+                ('71B', models.FloatField(blank=True, null=True)),
+                ('71P', models.FloatField(blank=True, null=True)),
+                ('72C', models.FloatField(blank=True, null=True)),
+                ('72B', models.FloatField(blank=True, null=True)),
+                ('72P', models.FloatField(blank=True, null=True)),
+                ('73C', models.FloatField(blank=True, null=True)),
+                ('73B', models.FloatField(blank=True, null=True)),
+                ('73P', models.FloatField(blank=True, null=True)),
+                ('74C', models.FloatField(blank=True, null=True)),
+                ('74B', models.FloatField(blank=True, null=True)),
+                ('74P', models.FloatField(blank=True, null=True)),
+                ('75C', models.FloatField(blank=True, null=True)),
+                ('75B', models.FloatField(blank=True, null=True)),
+                ('75P', models.FloatField(blank=True, null=True)),
+                ('76C', models.FloatField(blank=True, null=True)),
+                ('76B', models.FloatField(blank=True, null=True)),
+                ('76P', models.FloatField(blank=True, null=True)),
+                ('77C', models.FloatField(blank=True, null=True)),
+                ('77B', models.FloatField(blank=True, null=True)),
+                ('77P', models.FloatField(blank=True, null=True)),
+                ('78C', models.FloatField(blank=True, null=True)),
+                ('78B', models.FloatField(blank=True, null=True)),
+                ('78P', models.FloatField(blank=True, null=True)),
+                ('79C', models.FloatField(blank=True, null=True)),
+                ('79B', models.FloatField(blank=True, null=True)),
+                ('79P', models.FloatField(blank=True, null=True)),
+                ('80C', models.FloatField(blank=True, null=True)),
+                ('80B', models.FloatField(blank=True, null=True)),
+                ('80P', models.FloatField(blank=True, null=True)),
+                ('81C', models.FloatField(blank=True, null=True)),
+                ('81B', models.FloatField(blank=True, null=True)),
+                ('81P', models.FloatField(blank=True, null=True)),
+                ('82C', models.FloatField(blank=True, null=True)),
+                ('82B', models.FloatField(blank=True, null=True)),
+                ('82P', models.FloatField(blank=True, null=True)),
+                ('83C', models.FloatField(blank=True, null=True)),
+                ('83B', models.FloatField(blank=True, null=True)),
+                ('83P', models.FloatField(blank=True, null=True)),
+                ('84C', models.FloatField(blank=True, null=True)),
+                ('84B', models.FloatField(blank=True, null=True)),
+                ('84P', models.FloatField(blank=True, null=True)),
+                ('85C', models.FloatField(blank=True, null=True)),
+                ('85B', models.FloatField(blank=True, null=True)),
+                ('85P', models.FloatField(blank=True, null=True)),
+                ('86C', models.FloatField(blank=True, null=True)),
+                ('86B', models.FloatField(blank=True, null=True)),
+                ('86P', models.FloatField(blank=True, null=True)),
+                ('87C', models.FloatField(blank=True, null=True)),
+                ('87B', models.FloatField(blank=True, null=True)),
+                ('87P', models.FloatField(blank=True, null=True)),
+                ('88C', models.FloatField(blank=True, null=True)),
+                ('88B', models.FloatField(blank=True, null=True)),
+                ('88P', models.FloatField(blank=True, null=True)),
+                ('89C', models.FloatField(blank=True, null=True)),
+                ('89B', models.FloatField(blank=True, null=True)),
+                ('89P', models.FloatField(blank=True, null=True)),
+                ('90C', models.FloatField(blank=True, null=True)),
+                ('90B', models.FloatField(blank=True, null=True)),
+                ('90P', models.FloatField(blank=True, null=True)),
+                ('91C', models.FloatField(blank=True, null=True)),
+                ('91B', models.FloatField(blank=True, null=True)),
+                ('91P', models.FloatField(blank=True, null=True)),
+                ('92C', models.FloatField(blank=True, null=True)),
+                ('92B', models.FloatField(blank=True, null=True)),
+                ('92P', models.FloatField(blank=True, null=True)),
+                ('93C', models.FloatField(blank=True, null=True)),
+                ('93B', models.FloatField(blank=True, null=True)),
+                ('93P', models.FloatField(blank=True, null=True)),
+                ('94C', models.FloatField(blank=True, null=True)),
+                ('94B', models.FloatField(blank=True, null=True)),
+                ('94P', models.FloatField(blank=True, null=True)),
+                ('95C', models.FloatField(blank=True, null=True)),
+                ('95B', models.FloatField(blank=True, null=True)),
+                ('95P', models.FloatField(blank=True, null=True)),
+                ('96C', models.FloatField(blank=True, null=True)),
+                ('96B', models.FloatField(blank=True, null=True)),
+                ('96P', models.FloatField(blank=True, null=True)),
+                ('97C', models.FloatField(blank=True, null=True)),
+                ('97B', models.FloatField(blank=True, null=True)),
+                ('97P', models.FloatField(blank=True, null=True)),
+                ('98C', models.FloatField(blank=True, null=True)),
+                ('98B', models.FloatField(blank=True, null=True)),
+                ('98P', models.FloatField(blank=True, null=True)),
+                ('99C', models.FloatField(blank=True, null=True)),
+                ('99B', models.FloatField(blank=True, null=True)),
+                ('99P', models.FloatField(blank=True, null=True)),
+                ('100C', models.FloatField(blank=True, null=True)),
+                ('100B', models.FloatField(blank=True, null=True)),
+                ('100P', models.FloatField(blank=True, null=True)),
+                ('101C', models.FloatField(blank=True, null=True)),
+                ('101B', models.FloatField(blank=True, null=True)),
+                ('101P', models.FloatField(blank=True, null=True)),
+                ('102C', models.FloatField(blank=True, null=True)),
+                ('102B', models.FloatField(blank=True, null=True)),
+                ('102P', models.FloatField(blank=True, null=True)),
+                ('103C', models.FloatField(blank=True, null=True)),
+                ('103B', models.FloatField(blank=True, null=True)),
+                ('103P', models.FloatField(blank=True, null=True)),
+                ('104C', models.FloatField(blank=True, null=True)),
+                ('104B', models.FloatField(blank=True, null=True)),
+                ('104P', models.FloatField(blank=True, null=True)),
+                ('105C', models.FloatField(blank=True, null=True)),
+                ('105B', models.FloatField(blank=True, null=True)),
+                ('105P', models.FloatField(blank=True, null=True)),
+                ('106C', models.FloatField(blank=True, null=True)),
+                ('106B', models.FloatField(blank=True, null=True)),
+                ('106P', models.FloatField(blank=True, null=True)),
+                ('107C', models.FloatField(blank=True, null=True)),
+                ('107B', models.FloatField(blank=True, null=True)),
+                ('107P', models.FloatField(blank=True, null=True)),
+                ('108C', models.FloatField(blank=True, null=True)),
+                ('108B', models.FloatField(blank=True, null=True)),
+                ('108P', models.FloatField(blank=True, null=True)),
+                ('109C', models.FloatField(blank=True, null=True)),
+                ('109B', models.FloatField(blank=True, null=True)),
+                ('109P', models.FloatField(blank=True, null=True)),
+                ('110C', models.FloatField(blank=True, null=True)),
+                ('110B', models.FloatField(blank=True, null=True)),
+                ('110P', models.FloatField(blank=True, null=True)),
+                ('111C', models.FloatField(blank=True, null=True)),
+                ('111B', models.FloatField(blank=True, null=True)),
+                ('111P', models.FloatField(blank=True, null=True)),
+                ('112C', models.FloatField(blank=True, null=True)),
+                ('112B', models.FloatField(blank=True, null=True)),
+                ('112P', models.FloatField(blank=True, null=True)),
+                ('113C', models.FloatField(blank=True, null=True)),
+                ('113B', models.FloatField(blank=True, null=True)),
+                ('113P', models.FloatField(blank=True, null=True)),
+                ('114C', models.FloatField(blank=True, null=True)),
+                ('114B', models.FloatField(blank=True, null=True)),
+                ('114P', models.FloatField(blank=True, null=True)),
+                ('115C', models.FloatField(blank=True, null=True)),
+                ('115B', models.FloatField(blank=True, null=True)),
+                ('115P', models.FloatField(blank=True, null=True)),
+                ('116C', models.FloatField(blank=True, null=True)),
+                ('116B', models.FloatField(blank=True, null=True)),
+                ('116P', models.FloatField(blank=True, null=True)),
+                ('117C', models.FloatField(blank=True, null=True)),
+                ('117B', models.FloatField(blank=True, null=True)),
+                ('117P', models.FloatField(blank=True, null=True)),
+                ('118C', models.FloatField(blank=True, null=True)),
+                ('118B', models.FloatField(blank=True, null=True)),
+                ('118P', models.FloatField(blank=True, null=True)),
+                ('119C', models.FloatField(blank=True, null=True)),
+                ('119B', models.FloatField(blank=True, null=True)),
+                ('119P', models.FloatField(blank=True, null=True)),
+                ('120C', models.FloatField(blank=True, null=True)),
+                ('120B', models.FloatField(blank=True, null=True)),
+                ('120P', models.FloatField(blank=True, null=True)),
+                ('121C', models.FloatField(blank=True, null=True)),
+                ('121B', models.FloatField(blank=True, null=True)),
+                ('121P', models.FloatField(blank=True, null=True)),
+                ('122C', models.FloatField(blank=True, null=True)),
+                ('122B', models.FloatField(blank=True, null=True)),
+                ('122P', models.FloatField(blank=True, null=True)),
+                ('123C', models.FloatField(blank=True, null=True)),
+                ('123B', models.FloatField(blank=True, null=True)),
+                ('123P', models.FloatField(blank=True, null=True)),
+                ('124C', models.FloatField(blank=True, null=True)),
+                ('124B', models.FloatField(blank=True, null=True)),
+                ('124P', models.FloatField(blank=True, null=True)),
+                ('125C', models.FloatField(blank=True, null=True)),
+                ('125B', models.FloatField(blank=True, null=True)),
+                ('125P', models.FloatField(blank=True, null=True)),
+                ('126C', models.FloatField(blank=True, null=True)),
+                ('126B', models.FloatField(blank=True, null=True)),
+                ('126P', models.FloatField(blank=True, null=True)),
+                ('127C', models.FloatField(blank=True, null=True)),
+                ('127B', models.FloatField(blank=True, null=True)),
+                ('127P', models.FloatField(blank=True, null=True)),
+                ('128C', models.FloatField(blank=True, null=True)),
+                ('128B', models.FloatField(blank=True, null=True)),
+                ('128P', models.FloatField(blank=True, null=True)),
+                ('129C', models.FloatField(blank=True, null=True)),
+                ('129B', models.FloatField(blank=True, null=True)),
+                ('129P', models.FloatField(blank=True, null=True)),
+                ('130C', models.FloatField(blank=True, null=True)),
+                ('130B', models.FloatField(blank=True, null=True)),
+                ('130P', models.FloatField(blank=True, null=True)),
+                ('131C', models.FloatField(blank=True, null=True)),
+                ('131B', models.FloatField(blank=True, null=True)),
+                ('131P', models.FloatField(blank=True, null=True)),
+                ('132C', models.FloatField(blank=True, null=True)),
+                ('132B', models.FloatField(blank=True, null=True)),
+                ('132P', models.FloatField(blank=True, null=True)),
+                ('133C', models.FloatField(blank=True, null=True)),
+                ('133B', models.FloatField(blank=True, null=True)),
+                ('133P', models.FloatField(blank=True, null=True)),
+                ('134C', models.FloatField(blank=True, null=True)),
+                ('134B', models.FloatField(blank=True, null=True)),
+                ('134P', models.FloatField(blank=True, null=True)),
+                ('135C', models.FloatField(blank=True, null=True)),
+                ('135B', models.FloatField(blank=True, null=True)),
+                ('135P', models.FloatField(blank=True, null=True)),
+                ('136C', models.FloatField(blank=True, null=True)),
+                ('136B', models.FloatField(blank=True, null=True)),
+                ('136P', models.FloatField(blank=True, null=True)),
+                ('137C', models.FloatField(blank=True, null=True)),
+                ('137B', models.FloatField(blank=True, null=True)),
+                ('137P', models.FloatField(blank=True, null=True)),
+                ('138C', models.FloatField(blank=True, null=True)),
+                ('138B', models.FloatField(blank=True, null=True)),
+                ('138P', models.FloatField(blank=True, null=True)),
+                ('139C', models.FloatField(blank=True, null=True)),
+                ('139B', models.FloatField(blank=True, null=True)),
+                ('139P', models.FloatField(blank=True, null=True)),
+                ('140C', models.FloatField(blank=True, null=True)),
+                ('140B', models.FloatField(blank=True, null=True)),
+                ('140P', models.FloatField(blank=True, null=True)),
+                ('141C', models.FloatField(blank=True, null=True)),
+                ('141B', models.FloatField(blank=True, null=True)),
+                ('141P', models.FloatField(blank=True, null=True)),
+                ('142C', models.FloatField(blank=True, null=True)),
+                ('142B', models.FloatField(blank=True, null=True)),
+                ('142P', models.FloatField(blank=True, null=True)),
+                ('143C', models.FloatField(blank=True, null=True)),
+                ('143B', models.FloatField(blank=True, null=True)),
+                ('143P', models.FloatField(blank=True, null=True)),
+                ('144C', models.FloatField(blank=True, null=True)),
+                ('144B', models.FloatField(blank=True, null=True)),
+                ('144P', models.FloatField(blank=True, null=True)),
+                ('145C', models.FloatField(blank=True, null=True)),
+                ('145B', models.FloatField(blank=True, null=True)),
+                ('145P', models.FloatField(blank=True, null=True)),
+                ('146C', models.FloatField(blank=True, null=True)),
+                ('146B', models.FloatField(blank=True, null=True)),
+                ('146P', models.FloatField(blank=True, null=True)),
+                ('147C', models.FloatField(blank=True, null=True)),
+                ('147B', models.FloatField(blank=True, null=True)),
+                ('147P', models.FloatField(blank=True, null=True)),
+                ('148C', models.FloatField(blank=True, null=True)),
+                ('148B', models.FloatField(blank=True, null=True)),
+                ('148P', models.FloatField(blank=True, null=True)),
+                ('149C', models.FloatField(blank=True, null=True)),
+                ('149B', models.FloatField(blank=True, null=True)),
+                ('149P', models.FloatField(blank=True, null=True)),
+                ('150C', models.FloatField(blank=True, null=True)),
+                ('150B', models.FloatField(blank=True, null=True)),
+                ('150P', models.FloatField(blank=True, null=True)),
+                ('151C', models.FloatField(blank=True, null=True)),
+                ('151B', models.FloatField(blank=True, null=True)),
+                ('151P', models.FloatField(blank=True, null=True)),
+                ('152C', models.FloatField(blank=True, null=True)),
+                ('152B', models.FloatField(blank=True, null=True)),
+                ('152P', models.FloatField(blank=True, null=True)),
+                ('153C', models.FloatField(blank=True, null=True)),
+                ('153B', models.FloatField(blank=True, null=True)),
+                ('153P', models.FloatField(blank=True, null=True)),
+                ('154C', models.FloatField(blank=True, null=True)),
+                ('154B', models.FloatField(blank=True, null=True)),
+                ('154P', models.FloatField(blank=True, null=True)),
+                ('155C', models.FloatField(blank=True, null=True)),
+                ('155B', models.FloatField(blank=True, null=True)),
+                ('155P', models.FloatField(blank=True, null=True)),
+                ('156C', models.FloatField(blank=True, null=True)),
+                ('156B', models.FloatField(blank=True, null=True)),
+                ('156P', models.FloatField(blank=True, null=True)),
+                ('157C', models.FloatField(blank=True, null=True)),
+                ('157B', models.FloatField(blank=True, null=True)),
+                ('157P', models.FloatField(blank=True, null=True)),
+                ('158C', models.FloatField(blank=True, null=True)),
+                ('158B', models.FloatField(blank=True, null=True)),
+                ('158P', models.FloatField(blank=True, null=True)),
+                ('159C', models.FloatField(blank=True, null=True)),
+                ('159B', models.FloatField(blank=True, null=True)),
+                ('159P', models.FloatField(blank=True, null=True)),
+                ('160C', models.FloatField(blank=True, null=True)),
+                ('160B', models.FloatField(blank=True, null=True)),
+                ('160P', models.FloatField(blank=True, null=True)),
+                ('161C', models.FloatField(blank=True, null=True)),
+                ('161B', models.FloatField(blank=True, null=True)),
+                ('161P', models.FloatField(blank=True, null=True)),
+                ('162C', models.FloatField(blank=True, null=True)),
+                ('162B', models.FloatField(blank=True, null=True)),
+                ('162P', models.FloatField(blank=True, null=True)),
+                ('163C', models.FloatField(blank=True, null=True)),
+                ('163B', models.FloatField(blank=True, null=True)),
+                ('163P', models.FloatField(blank=True, null=True)),
+                ('164C', models.FloatField(blank=True, null=True)),
+                ('164B', models.FloatField(blank=True, null=True)),
+                ('164P', models.FloatField(blank=True, null=True)),
+                ('165C', models.FloatField(blank=True, null=True)),
+                ('165B', models.FloatField(blank=True, null=True)),
+                ('165P', models.FloatField(blank=True, null=True)),
+                ('166C', models.FloatField(blank=True, null=True)),
+                ('166B', models.FloatField(blank=True, null=True)),
+                ('166P', models.FloatField(blank=True, null=True)),
+                ('167C', models.FloatField(blank=True, null=True)),
+                ('167B', models.FloatField(blank=True, null=True)),
+                ('167P', models.FloatField(blank=True, null=True)),
+                ('168C', models.FloatField(blank=True, null=True)),
+                ('168B', models.FloatField(blank=True, null=True)),
+                ('168P', models.FloatField(blank=True, null=True)),
+                ('169C', models.FloatField(blank=True, null=True)),
+                ('169B', models.FloatField(blank=True, null=True)),
+                ('169P', models.FloatField(blank=True, null=True)),
+                ('170C', models.FloatField(blank=True, null=True)),
+                ('170B', models.FloatField(blank=True, null=True)),
+                ('170P', models.FloatField(blank=True, null=True)),
+                ('171C', models.FloatField(blank=True, null=True)),
+                ('171B', models.FloatField(blank=True, null=True)),
+                ('171P', models.FloatField(blank=True, null=True)),
+                ('172C', models.FloatField(blank=True, null=True)),
+                ('172B', models.FloatField(blank=True, null=True)),
+                ('172P', models.FloatField(blank=True, null=True)),
+            ],
+        ),
+        migrations.RunPython(finish_if_empty, migrations.RunPython.noop),
+    ]
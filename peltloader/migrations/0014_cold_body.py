@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-19 15:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('peltloader', '0013_car_readings'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ColdBody',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('car_id', models.BigIntegerField(unique=True)),
+                ('body_no', models.CharField(max_length=50)),
+                ('date', models.DateField()),
+                ('colour_code', models.CharField(max_length=10)),
+                ('primer', models.CharField(max_length=50)),
+                ('url', models.URLField()),
+                ('sequence', models.PositiveIntegerField(blank=True, null=True)),
+                ('measured_at', models.DateTimeField(blank=True, null=True)),
+                ('missing_points', models.JSONField(blank=True, default=list)),
+                ('duplicate_points', models.JSONField(blank=True, default=list)),
+                ('readings', models.BinaryField()),
+                ('history', models.BinaryField(blank=True, null=True)),
+                ('archived_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['colour_code', 'date'], name='cold_colour_date'), models.Index(fields=['date'], name='cold_date')],
+                'constraints': [models.UniqueConstraint(fields=('body_no', 'date'), name='unique_cold_body')],
+            },
+        ),
+    ]
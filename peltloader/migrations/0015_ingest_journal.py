@@ -0,0 +1,82 @@
+# Generated by Django 5.2.18 on 2026-10-19 15:46
+
+import array
+import sys
+import zlib
+
+from django.db import migrations, models
+
+BATCH_SIZE = 500
+# tiering.pack as of this migration, which must not change with it
+SCALE = 1000
+MISSING = -2 ** 31
+
+
+def pack(values):
+    packed = array.array('i', (MISSING if value is None else round(value * SCALE) for value in values))
+    if sys.byteorder == 'big':
+        packed.byteswap()
+    return zlib.compress(packed.tobytes(), 9)
+
+
+def seed(apps, schema_editor):
+    """Start the journal with one entry per stored body, so replaying it covers them too."""
+    CarData = apps.get_model('peltloader', 'CarData')
+    JournalEntry = apps.get_model('peltloader', 'JournalEntry')
+    db = schema_editor.connection.alias
+    fields = [f'{i}{layer}' for i in range(1, 173) for layer in 'CBP']
+    headers = ['body_no', 'date', 'url', 'colour_code', 'primer', 'measured_at', 'sequence']
+    last_id = 0
+    while True:
+        rows = list(CarData.objects.using(db).filter(id__gt=last_id).order_by('id').values_list('id', *headers, 'missing_points', 'duplicate_points', *fields)[:BATCH_SIZE])
+        if not rows:
+            break
+        JournalEntry.objects.using(db).bulk_create([
+            JournalEntry(
+                source='seed',
+                **dict(zip(headers, row[1:8])),
+                missing=row[8],
+                duplicates=row[9],
+                readings=pack([None if value in (None, '') else float(value) for value in row[10:]]),
+            )
+            for row in rows
+        ])
+        last_id = rows[-1][0]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('peltloader', '0014_cold_body'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='JournalEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('recorded_at', models.DateTimeField(auto_now_add=True)),
+                ('source', models.CharField(choices=[('upload', 'Upload'), ('admin', 'Admin edit'), ('seed', 'Stored before the journal')], default='upload', max_length=6)),
+                ('body_no', models.CharField(max_length=50)),
+                ('date', models.DateField()),
+                ('url', models.URLField()),
+                ('colour_code', models.CharField(max_length=10)),
+                ('primer', models.CharField(max_length=50)),
+                ('measured_at', models.DateTimeField(blank=True, null=True)),
+                ('gauge', models.CharField(blank=True, max_length=50)),
+                ('operator', models.CharField(blank=True, max_length=50)),
+                ('job', models.CharField(blank=True, max_length=50)),
+                ('sequence', models.PositiveIntegerField(blank=True, null=True)),
+                ('merged', models.BooleanField(default=False)),
+                ('missing', models.JSONField(blank=True, default=list)),
+                ('duplicates', models.JSONField(blank=True, default=list)),
+                ('readings', models.BinaryField()),
+                ('offsets', models.BinaryField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name_plural': 'journal entries',
+                'indexes': [models.Index(fields=['body_no', 'date', 'id'], name='journal_body_date')],
+            },
+        ),
+        migrations.RunPython(seed, migrations.RunPython.noop),
+    ]
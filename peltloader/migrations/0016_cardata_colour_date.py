@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-19 16:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('peltloader', '0015_ingest_journal'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='cardata',
+            index=models.Index(fields=['colour_code', 'date'], name='cardata_colour_date'),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.18 on 2026-10-19 16:10
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('peltloader', '0016_cardata_colour_date'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ColourBaseline',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('colour_code', models.CharField(max_length=10, unique=True)),
+                ('version', models.PositiveIntegerField(default=0)),
+                ('bodies', models.PositiveIntegerField(default=0)),
+                ('pending', models.PositiveIntegerField(default=0)),
+                ('median', models.BinaryField()),
+                ('spread', models.BinaryField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='BodyDeviation',
+            fields=[
+                ('car', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='deviation', serialize=False, to='peltloader.cardata')),
+                ('colour_code', models.CharField(max_length=10)),
+                ('date', models.DateField()),
+                ('baseline_version', models.PositiveIntegerField()),
+                ('deviations', models.BinaryField()),
+                ('worst', models.FloatField()),
+                ('worst_field', models.CharField(blank=True, max_length=4)),
+                ('rms', models.FloatField()),
+            ],
+            options={
+                'indexes': [models.Index(fields=['colour_code', '-worst'], name='deviation_colour_worst')],
+            },
+        ),
+    ]
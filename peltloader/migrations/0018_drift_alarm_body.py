@@ -0,0 +1,47 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:05
+
+import datetime
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def copy_body(apps, schema_editor):
+    """Name each existing alarm's body on the alarm itself, so archiving it keeps the alarm."""
+    DriftAlarm = apps.get_model('peltloader', 'DriftAlarm')
+    CarData = apps.get_model('peltloader', 'CarData')
+    db = schema_editor.connection.alias
+    alarmed = CarData.objects.using(db).filter(id__in=DriftAlarm.objects.using(db).values('car_id'))
+    bodies = {car_id: (body_no, date) for car_id, body_no, date in alarmed.values_list('id', 'body_no', 'date')}
+    alarms = list(DriftAlarm.objects.using(db).only('id', 'car_id'))
+    for alarm in alarms:
+        alarm.body_no, alarm.date = bodies[alarm.car_id]
+    DriftAlarm.objects.using(db).bulk_update(alarms, ['body_no', 'date'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('peltloader', '0017_colour_baseline'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='driftalarm',
+            name='body_no',
+            field=models.CharField(default='', max_length=50),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='driftalarm',
+            name='date',
+            field=models.DateField(default=datetime.date(1970, 1, 1)),
+            preserve_default=False,
+        ),
+        migrations.RunPython(copy_body, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='driftalarm',
+            name='car',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='drift_alarms', to='peltloader.cardata'),
+        ),
+    ]
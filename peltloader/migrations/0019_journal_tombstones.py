@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('peltloader', '0018_drift_alarm_body'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='journalentry',
+            name='source',
+            field=models.CharField(choices=[('upload', 'Upload'), ('admin', 'Admin edit'), ('seed', 'Stored before the journal'), ('delete', 'Deleted')], default='upload', max_length=6),
+        ),
+    ]
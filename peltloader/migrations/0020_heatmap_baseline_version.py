@@ -0,0 +1,22 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('peltloader', '0019_journal_tombstones'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='heatmap',
+            name='baseline_digest',
+        ),
+        migrations.AddField(
+            model_name='heatmap',
+            name='baseline_version',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
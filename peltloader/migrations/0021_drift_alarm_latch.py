@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:50
+
+from django.db import migrations, models
+
+
+def refix_targets(apps, schema_editor):
+    """
+    Let every series fix its target again under the longer warm-up: at its
+    next body, from the running moments if it has had enough bodies by then.
+    """
+    PointStatistics = apps.get_model('peltloader', 'PointStatistics')
+    PointStatistics.objects.using(schema_editor.connection.alias).update(
+        target_mean=None, target_std=None, ewma=None, cusum_high=0, cusum_low=0,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('peltloader', '0020_heatmap_baseline_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pointstatistics',
+            name='ewma_alarmed',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.RunPython(refix_targets, migrations.RunPython.noop),
+    ]
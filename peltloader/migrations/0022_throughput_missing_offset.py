@@ -0,0 +1,51 @@
+# Generated by Django 5.2.18 on 2026-10-19 19:10
+
+import array
+import sys
+
+from django.db import migrations
+
+BATCH_SIZE = 500
+OLD_MISSING = -1
+MISSING = -2 ** 31
+
+
+def repack(data):
+    """Mark the missing points of packed offsets with MISSING instead of OLD_MISSING."""
+    values = array.array('i')
+    values.frombytes(bytes(data))
+    if sys.byteorder == 'big':
+        values.byteswap()
+    values = array.array('i', (MISSING if value == OLD_MISSING else value for value in values))
+    if sys.byteorder == 'big':
+        values.byteswap()
+    return values.tobytes()
+
+
+def repack_offsets(apps, schema_editor):
+    """
+    Rewrite the point offsets of measurement sessions and journal entries,
+    which marked a missing point with -1: also the offset of a point timed a
+    second before the first.
+    """
+    db = schema_editor.connection.alias
+    for model, field in (('MeasurementSession', 'point_offsets'), ('JournalEntry', 'offsets')):
+        Model = apps.get_model('peltloader', model)
+        last_id = 0
+        while True:
+            rows = list(Model.objects.using(db).filter(id__gt=last_id, **{f'{field}__isnull': False}).order_by('id').values_list('id', field)[:BATCH_SIZE])
+            if not rows:
+                break
+            Model.objects.using(db).bulk_update([Model(id=pk, **{field: repack(data)}) for pk, data in rows], [field])
+            last_id = rows[-1][0]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('peltloader', '0021_drift_alarm_latch'),
+    ]
+
+    operations = [
+        migrations.RunPython(repack_offsets, migrations.RunPython.noop),
+    ]
@@ -1,18 +1,514 @@
 from django.db import models
 
+POINTS = 172
+LAYERS = 'CBP'  # clearcoat, basecoat, primer
+READING_FIELDS = [f'{i}{layer}' for i in range(1, POINTS + 1) for layer in LAYERS]
+READING_KEYS = [(i, layer, f'{i}{layer}') for i in range(1, POINTS + 1) for layer in LAYERS]
+
+def cars_ago(n):
+    """Label a body's place among its colour, 1 being the most recent."""
+    return '1 car ago' if n == 1 else f'{n} cars ago'
+
+
+class ColourSequence(models.Model):
+    """The last sequence number handed out to a body of each colour (see ingest.next_sequence)."""
+    colour_code = models.CharField(max_length=10, unique=True)
+    last = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f'{self.colour_code}: {self.last}'
+
+
 class CarData(models.Model):
-    latest = models.CharField(max_length=50)
+    # Order of the body among those of its colour, 1 for the first measured
+    sequence = models.PositiveIntegerField(null=True, blank=True)
     primer = models.CharField(max_length=50)
     url = models.URLField()
     date = models.DateField()
     body_no = models.CharField(max_length=50)
     colour_code = models.CharField(max_length=10)
-    
+    measured_at = models.DateTimeField(null=True, blank=True)
+    # Points without readings, and points the gauge file repeated (see prn.parse)
+    missing_points = models.JSONField(default=list, blank=True)
+    duplicate_points = models.JSONField(default=list, blank=True)
+
     # Dynamically added columns for points
     for i in range(1, 173):
         locals()[f'{i}C'] = models.CharField(max_length=10, null=True, blank=True)
         locals()[f'{i}B'] = models.CharField(max_length=10, null=True, blank=True)
         locals()[f'{i}P'] = models.CharField(max_length=10, null=True, blank=True)
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['body_no', 'date'], name='unique_body_measurement'),
+        ]
+        indexes = [
+            models.Index(fields=['colour_code', 'date'], name='cardata_colour_date'),
+        ]
+
     def __str__(self):
         return self.body_no
+
+    @property
+    def latest(self):
+        """'N cars ago' for this body among those of its colour, counting itself."""
+        last = ColourSequence.objects.filter(colour_code=self.colour_code).values_list('last', flat=True).first()
+        return cars_ago(last - self.sequence + 1) if last and self.sequence else ''
+
+    def readings(self):
+        """Return (point, layer, value) for every stored reading, as floats."""
+        values = []
+        for point, layer, field in READING_KEYS:
+            value = getattr(self, field)
+            if value not in (None, ''):
+                values.append((point, layer, float(value)))
+        return values
+
+
+class CarReadings(models.Model):
+    """A CarData's readings as floats, so they compare and aggregate natively (see numeric.py)."""
+    car = models.OneToOneField(CarData, on_delete=models.CASCADE, primary_key=True, related_name='numeric')
+
+    for i in range(1, 173):
+        locals()[f'{i}C'] = models.FloatField(null=True, blank=True)
+        locals()[f'{i}B'] = models.FloatField(null=True, blank=True)
+        locals()[f'{i}P'] = models.FloatField(null=True, blank=True)
+
+    def __str__(self):
+        return str(self.car_id)
+
+
+class BackfillCheckpoint(models.Model):
+    """How far a resumable batched conversion has got, by the last id it converted."""
+    name = models.CharField(max_length=50, unique=True)
+    last_id = models.BigIntegerField(default=0)
+    rows = models.PositiveIntegerField(default=0)
+    started_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f'{self.name}: {self.rows} rows up to id {self.last_id}'
+
+
+class ColdBody(models.Model):
+    """
+    A body moved out of CarData by the retention policy (see tiering.py).
+
+    Lives in the 'cold' database. `readings` holds the 516 readings packed
+    and compressed, `history` its superseded versions and measurement
+    session as compressed JSON.
+    """
+    car_id = models.BigIntegerField(unique=True)  # the CarData id it had
+    body_no = models.CharField(max_length=50)
+    date = models.DateField()
+    colour_code = models.CharField(max_length=10)
+    primer = models.CharField(max_length=50)
+    url = models.URLField()
+    sequence = models.PositiveIntegerField(null=True, blank=True)
+    measured_at = models.DateTimeField(null=True, blank=True)
+    missing_points = models.JSONField(default=list, blank=True)
+    duplicate_points = models.JSONField(default=list, blank=True)
+    readings = models.BinaryField()
+    history = models.BinaryField(null=True, blank=True)
+    archived_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['body_no', 'date'], name='unique_cold_body'),
+        ]
+        indexes = [
+            models.Index(fields=['colour_code', 'date'], name='cold_colour_date'),
+            models.Index(fields=['date'], name='cold_date'),
+        ]
+
+    def __str__(self):
+        return f'{self.body_no} {self.date} (archived)'
+
+
+class CarDataVersion(models.Model):
+    """A superseded measurement of a body, kept when a re-measurement replaces it."""
+    car = models.ForeignKey(CarData, on_delete=models.CASCADE, related_name='versions')
+    version = models.PositiveIntegerField()
+    primer = models.CharField(max_length=50)
+    colour_code = models.CharField(max_length=10)
+    measured_at = models.DateTimeField(null=True, blank=True)
+    readings = models.JSONField()
+    superseded_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['car', 'version'], name='unique_car_version'),
+        ]
+
+    def __str__(self):
+        return f'{self.car} v{self.version}'
+
+
+class JournalEntry(models.Model):
+    """
+    One ingested measurement as it was parsed, in the append-only ingest journal (see journal.py).
+
+    `readings` holds the parsed values packed like ColdBody.readings, None
+    where a point is missing; `sequence` is the one ingest gave the body and
+    `merged` whether the body's earlier values filled in the missing points.
+    A DELETE entry is a tombstone: the body was deleted, and holds no readings.
+    """
+    UPLOAD = 'upload'
+    ADMIN = 'admin'
+    SEED = 'seed'
+    DELETE = 'delete'
+    SOURCE_CHOICES = [(UPLOAD, 'Upload'), (ADMIN, 'Admin edit'), (SEED, 'Stored before the journal'), (DELETE, 'Deleted')]
+
+    recorded_at = models.DateTimeField(auto_now_add=True)
+    source = models.CharField(max_length=6, choices=SOURCE_CHOICES, default=UPLOAD)
+    body_no = models.CharField(max_length=50)
+    date = models.DateField()
+    url = models.URLField()
+    colour_code = models.CharField(max_length=10)
+    primer = models.CharField(max_length=50)
+    measured_at = models.DateTimeField(null=True, blank=True)
+    gauge = models.CharField(max_length=50, blank=True)
+    operator = models.CharField(max_length=50, blank=True)
+    job = models.CharField(max_length=50, blank=True)
+    sequence = models.PositiveIntegerField(null=True, blank=True)
+    merged = models.BooleanField(default=False)
+    missing = models.JSONField(default=list, blank=True)
+    duplicates = models.JSONField(default=list, blank=True)
+    readings = models.BinaryField()
+    # Seconds from measured_at to each point, packed like MeasurementSession.point_offsets
+    offsets = models.BinaryField(null=True, blank=True)
+
+    class Meta:
+        verbose_name_plural = 'journal entries'
+        indexes = [
+            models.Index(fields=['body_no', 'date', 'id'], name='journal_body_date'),
+        ]
+
+    def __str__(self):
+        return f'#{self.pk} {self.body_no} {self.date}'
+
+
+class PointRollup(models.Model):
+    """Per day or week summary of one colour/point/layer, maintained at ingest (see rollups.py)."""
+    DAY = 'day'
+    WEEK = 'week'
+    PERIOD_CHOICES = [(DAY, 'Day'), (WEEK, 'Week')]
+
+    period = models.CharField(max_length=4, choices=PERIOD_CHOICES)
+    period_start = models.DateField()
+    colour_code = models.CharField(max_length=10)
+    point = models.PositiveSmallIntegerField()
+    layer = models.CharField(max_length=1)
+    count = models.PositiveIntegerField(default=0)
+    total = models.FloatField(default=0)
+    total_sq = models.FloatField(default=0)
+    # Counts per HISTOGRAM_BIN wide bin, keyed by bin index, for percentiles
+    histogram = models.JSONField(default=dict)
+
+    HISTOGRAM_BIN = 0.5
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['period', 'period_start', 'colour_code', 'point', 'layer'], name='unique_point_rollup'),
+        ]
+        indexes = [
+            models.Index(fields=['colour_code', 'period', 'period_start'], name='rollup_colour_period'),
+        ]
+
+    def __str__(self):
+        return f'{self.colour_code} {self.point}{self.layer} {self.period} {self.period_start}'
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else None
+
+    @property
+    def std(self):
+        if self.count < 2:
+            return None
+        variance = (self.total_sq - self.total * self.total / self.count) / (self.count - 1)
+        return max(variance, 0.0) ** 0.5
+
+    def percentile(self, q):
+        """Approximate q-th percentile (0-100), to within HISTOGRAM_BIN."""
+        if not self.count:
+            return None
+        rank = q / 100 * self.count
+        seen = 0
+        for index, n in sorted((int(k), n) for k, n in self.histogram.items()):
+            seen += n
+            if seen >= rank:
+                return (index + 0.5) * self.HISTOGRAM_BIN
+        return None
+
+
+class PointStatistics(models.Model):
+    """
+    Running state of one colour/point/layer across consecutive bodies.
+
+    count/mean/m2 are Welford running moments over every body. target_mean and
+    target_std are frozen once the warm-up is over and are what the EWMA and
+    CUSUM statistics are measured against (see drift.py).
+    """
+    colour_code = models.CharField(max_length=10)
+    point = models.PositiveSmallIntegerField()
+    layer = models.CharField(max_length=1)
+    count = models.PositiveIntegerField(default=0)
+    mean = models.FloatField(default=0)
+    m2 = models.FloatField(default=0)
+    target_mean = models.FloatField(null=True, blank=True)
+    target_std = models.FloatField(null=True, blank=True)
+    ewma = models.FloatField(null=True, blank=True)
+    ewma_alarmed = models.BooleanField(default=False)  # outside its limits since its last alarm
+    cusum_high = models.FloatField(default=0)
+    cusum_low = models.FloatField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['colour_code', 'point', 'layer'], name='unique_point_statistics'),
+        ]
+
+    def __str__(self):
+        return f'{self.colour_code} {self.point}{self.layer}'
+
+    @property
+    def std(self):
+        return (self.m2 / (self.count - 1)) ** 0.5 if self.count > 1 else None
+
+
+class ColourBaseline(models.Model):
+    """
+    The typical profile of a colour: the median and a robust spread of every
+    reading over its most recent bodies, packed like ColdBody.readings and
+    refreshed as bodies are stored (see baselines.py).
+    """
+    colour_code = models.CharField(max_length=10, unique=True)
+    version = models.PositiveIntegerField(default=0)
+    bodies = models.PositiveIntegerField(default=0)  # the baseline was computed from
+    pending = models.PositiveIntegerField(default=0)  # stored since
+    median = models.BinaryField()
+    spread = models.BinaryField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f'{self.colour_code} v{self.version}'
+
+
+class BodyDeviation(models.Model):
+    """
+    A body's readings in spreads from its colour's baseline, packed in
+    READING_FIELDS order, with its largest and root-mean-square deviation.
+    """
+    car = models.OneToOneField(CarData, on_delete=models.CASCADE, primary_key=True, related_name='deviation')
+    colour_code = models.CharField(max_length=10)
+    date = models.DateField()
+    baseline_version = models.PositiveIntegerField()
+    deviations = models.BinaryField()
+    worst = models.FloatField()  # largest absolute deviation
+    worst_field = models.CharField(max_length=4, blank=True)
+    rms = models.FloatField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['colour_code', '-worst'], name='deviation_colour_worst'),
+        ]
+
+    def __str__(self):
+        return f'{self.car_id}: {self.worst:.2f} at {self.worst_field}'
+
+
+class DriftAlarm(models.Model):
+    EWMA = 'ewma'
+    CUSUM_HIGH = 'cusum_high'
+    CUSUM_LOW = 'cusum_low'
+    KIND_CHOICES = [(EWMA, 'EWMA'), (CUSUM_HIGH, 'CUSUM high'), (CUSUM_LOW, 'CUSUM low')]
+
+    # Cleared when the body is archived; body_no and date still name it
+    car = models.ForeignKey(CarData, on_delete=models.SET_NULL, null=True, blank=True, related_name='drift_alarms')
+    body_no = models.CharField(max_length=50)
+    date = models.DateField()
+    colour_code = models.CharField(max_length=10)
+    point = models.PositiveSmallIntegerField()
+    layer = models.CharField(max_length=1)
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    value = models.FloatField()
+    target_mean = models.FloatField()
+    raised_at = models.DateTimeField(auto_now_add=True)
+    acknowledged = models.BooleanField(default=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['colour_code', 'raised_at'], name='alarm_colour_raised'),
+        ]
+
+    def __str__(self):
+        return f'{self.get_kind_display()} on {self.colour_code} {self.point}{self.layer}'
+
+
+class SpecLimit(models.Model):
+    """
+    Lower/upper thickness limits for a layer.
+
+    Leave colour_code blank or point empty to apply to all colours or points;
+    the most specific matching limit is used.
+    """
+    colour_code = models.CharField(max_length=10, blank=True)
+    point = models.PositiveSmallIntegerField(null=True, blank=True)
+    layer = models.CharField(max_length=1, choices=[('C', 'Clearcoat'), ('B', 'Basecoat'), ('P', 'Primer')])
+    lsl = models.FloatField('lower limit')
+    usl = models.FloatField('upper limit')
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['colour_code', 'point', 'layer'], name='unique_spec_limit'),
+        ]
+
+    def __str__(self):
+        return f'{self.colour_code or "*"} {self.point or "*"}{self.layer}: {self.lsl}-{self.usl}'
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        self._invalidate_reports()
+
+    def delete(self, *args, **kwargs):
+        result = super().delete(*args, **kwargs)
+        self._invalidate_reports()
+        return result
+
+    def _invalidate_reports(self):
+        from . import querycache
+
+        colours = [self.colour_code] if self.colour_code else PointStatistics.objects.values_list('colour_code', flat=True).distinct()
+        for colour_code in colours:
+            querycache.bump(colour_code)
+
+
+class HeatMap(models.Model):
+    """A rendered heat-map of a body, stored content-addressed (see heatmap.py)."""
+    SVG = 'svg'
+    PNG = 'png'
+    FORMAT_CHOICES = [(SVG, 'SVG'), (PNG, 'PNG')]
+
+    car = models.ForeignKey(CarData, on_delete=models.CASCADE, related_name='heatmaps')
+    format = models.CharField(max_length=3, choices=FORMAT_CHOICES)
+    digest = models.CharField(max_length=64)
+    baseline_version = models.PositiveIntegerField(default=0)  # of the ColourBaseline it was drawn against
+    rendered_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['car', 'format'], name='unique_heatmap_format'),
+        ]
+
+    def __str__(self):
+        return f'{self.car} {self.format}'
+
+
+class RawUpload(models.Model):
+    """An uploaded .prn file, stored once compressed under its SHA-256 (see archive.py)."""
+    GZIP = 'gz'
+    ZSTD = 'zst'
+    COMPRESSION_CHOICES = [(GZIP, 'gzip'), (ZSTD, 'zstd')]
+
+    digest = models.CharField(max_length=64, unique=True)
+    compression = models.CharField(max_length=3, choices=COMPRESSION_CHOICES)
+    size = models.PositiveIntegerField()
+    stored_size = models.PositiveIntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return self.digest[:12]
+
+
+class RawUploadEntry(models.Model):
+    """Manifest entry: one upload of an archived file and the body it was stored as."""
+    raw = models.ForeignKey(RawUpload, on_delete=models.PROTECT, related_name='entries')
+    car = models.ForeignKey(CarData, on_delete=models.SET_NULL, null=True, blank=True, related_name='raw_uploads')
+    body_no = models.CharField(max_length=50)
+    date = models.DateField()
+    filename = models.CharField(max_length=255, blank=True)
+    uploaded_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name_plural = 'raw upload entries'
+        indexes = [
+            models.Index(fields=['body_no', 'date'], name='raw_entry_body_date'),
+        ]
+
+    def __str__(self):
+        return f'{self.body_no} {self.date} ({self.raw})'
+
+
+class MeasurementSession(models.Model):
+    """Gauge, operator and point times of a body's measurement (see throughput.py)."""
+    car = models.OneToOneField(CarData, on_delete=models.CASCADE, related_name='session')
+    gauge = models.CharField(max_length=50, blank=True)
+    operator = models.CharField(max_length=50, blank=True)
+    job = models.CharField(max_length=50, blank=True)
+    started_at = models.DateTimeField()
+    finished_at = models.DateTimeField()
+    points = models.PositiveSmallIntegerField()
+    # Seconds spent measuring, leaving out breaks between points
+    active_seconds = models.PositiveIntegerField()
+    # Seconds from started_at to each point, packed as little-endian int32
+    point_offsets = models.BinaryField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['started_at', 'gauge', 'operator'], name='session_started_gauge'),
+        ]
+
+    def __str__(self):
+        return f'{self.car} by {self.operator or "?"} on {self.gauge or "?"}'
+
+
+class ThroughputDaily(models.Model):
+    """Measuring throughput of one operator on one gauge for a day, refreshed at ingest."""
+    day = models.DateField()
+    gauge = models.CharField(max_length=50, blank=True)
+    operator = models.CharField(max_length=50, blank=True)
+    bodies = models.PositiveIntegerField(default=0)
+    points = models.PositiveIntegerField(default=0)
+    active_seconds = models.PositiveIntegerField(default=0)
+    first_started_at = models.DateTimeField(null=True)
+    last_finished_at = models.DateTimeField(null=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['day', 'gauge', 'operator'], name='unique_throughput_daily'),
+        ]
+
+    def __str__(self):
+        return f'{self.day} {self.gauge} {self.operator}'
+
+    @property
+    def utilisation(self):
+        """Share of the time from the first to the last measurement spent measuring."""
+        if self.first_started_at is None:
+            return None
+        span = (self.last_finished_at - self.first_started_at).total_seconds()
+        return self.active_seconds / span if span > 0 else None
+
+
+class PointTiming(models.Model):
+    """Running sums of the time taken to reach and measure each point from the previous one."""
+    point = models.PositiveSmallIntegerField(unique=True)
+    count = models.PositiveIntegerField(default=0)
+    total = models.FloatField(default=0)
+    total_sq = models.FloatField(default=0)
+
+    def __str__(self):
+        return f'Point {self.point}'
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else None
+
+    @property
+    def std(self):
+        if self.count < 2:
+            return None
+        variance = (self.total_sq - self.total * self.total / self.count) / (self.count - 1)
+        return max(variance, 0.0) ** 0.5
@@ -0,0 +1,95 @@
+"""
+Numeric copy of the stored readings.
+
+CarData keeps readings as text, so comparing, sorting or aggregating them
+means casting every value. CarReadings holds the same readings as floats,
+one row per body. Ingest writes it next to CarData, and the convert_readings
+command fills it in for bodies stored before it existed. The command works
+in batches of a few hundred rows, each its own short transaction that
+converts the rows after the checkpoint's last id and moves the checkpoint
+on, so it can be stopped and resumed and uploads carry on between batches.
+Once a batch comes back short the checkpoint is finished, every body has
+its numeric row, and `converted()` tells readers to use CarReadings.
+
+Until the cut-over below is complete, the CarData text columns remain the
+source of truth and CarReadings is a copy derived from them. The readings
+are therefore stored twice. `convert_readings --restart` rebuilds the copy
+from the text. Ingest and the admin only store text that parses as a
+number (see readings.parse_reading), so the copy holds what the text says.
+The cut-over:
+
+1. Run convert_readings until it finishes. readings.rows and series.py
+   then read CarReadings.
+2. Move the readers that still read the text columns to CarReadings:
+   CarData.readings() (rollups, drift, heat-maps), export, journal and
+   tiering.
+3. A migration then drops the reading columns from CarData. Ingest, the
+   admin and replay write CarReadings only, which ends the double storage.
+"""
+import logging
+
+from django.utils import timezone
+
+from . import bulk, lines, readings
+from .models import BackfillCheckpoint, CarData, CarReadings, READING_FIELDS
+
+logger = logging.getLogger(__name__)
+
+CHECKPOINT = 'car_readings'
+BATCH_SIZE = 500
+
+
+def store(rows):
+    """Upsert the CarReadings of (car id, stored reading strings) pairs."""
+    bulk.upsert_values(
+        CarReadings,
+        [(car_id,) + readings.to_floats(values) for car_id, values in rows],
+        unique_fields=['car'], update_fields=READING_FIELDS,
+    )
+
+
+def store_car(car):
+    """Write the numeric readings of a saved CarData."""
+    store([(car.pk, [getattr(car, field) for field in READING_FIELDS])])
+
+
+def checkpoint():
+    return BackfillCheckpoint.objects.filter(name=CHECKPOINT).first()
+
+
+def converted(using=None):
+    """Whether every stored body has its CarReadings row."""
+    checkpoints = BackfillCheckpoint.objects.using(using) if using else BackfillCheckpoint.objects
+    return checkpoints.filter(name=CHECKPOINT, finished_at__isnull=False).exists()
+
+
+def restart():
+    """Convert every body again from the start, e.g. after CarData rows were changed outside ingest."""
+    BackfillCheckpoint.objects.filter(name=CHECKPOINT).delete()
+
+
+@lines.atomic
+def convert_batch(batch_size=BATCH_SIZE):
+    """
+    Convert the next `batch_size` bodies after the checkpoint.
+
+    The CarData rows are read and converted in the same transaction, so an
+    upload cannot change one in between. Returns the checkpoint.
+    """
+    progress, _ = BackfillCheckpoint.objects.select_for_update().get_or_create(name=CHECKPOINT)
+    if progress.finished_at is not None:
+        return progress
+    rows = list(
+        CarData.objects.select_for_update().filter(id__gt=progress.last_id).order_by('id')
+        .values_list('id', *READING_FIELDS)[:batch_size]
+    )
+    store((row[0], row[1:]) for row in rows)
+    if rows:
+        progress.last_id = rows[-1][0]
+        progress.rows += len(rows)
+    if len(rows) < batch_size:
+        progress.finished_at = timezone.now()
+        logger.info('Converted the readings of %d bodies.', progress.rows)
+    progress.save()
+    return progress
+
@@ -0,0 +1,408 @@
+"""
+Parsing and validation of the .prn files exported by the paint thickness gauge.
+
+Field offsets are not fixed: gauge firmwares differ in header columns and in
+the number and order of layer blocks, and one file mixes lines with and
+without an E-coat layer. The header columns are looked up by name and the
+layer offsets are detected from the layer names of the first line of each
+signature (header, field count, layer count), then cached, so detection runs
+once per layout rather than once per line.
+
+The gauge pads its fields to fixed widths, so once a line of a given length
+has been split and accepted, the byte offsets of the fields that are read
+are remembered too. Later lines of that length are decoded straight from
+the raw bytes at those offsets, converting only the panel, time and
+thickness fields instead of splitting the line into some sixty strings; a
+line whose commas are not where the offsets expect goes through the general
+split-based parser instead.
+"""
+import logging
+import re
+from collections import namedtuple
+from datetime import datetime
+
+from .models import POINTS
+
+logger = logging.getLogger(__name__)
+
+HEADER_PREFIX = '"Date","Time"'
+MAX_ERRORS = 20
+
+DATE_FORMAT = '%m/%d/%Y %H:%M:%S'
+
+# Header columns every firmware is expected to write, and the one after which
+# the per-layer blocks start
+HEADER_COLUMNS = ('Date', 'Time', 'Panel', 'Layers')
+# Columns read when present: the gauge's serial/revision, operator and job
+OPTIONAL_COLUMNS = ('Revision', 'Operator', 'Job Number')
+
+LineError = namedtuple('LineError', ['line', 'field', 'message'])
+# `points` and `offsets` have one entry per point, None where the point is missing
+PrnReading = namedtuple(
+    'PrnReading',
+    ['colour_code', 'primer', 'measured_at', 'points', 'gauge', 'operator', 'job', 'offsets', 'missing', 'duplicates'],
+    defaults=('', '', '', None, (), ()),
+)
+
+# Field offsets of one line layout; gauge, operator and job are None when absent
+Layout = namedtuple('Layout', [
+    'date', 'time', 'panel', 'clearcoat', 'colour', 'basecoat', 'primer', 'primer_thickness', 'gauge', 'operator', 'job',
+])
+
+
+class PrnValidationError(ValueError):
+    """Raised when a .prn file fails validation. `errors` holds LineError tuples."""
+
+    def __init__(self, errors):
+        self.errors = errors
+        first = errors[0]
+        super().__init__(f'{len(errors)} error(s), first on line {first.line}: {first.message}')
+
+
+class LayoutError(ValueError):
+    """Raised when the column layout of a line cannot be worked out."""
+
+
+def header_columns(header):
+    """Return {column name: offset} for the header columns of a .prn file."""
+    names = [name.strip('" ') for name in header.split(',')]
+    columns = {}
+    for name in HEADER_COLUMNS:
+        if name not in names:
+            raise LayoutError(f'header has no "{name}" column')
+        columns[name] = names.index(name)
+    for name in OPTIONAL_COLUMNS:
+        columns[name] = names.index(name) if name in names else None
+    return columns
+
+
+def layer_blocks(data, first):
+    """
+    Return (name, product offset, thickness offset) for each layer block of a line.
+
+    A block starts with its quoted layer name, product and code fields after an
+    unquoted field, and ends with the corrected thickness just before the next
+    block. Every block must have the same width.
+    """
+    starts = [i for i in range(first, len(data)) if data[i].startswith('"') and not data[i - 1].startswith('"')]
+    if not starts:
+        raise LayoutError('no layer blocks')
+    end = len(data)
+    while end > starts[-1] and not data[end - 1].strip():
+        end -= 1
+    bounds = starts + [end]
+    widths = {b - a for a, b in zip(bounds, bounds[1:])}
+    if len(widths) != 1:
+        raise LayoutError(f'layer blocks of differing widths {sorted(widths)}')
+    return [(data[start].strip('" '), start + 1, stop - 1) for start, stop in zip(bounds, bounds[1:])]
+
+
+def detect_layout(columns, data):
+    """
+    Work out a Layout from the layer names of a data line.
+
+    The clearcoat is the first layer named like one, the basecoat the layer
+    after it (named after the colour) and the primer the next layer named
+    like one; the colour code and primer name are those layers' products.
+    """
+    blocks = layer_blocks(data, columns['Layers'] + 1)
+    names = [name.lower() for name, _, _ in blocks]
+    clear = next((i for i, name in enumerate(names) if 'clear' in name), None)
+    if clear is None or clear + 2 >= len(blocks):
+        raise LayoutError(f'no clearcoat followed by basecoat and primer in layers {[b[0] for b in blocks]}')
+    primer = next((i for i in range(clear + 2, len(blocks)) if 'prim' in names[i]), None)
+    if primer is None:
+        raise LayoutError(f'no primer after the basecoat in layers {[b[0] for b in blocks]}')
+    base = clear + 1
+    return Layout(
+        date=columns['Date'],
+        time=columns['Time'],
+        panel=columns['Panel'],
+        clearcoat=blocks[clear][2],
+        colour=blocks[base][1],
+        basecoat=blocks[base][2],
+        primer=blocks[primer][1],
+        primer_thickness=blocks[primer][2],
+        gauge=columns['Revision'],
+        operator=columns['Operator'],
+        job=columns['Job Number'],
+    )
+
+
+# Layouts by signature: (header line, field count, layer count)
+_layouts = {}
+
+
+def register(signature, layout):
+    """Use a fixed layout for lines with this signature instead of detecting one."""
+    _layouts[signature] = layout
+    _fixed.clear()
+
+
+def layout_for(header, columns, data):
+    """Return the Layout for a data line, detecting it on the first line of each signature."""
+    signature = (header, len(data), data[columns['Layers']].strip() if len(data) > columns['Layers'] else None)
+    layout = _layouts.get(signature)
+    if layout is None:
+        layout = _layouts[signature] = detect_layout(columns, data)
+        logger.info('Detected .prn layout %s for %d fields and %s layers.', layout, signature[1], signature[2])
+    return layout
+
+
+# Byte offsets of the fields read from the lines of one header and length.
+# `count` is the number of commas in the line and `commas` the offsets that
+# must hold one; `constants` holds (offset, bytes) spans that must not change
+# (the panel field around the point number, with its total, and the layer
+# count); `point`, `date` and `values` are (start, end) and `time` is the
+# start of HH:MM:SS.
+FixedLine = namedtuple('FixedLine', ['layout', 'count', 'commas', 'constants', 'point', 'date', 'time', 'values'])
+
+# {header line: {line length in bytes: FixedLine}}
+_fixed = {}
+
+
+def fixed_line(layout, columns, line):
+    """Return the FixedLine of `line`, the bytes of a data line the general parser accepted."""
+    bounds, position = [], 0
+    for field in line.split(b','):
+        bounds.append((position, position + len(field)))
+        position += len(field) + 1
+
+    def span(start, end):
+        start = max(start, 0)
+        return start, line[start:end]
+
+    panel_start, panel_end = bounds[layout.panel]
+    digits = re.search(rb'\d+', line[panel_start:panel_end])
+    point = (panel_start + digits.start(), panel_start + digits.end())
+    time_start, time_end = bounds[layout.time]
+    layers_start, layers_end = bounds[columns['Layers']]
+    read = [bounds[layout.date], (time_start, time_end)] + [bounds[field] for field in (layout.clearcoat, layout.basecoat, layout.primer_thickness)]
+    return FixedLine(
+        layout=layout,
+        count=line.count(b','),
+        commas=tuple(sorted({start - 1 for start, _ in read if start} | {end for _, end in read if end < len(line)})),
+        constants=(span(panel_start - 1, point[0]), span(point[1], panel_end + 1), span(layers_start - 1, layers_end + 1)),
+        point=point,
+        date=bounds[layout.date],
+        time=time_start + len(line[time_start:time_end]) - len(line[time_start:time_end].lstrip(b'" ')),
+        values=tuple(read[2:]),
+    )
+
+
+def decode_fixed(content, start, end, fixed):
+    """
+    Decode the data line content[start:end] at the offsets of a FixedLine.
+
+    Returns (point, (clearcoat, basecoat, primer), date field bytes, seconds
+    since midnight), or None when the line does not match the offsets or a
+    field does not convert; the caller then parses the line the general way.
+    The point total is one of the constants, so it is the learnt line's.
+    """
+    if content.count(b',', start, end) != fixed.count:
+        return None
+    for offset in fixed.commas:
+        if content[start + offset] != 44:  # ','
+            return None
+    for offset, expected in fixed.constants:
+        if not content.startswith(expected, start + offset):
+            return None
+    (clear_start, clear_end), (base_start, base_end), (primer_start, primer_end) = fixed.values
+    time = start + fixed.time
+    try:
+        point = int(content[start + fixed.point[0]:start + fixed.point[1]])
+        seconds = int(content[time:time + 2]) * 3600 + int(content[time + 3:time + 5]) * 60 + int(content[time + 6:time + 8])
+        values = (
+            float(content[start + clear_start:start + clear_end]),
+            float(content[start + base_start:start + base_end]),
+            float(content[start + primer_start:start + primer_end]),
+        )
+    except ValueError:
+        return None
+    return point, values, content[start + fixed.date[0]:start + fixed.date[1]], seconds
+
+
+def line_bounds(content):
+    """Yield the (start, end) offsets of every line of `content`, without its line break."""
+    start, size = 0, len(content)
+    while start < size:
+        end = content.find(b'\n', start)
+        if end < 0:
+            end = size
+        stop = end - 1 if end > start and content[end - 1] == 13 else end  # '\r'
+        yield start, stop
+        start = end + 1
+
+
+def parse_panel(panel_string):
+    """Parse a panel field such as 'Point 001 / 172' into (point, total)."""
+    parts = panel_string.strip('" ').split()
+    if len(parts) != 4 or parts[0] != 'Point' or parts[2] != '/':
+        raise ValueError(f'unrecognised panel {panel_string.strip()!r}')
+    return int(parts[1]), int(parts[3])
+
+
+def parse_timestamp(date, time):
+    """Parse the Date and Time fields of a line into a naive datetime."""
+    return datetime.strptime(date.strip('" ') + ' ' + time.strip('" '), DATE_FORMAT)
+
+
+def _seconds(time):
+    """Seconds since midnight of an HH:MM:SS field."""
+    time = time.strip('" ')
+    if len(time) != 8 or time[2] != ':' or time[5] != ':':
+        raise ValueError(time)
+    return int(time[:2]) * 3600 + int(time[3:5]) * 60 + int(time[6:])
+
+
+def _text(data, field):
+    return data[field].strip('" ') if field is not None else ''
+
+
+def format_reading(value):
+    """Format a thickness the way the gauge writes it (three decimals)."""
+    return f'{value:.3f}'
+
+
+def parse(content, max_errors=MAX_ERRORS):
+    """
+    Validate and parse a .prn file, given as bytes (or text), in a single pass.
+
+    Values are placed by the point number of their panel field, not by line
+    order; a panel total other than POINTS is an error. Returns a PrnReading
+    whose `points` holds one (clearcoat, basecoat, primer) float tuple per
+    point of the panel total and `offsets` the seconds from the first line
+    to each point, both None for points not in the file.
+    `missing` lists those points and `duplicates` the points measured more
+    than once, of which the last reading is kept. `measured_at` is the naive
+    timestamp of the first line; gauge, operator and job are taken from it.
+    Raises PrnValidationError with per-line errors, giving up once
+    `max_errors` have been collected.
+    """
+    if isinstance(content, str):
+        content = content.encode('utf-8')
+    errors = []
+    lines = line_bounds(content)
+    header_start, header_end = next(lines, (0, 0))
+    if not content.startswith(HEADER_PREFIX.encode(), header_start):
+        raise PrnValidationError([LineError(1, None, 'missing "Date","Time",... header')])
+    try:
+        header = content[header_start:header_end].decode('utf-8')
+        columns = header_columns(header)
+    except (UnicodeDecodeError, LayoutError) as e:
+        raise PrnValidationError([LineError(1, None, str(e))])
+
+    colour_code = primer = measured_at = None
+    gauge = operator = job = ''
+    days = {}
+    first_seconds = 0
+    expected_total = None
+    values_by_point = {}
+    offsets_by_point = {}
+    duplicates = []
+    fixed_lines = _fixed.setdefault(header, {})
+    lineno = 1
+    for lineno, (start, end) in enumerate(lines, start=2):
+        # Until a line has set the colour and the point total, every line takes the general parser
+        fixed = fixed_lines.get(end - start) if colour_code is not None and expected_total is not None else None
+        decoded = decode_fixed(content, start, end, fixed) if fixed is not None else None
+        if decoded is not None:
+            point, values, date, seconds = decoded
+            if 1 <= point <= expected_total and date in days:
+                if point in values_by_point:
+                    duplicates.append(point)
+                values_by_point[point] = values
+                offsets_by_point[point] = days[date] * 86400 + seconds - first_seconds
+                continue
+
+        # General parser: split the whole line
+        try:
+            line = content[start:end].decode('utf-8')
+        except UnicodeDecodeError as e:
+            errors.append(LineError(lineno, None, f'not valid text: {e}'))
+            line = ''
+        if not line.strip():
+            if len(errors) >= max_errors:
+                break
+            continue
+
+        data = line.split(',')
+        try:
+            layout = layout_for(header, columns, data)
+        except LayoutError as e:
+            errors.append(LineError(lineno, None, f'unrecognised layout with {len(data)} fields: {e}'))
+        else:
+            point = None
+            try:
+                point, total = parse_panel(data[layout.panel])
+            except ValueError as e:
+                errors.append(LineError(lineno, layout.panel, str(e)))
+            else:
+                if total != POINTS:
+                    # CarData has a column per point of the POINTS-point panel and no more
+                    errors.append(LineError(lineno, layout.panel, f'point total {total} is not {POINTS}'))
+                    point = None
+                elif not 1 <= point <= total:
+                    errors.append(LineError(lineno, layout.panel, f'point {point} outside 1-{total}'))
+                    point = None
+                else:
+                    expected_total = total
+
+            try:
+                values = (float(data[layout.clearcoat]), float(data[layout.basecoat]), float(data[layout.primer_thickness]))
+            except ValueError:
+                for field in (layout.clearcoat, layout.basecoat, layout.primer_thickness):
+                    try:
+                        float(data[field])
+                    except ValueError:
+                        errors.append(LineError(lineno, field, f'not a number: {data[field].strip()!r}'))
+            else:
+                if colour_code is None:
+                    colour_code = data[layout.colour].strip('" ')
+                    primer = data[layout.primer].strip('" ')
+                    gauge, operator, job = _text(data, layout.gauge), _text(data, layout.operator), _text(data, layout.job)
+                # Seconds since the first line; dates are parsed once per day
+                seconds = None
+                try:
+                    date = data[layout.date]
+                    day = days.get(date.encode())
+                    if day is None:
+                        day = days[date.encode()] = parse_timestamp(date, '00:00:00').toordinal()
+                    seconds = day * 86400 + _seconds(data[layout.time])
+                except ValueError:
+                    errors.append(LineError(lineno, layout.date, f'bad date/time: {data[layout.date]} {data[layout.time]}'))
+                else:
+                    if measured_at is None:
+                        measured_at = parse_timestamp(date, data[layout.time])
+                        first_seconds = seconds
+                if point is not None:
+                    if point in values_by_point:
+                        duplicates.append(point)
+                    values_by_point[point] = values
+                    offsets_by_point[point] = seconds - first_seconds if seconds is not None else None
+                    if seconds is not None and end - start not in fixed_lines:
+                        fixed_lines[end - start] = fixed_line(layout, columns, content[start:end])
+
+        if len(errors) >= max_errors:
+            break
+
+    if not errors:
+        if not values_by_point:
+            errors.append(LineError(lineno, None, 'no data lines'))
+        elif not colour_code:
+            errors.append(LineError(2, None, 'empty colour code'))
+
+    if errors:
+        raise PrnValidationError(errors)
+
+    numbers = range(1, expected_total + 1)
+    missing = [point for point in numbers if point not in values_by_point]
+    if missing or duplicates:
+        logger.info('Parsed %d of %d points, missing %s, repeated %s.', len(values_by_point), expected_total, missing, duplicates)
+    return PrnReading(
+        colour_code, primer, measured_at,
+        [values_by_point.get(point) for point in numbers],
+        gauge, operator, job,
+        [offsets_by_point.get(point) for point in numbers],
+        missing, sorted(set(duplicates)),
+    )
@@ -0,0 +1,290 @@
+"""
+On-demand request profiling.
+
+ProfilingMiddleware profiles requests and stores what it finds under
+PELTLOADER_PROFILE_ROOT. PELTLOADER_PROFILING says which requests:
+
+- 'off' (the default): the middleware takes itself out of the stack at
+  startup, so requests pay nothing for it.
+- 'header': requests sending an X-Profile header, a comma-separated list of
+  a profiler ('cprofile' or 'sample', else PELTLOADER_PROFILER) and
+  'memory' to trace memory too; 'memory' alone traces memory only. They
+  must also send PELTLOADER_PROFILE_SECRET in an X-Profile-Key header, as
+  profiling slows a request down several times over; without a secret the
+  middleware takes itself out of the stack as for 'off'. The middleware
+  runs before sessions and authentication, so it cannot ask for staff.
+- 'always': every request, with PELTLOADER_PROFILER, tracing memory if
+  PELTLOADER_PROFILE_MEMORY is set.
+
+'cprofile' records every call and is saved as a .prof file for pstats or
+snakeviz; it about doubles the time an upload takes. 'sample' looks at the
+request thread's stack every PELTLOADER_PROFILE_INTERVAL seconds from a
+helper thread and saves collapsed stacks ('frame;frame count' lines, for
+flame-graph tools), adding around a tenth. Memory tracing with tracemalloc
+records the request's peak memory and where the memory still held at the
+end was allocated; it is the most expensive, an upload taking four to five
+times as long, so it is asked for separately. tracemalloc is process-wide,
+so one request is profiled at a time and others meanwhile run as usual.
+
+Each profile gets a .json summary next to its artifact, and its name is
+sent back in an X-Profile-Id header. The profile_index view lists them for
+staff; beyond PELTLOADER_PROFILE_KEEP the oldest are removed.
+"""
+import cProfile
+import hmac
+import json
+import logging
+import os
+import re
+import sys
+import threading
+import time
+import tracemalloc
+import uuid
+from collections import Counter
+from pathlib import Path
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+OFF = 'off'
+HEADER = 'header'
+ALWAYS = 'always'
+PROFILERS = ('cprofile', 'sample')
+# Functions and allocation sites listed in a summary
+TOP = 25
+NAME_RE = re.compile(r'^[0-9]{8}-[0-9]{6}-[0-9a-f]{8}$')
+
+_lock = threading.Lock()
+
+
+def mode():
+    return getattr(settings, 'PELTLOADER_PROFILING', OFF)
+
+
+def secret():
+    return getattr(settings, 'PELTLOADER_PROFILE_SECRET', '')
+
+
+def default_profiler():
+    return getattr(settings, 'PELTLOADER_PROFILER', 'cprofile')
+
+
+def storage_root():
+    return Path(getattr(settings, 'PELTLOADER_PROFILE_ROOT', 'uploads/profiles'))
+
+
+def sample_interval():
+    return getattr(settings, 'PELTLOADER_PROFILE_INTERVAL', 0.005)
+
+
+def keep():
+    return getattr(settings, 'PELTLOADER_PROFILE_KEEP', 50)
+
+
+def _frame_name(code):
+    return f'{os.path.basename(code.co_filename)}:{code.co_name}'
+
+
+class Sampler:
+    """Count the stacks of one thread, looked at every `interval` seconds from a helper thread."""
+
+    def __init__(self, thread_id, interval):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='profile-sampler', daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            names = []
+            while frame is not None:
+                names.append(_frame_name(frame.f_code))
+                frame = frame.f_back
+            if names:
+                self.stacks[';'.join(reversed(names))] += 1
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def collapsed(self):
+        return ''.join(f'{stack} {count}\n' for stack, count in self.stacks.most_common())
+
+    def top(self):
+        """The TOP functions by samples taken in them, with the samples taken in them or below."""
+        total, own = Counter(), Counter()
+        for stack, count in self.stacks.items():
+            names = stack.split(';')
+            own[names[-1]] += count
+            for name in set(names):
+                total[name] += count
+        return [{'function': name, 'own_samples': count, 'samples': total[name]} for name, count in own.most_common(TOP)]
+
+
+def _cprofile_top(profiler):
+    """The TOP functions by time spent in them, leaving out what they called."""
+    profiler.create_stats()
+    rows = sorted(profiler.stats.items(), key=lambda item: item[1][2], reverse=True)[:TOP]
+    return [
+        {
+            'function': f'{os.path.basename(filename)}:{line}({name})',
+            'calls': calls,
+            'own_seconds': round(own, 6),
+            'seconds': round(cumulative, 6),
+        }
+        for (filename, line, name), (_, calls, own, cumulative, _) in rows
+    ]
+
+
+def index():
+    """Return the summaries of the stored profiles, newest first."""
+    root = storage_root()
+    if not root.is_dir():
+        return []
+    profiles = []
+    for path in sorted(root.glob('*.json'), reverse=True):
+        try:
+            profiles.append(json.loads(path.read_text()))
+        except (OSError, ValueError):
+            logger.warning('Unreadable profile summary %s.', path)
+    return profiles
+
+
+def artifact_path(name):
+    """Return the path of a stored profile's artifact, or None."""
+    if not NAME_RE.match(name):
+        return None
+    for suffix in ('.prof', '.txt', '.json'):
+        path = storage_root() / f'{name}{suffix}'
+        if path.exists():
+            return path
+    return None
+
+
+def _prune():
+    summaries = sorted(storage_root().glob('*.json'))
+    for path in summaries[:max(len(summaries) - keep(), 0)]:
+        for stale in path.parent.glob(f'{path.stem}.*'):
+            stale.unlink(missing_ok=True)
+
+
+class ProfilingMiddleware:
+    def __init__(self, get_response):
+        if mode() == OFF:
+            raise MiddlewareNotUsed
+        if mode() == HEADER and not secret():
+            logger.warning('PELTLOADER_PROFILING is %r without a PELTLOADER_PROFILE_SECRET; no request is profiled.', HEADER)
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        options = self.options_for(request)
+        if options is None or not _lock.acquire(blocking=False):
+            return self.get_response(request)
+        try:
+            return self.profile(request, *options)
+        finally:
+            _lock.release()
+
+    def options_for(self, request):
+        """Return (profiler or None, trace memory) for `request`, or None to leave it alone."""
+        if mode() == ALWAYS:
+            return default_profiler(), getattr(settings, 'PELTLOADER_PROFILE_MEMORY', False)
+        requested = {option.strip() for option in request.headers.get('X-Profile', '').lower().split(',')} - {''}
+        if not requested:
+            return None
+        if not hmac.compare_digest(request.headers.get('X-Profile-Key', '').encode(), secret().encode()):
+            logger.warning('Refused to profile %s %s: missing or wrong X-Profile-Key.', request.method, request.path)
+            return None
+        memory = 'memory' in requested
+        profilers = [profiler for profiler in PROFILERS if profiler in requested]
+        if profilers:
+            return profilers[0], memory
+        return (None if memory and requested == {'memory'} else default_profiler()), memory
+
+    def profile(self, request, profiler, memory):
+        if memory:
+            tracing = tracemalloc.is_tracing()
+            if not tracing:
+                tracemalloc.start()
+            tracemalloc.reset_peak()
+            memory_before, _ = tracemalloc.get_traced_memory()
+        if profiler == 'sample':
+            recorder = Sampler(threading.get_ident(), sample_interval())
+            recorder.start()
+        elif profiler == 'cprofile':
+            recorder = cProfile.Profile()
+            recorder.enable()
+        else:
+            recorder = None
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            seconds = time.perf_counter() - start
+            if profiler == 'sample':
+                recorder.stop()
+            elif profiler == 'cprofile':
+                recorder.disable()
+            peak = snapshot = None
+            if memory:
+                _, peak = tracemalloc.get_traced_memory()
+                peak -= memory_before
+                snapshot = tracemalloc.take_snapshot()
+                if not tracing:
+                    tracemalloc.stop()
+
+        try:
+            name = self.save(request, response, profiler, recorder, seconds, peak, snapshot)
+        except OSError:
+            logger.exception('Could not store the profile of %s.', request.path)
+        else:
+            response['X-Profile-Id'] = name
+        return response
+
+    def save(self, request, response, profiler, recorder, seconds, peak, snapshot):
+        """Write the artifact and summary of a profiled request. Returns the profile's name."""
+        root = storage_root()
+        root.mkdir(parents=True, exist_ok=True)
+        now = timezone.now()
+        name = f'{now:%Y%m%d-%H%M%S}-{uuid.uuid4().hex[:8]}'
+        artifact, top = None, []
+        if profiler == 'sample':
+            artifact = root / f'{name}.txt'
+            artifact.write_text(recorder.collapsed())
+            top = recorder.top()
+        elif profiler == 'cprofile':
+            artifact = root / f'{name}.prof'
+            recorder.dump_stats(artifact)
+            top = _cprofile_top(recorder)
+        match = request.resolver_match
+        summary = {
+            'name': name,
+            'recorded_at': now.isoformat(),
+            'method': request.method,
+            'path': request.path,
+            'view': match.view_name if match else '',
+            'status': response.status_code,
+            'profiler': profiler or 'memory',
+            'seconds': round(seconds, 4),
+            'peak_bytes': peak,
+            'artifact': artifact.name if artifact else f'{name}.json',
+            'functions': top,
+            'retained': [
+                {'line': str(stat.traceback), 'bytes': stat.size, 'blocks': stat.count}
+                for stat in snapshot.statistics('lineno')[:TOP]
+            ] if snapshot else [],
+        }
+        (root / f'{name}.json').write_text(json.dumps(summary, indent=1))
+        _prune()
+        logger.info('Profiled %s %s with %s in %.3f s: %s.', request.method, request.path, summary['profiler'], seconds, name)
+        return name
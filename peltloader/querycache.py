@@ -0,0 +1,113 @@
+"""
+Versioned cache for per-colour report queries.
+
+A colour's reports only change when a body of that colour is stored (or its
+spec limits are edited), so each colour has a generation token and cached
+results are keyed by it. Results covering a single month, like the pieces
+of a trend series, are keyed by a token of that colour and month instead,
+so storing today's bodies leaves earlier months cached. Ingest replaces the
+token once its transaction commits; entries of the old generation are never
+read again and age out of the cache's LRU order. A repeat report load is then one small read of the
+token plus one cache hit, without touching the database.
+
+Results live in the PELTLOADER_QUERY_CACHE alias (a local-memory cache,
+which evicts least recently used entries) and the tokens in
+PELTLOADER_GENERATION_CACHE (a file cache, so every worker process sees a
+bump). Each paint line (see lines.py) has keys of its own. Hit and miss
+counts are kept per process and namespace, see stats().
+"""
+import hashlib
+import threading
+import uuid
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import caches
+
+from . import lines
+
+_MISSING = object()
+_lock = threading.Lock()
+_hits = Counter()
+_misses = Counter()
+
+
+def _results():
+    return caches[getattr(settings, 'PELTLOADER_QUERY_CACHE', 'default')]
+
+
+def _generations():
+    return caches[getattr(settings, 'PELTLOADER_GENERATION_CACHE', 'default')]
+
+
+def _prefix():
+    # Colour codes repeat across paint lines, their reports do not
+    line = lines.current()
+    return 'peltloader' if line is None else f'peltloader:line:{line}'
+
+
+def _generation_key(colour_code, month=None):
+    key = f'{_prefix()}:generation:{colour_code}'
+    return key if month is None else f'{key}:{month:%Y-%m}'
+
+
+def generation(colour_code, month=None):
+    """
+    Return the current generation token of a colour, or of one month of
+    it, starting a new one if there is none.
+    """
+    key = _generation_key(colour_code, month)
+    token = _generations().get(key)
+    if token is None:
+        # A fresh token rather than 0, so an evicted token can never make
+        # entries of an older generation current again
+        _generations().add(key, uuid.uuid4().hex, None)
+        token = _generations().get(key)
+    return token
+
+
+def bump(colour_code, date=None):
+    """
+    Start a new generation for a colour once the current transaction commits.
+
+    With `date`, the generation of its month is replaced as well; results
+    cached for other months of the colour stay current.
+    """
+    keys = [_generation_key(colour_code)]
+    if date is not None:
+        keys.append(_generation_key(colour_code, date))
+    lines.on_commit(lambda: _generations().set_many({key: uuid.uuid4().hex for key in keys}, None))
+
+
+def cached(namespace, colour_code, params, compute, month=None):
+    """
+    Return compute() for a colour's report, from the cache when possible.
+
+    `params` is anything with a stable repr (e.g. a tuple of query
+    parameters) that distinguishes results within the namespace. A result
+    given a `month` covers only bodies measured in that month and is kept
+    until a body of the colour in that month is stored.
+    """
+    digest = hashlib.md5(repr(params).encode()).hexdigest()
+    key = f'{_prefix()}:{namespace}:{colour_code}:{generation(colour_code, month)}:{digest}'
+    result = _results().get(key, _MISSING)
+    with _lock:
+        (_misses if result is _MISSING else _hits)[namespace] += 1
+    if result is _MISSING:
+        result = compute()
+        _results().set(key, result, None)
+    return result
+
+
+def stats():
+    """Return hit and miss counts of this process per namespace."""
+    with _lock:
+        namespaces = sorted(set(_hits) | set(_misses))
+        return {
+            namespace: {
+                'hits': _hits[namespace],
+                'misses': _misses[namespace],
+                'hit_rate': _hits[namespace] / (_hits[namespace] + _misses[namespace]),
+            }
+            for namespace in namespaces
+        }
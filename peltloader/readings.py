@@ -0,0 +1,115 @@
+"""
+Reading stored profiles without building CarData instances.
+
+A CarData instance has over 500 fields, and setting them all costs more than
+fetching the row, so code that reads many bodies selects the columns it needs
+with values_list and gets plain tuples: one value per reading in
+READING_FIELDS order (point by point, clearcoat, basecoat, primer), as floats
+or `missing`; they are read from the numeric CarReadings copy once that is
+complete. `array` returns the same readings as a numpy array of shape
+(bodies, POINTS, len(LAYERS)) with NaN where a reading is missing. The
+benchmark_reads command compares these with CarData.objects.all().
+
+Ingest and the admin only store readings `parse_reading` accepts, decimal
+numbers. Text stored before that was checked which is not a number is read
+as a missing reading.
+"""
+import math
+import re
+from collections import namedtuple
+from functools import lru_cache
+
+from . import numeric
+from .models import CarData, LAYERS, POINTS, READING_FIELDS, READING_KEYS
+from .routers import reports_db
+
+BODY_FIELDS = ('id', 'body_no', 'date', 'colour_code')
+# The readings of a CarData queryset's CarReadings
+NUMERIC_FIELDS = [f'numeric__{field}' for field in READING_FIELDS]
+DECIMAL_RE = re.compile(r'^\s*[+-]?(\d+\.?\d*|\.\d+)\s*$')
+
+
+def parse_reading(text):
+    """Return a stored reading as a float, None if it is empty. Raises ValueError unless it is a decimal number."""
+    if text in (None, ''):
+        return None
+    if not DECIMAL_RE.match(text):
+        raise ValueError(f'{text!r} is not a decimal number.')
+    return float(text)
+
+
+def _to_float(text, missing):
+    try:
+        value = parse_reading(text)
+    except ValueError:
+        return missing
+    return missing if value is None else value
+
+
+def to_floats(values, missing=None):
+    """Convert a sequence of stored reading strings to floats, `missing` for empty or non-numeric ones."""
+    try:
+        floats = tuple(map(float, values))
+    except (TypeError, ValueError):
+        # Some reading is None, '' or not a number
+        return tuple(_to_float(v, missing) for v in values)
+    # float() also takes 'nan' and 'inf'
+    return floats if all(map(math.isfinite, floats)) else tuple(_to_float(v, missing) for v in values)
+
+
+def triples(values):
+    """Yield (point, layer, value) for every present value, like CarData.readings()."""
+    for (point, layer, _), value in zip(READING_KEYS, values):
+        if value is not None:
+            yield point, layer, value
+
+
+def _queryset(queryset):
+    return CarData.objects.using(reports_db()) if queryset is None else queryset
+
+
+def rows(queryset=None, fields=BODY_FIELDS, missing=None, chunk_size=2000):
+    """
+    Yield (*fields, values) for each body of `queryset` (default: every body, on the reports connection).
+
+    Once the readings have been converted (see numeric.py) they are read from
+    CarReadings as floats instead of being converted here.
+    """
+    queryset = _queryset(queryset)
+    n = len(fields)
+    if numeric.converted(queryset.db):
+        for row in queryset.values_list(*fields, *NUMERIC_FIELDS).iterator(chunk_size=chunk_size):
+            values = row[n:]
+            yield row[:n] + (values if missing is None else tuple(missing if v is None else v for v in values),)
+        return
+    for row in queryset.values_list(*fields, *READING_FIELDS).iterator(chunk_size=chunk_size):
+        yield row[:n] + (to_floats(row[n:], missing),)
+
+
+@lru_cache
+def record_type(fields):
+    return namedtuple('Body', fields + ('values',))
+
+
+def records(queryset=None, fields=BODY_FIELDS, missing=None, chunk_size=2000):
+    """Like `rows`, as namedtuples with the fields as attributes and the readings as `values`."""
+    record = record_type(tuple(fields))
+    for row in rows(queryset, fields, missing, chunk_size):
+        yield record._make(row)
+
+
+def array(queryset=None, fields=BODY_FIELDS, chunk_size=2000):
+    """
+    Return (list of field tuples, readings) for the bodies of `queryset`.
+
+    `readings` is a float64 array of shape (bodies, POINTS, len(LAYERS)),
+    indexed [body, point - 1, LAYERS.index(layer)], NaN where missing.
+    """
+    import numpy as np
+
+    nan = float('nan')
+    meta, values = [], []
+    for *body, profile in rows(queryset, fields, nan, chunk_size):
+        meta.append(tuple(body))
+        values.append(profile)
+    return meta, np.array(values, dtype=np.float64).reshape(len(values), POINTS, len(LAYERS))
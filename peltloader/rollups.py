@@ -0,0 +1,115 @@
+"""
+Daily and weekly PointRollup tables.
+
+Ingest adds each body's readings to the rollups for its date, and removes a
+re-measured body's old readings first, so reports read a few hundred
+summary rows instead of scanning CarData. `rebuild` recomputes everything
+from the stored bodies of both tiers (see the rebuild_rollups command), and
+journal.replay from the ingest journal.
+"""
+import json
+import logging
+from datetime import timedelta
+
+from . import bulk, lines, tiering
+from .models import PointRollup, READING_FIELDS, READING_KEYS
+
+logger = logging.getLogger(__name__)
+
+
+def period_starts(date):
+    """Return {period: start date} for the periods containing `date`."""
+    return {
+        PointRollup.DAY: date,
+        PointRollup.WEEK: date - timedelta(days=date.weekday()),
+    }
+
+
+def _accumulate(rollup, value, sign):
+    rollup.count += sign
+    rollup.total += sign * value
+    rollup.total_sq += sign * value * value
+    bucket = str(int(value // PointRollup.HISTOGRAM_BIN))
+    n = rollup.histogram.get(bucket, 0) + sign
+    if n > 0:
+        rollup.histogram[bucket] = n
+    else:
+        rollup.histogram.pop(bucket, None)
+
+
+def apply(colour_code, date, readings, sign=1):
+    """Add (sign=1) or remove (sign=-1) one body's (point, layer, value) readings."""
+    for period, start in period_starts(date).items():
+        existing = {
+            (r.point, r.layer): r
+            for r in PointRollup.objects.filter(period=period, period_start=start, colour_code=colour_code)
+        }
+        for point, layer, value in readings:
+            rollup = existing.get((point, layer))
+            if rollup is None:
+                rollup = existing[(point, layer)] = PointRollup(period=period, period_start=start, colour_code=colour_code, point=point, layer=layer, histogram={})
+            _accumulate(rollup, value, sign)
+        save(existing.values())
+
+
+def save(rollups):
+    """Write rollups back with one INSERT ... ON CONFLICT DO UPDATE on their unique key."""
+    bulk.upsert(
+        PointRollup, rollups,
+        unique_fields=['period', 'period_start', 'colour_code', 'point', 'layer'],
+        update_fields=['count', 'total', 'total_sq', 'histogram'],
+    )
+
+
+def add(table, colour_code, date, values):
+    """
+    Add one body's READING_FIELDS-ordered values to a table being rebuilt (see `replace`).
+
+    The table keeps plain per-field lists for each period and colour rather
+    than PointRollup instances, which makes a full rebuild several times faster.
+    """
+    width = len(READING_FIELDS)
+    bin_width = PointRollup.HISTOGRAM_BIN
+    present = [(i, value, value * value, int(value // bin_width)) for i, value in enumerate(values) if value is not None]
+    for period, start in period_starts(date).items():
+        sums = table.get((period, start, colour_code))
+        if sums is None:
+            sums = table[(period, start, colour_code)] = ([0] * width, [0.0] * width, [0.0] * width, [{} for _ in range(width)])
+        counts, totals, squares, histograms = sums
+        for i, value, square, bucket in present:
+            counts[i] += 1
+            totals[i] += value
+            squares[i] += square
+            histogram = histograms[i]
+            histogram[bucket] = histogram.get(bucket, 0) + 1
+
+
+def replace(table):
+    """Replace every stored rollup with those of a table built by `add`. Returns how many were written."""
+    rows = []
+    for (period, start, colour_code), (counts, totals, squares, histograms) in table.items():
+        for i, (point, layer, _) in enumerate(READING_KEYS):
+            if counts[i]:
+                histogram = json.dumps({str(bucket): n for bucket, n in sorted(histograms[i].items())})
+                rows.append((period, start.isoformat(), colour_code, point, layer, counts[i], totals[i], squares[i], histogram))
+    PointRollup.objects.all().delete()
+    for i in range(0, len(rows), 2000):
+        bulk.upsert_values(
+            PointRollup, rows[i:i + 2000],
+            unique_fields=['period', 'period_start', 'colour_code', 'point', 'layer'],
+            update_fields=['count', 'total', 'total_sq', 'histogram'],
+        )
+    return len(rows)
+
+
+@lines.atomic
+def rebuild():
+    """Recompute all rollups from the stored bodies, archived ones included. Returns the number of bodies read."""
+    table = {}
+    count = 0
+    for body in tiering.profiles():
+        add(table, body.colour_code, body.date, body.values)
+        count += 1
+    written = replace(table)
+    logger.info('Rebuilt %d rollups from %d bodies.', written, count)
+    return count
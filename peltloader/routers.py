@@ -0,0 +1,78 @@
+"""
+Database routing for paint lines, the read-only reports connections and the cold stores.
+
+Every peltloader model lives in the database of the current paint line
+(see lines.py), 'default' when there is none. Reporting code reads through
+`reports_db()` explicitly: routers only see the model, and ingest must keep
+reading its own writes on the line's database. The router keeps migrations
+and writes off the reports aliases. Archived bodies (ColdBody, see
+tiering.py) live in the line's cold database, and nothing else does; a
+line's database holds nothing but peltloader's tables.
+"""
+from django.conf import settings
+
+from . import lines
+
+REPORTS = 'reports'
+COLD = 'cold'
+COLD_MODELS = {'peltloader.coldbody'}
+
+
+def line_db():
+    """Alias of the current line's database, 'default' without a line."""
+    return lines.database()
+
+
+def _reports_alias(db):
+    return REPORTS if db == 'default' else f'{db}_{REPORTS}'
+
+
+def _cold_alias(db):
+    return COLD if db == 'default' else f'{db}_{COLD}'
+
+
+def _line_dbs():
+    return {'default', *lines.configured().values()}
+
+
+def reports_db():
+    """Alias to run reporting queries on, falling back to the line's database if not configured."""
+    alias = _reports_alias(line_db())
+    return alias if alias in settings.DATABASES else line_db()
+
+
+def cold_db():
+    """Alias holding the line's archived bodies, falling back to the line's database if not configured."""
+    alias = _cold_alias(line_db())
+    return alias if alias in settings.DATABASES else line_db()
+
+
+class ReportRouter:
+    def db_for_read(self, model, **hints):
+        if model._meta.label_lower in COLD_MODELS:
+            return cold_db()
+        return line_db() if model._meta.app_label == 'peltloader' else None
+
+    def db_for_write(self, model, **hints):
+        if model._meta.label_lower in COLD_MODELS:
+            return cold_db()
+        # Objects read for a report are saved back through their line's database
+        instance = hints.get('instance')
+        if instance is not None:
+            readers = {_reports_alias(db): db for db in _line_dbs()}
+            if instance._state.db in readers:
+                return readers[instance._state.db]
+        return line_db() if model._meta.app_label == 'peltloader' else None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        dbs = _line_dbs()
+        if db in {_reports_alias(line) for line in dbs}:
+            return False
+        cold = model_name is not None and f'{app_label}.{model_name}' in COLD_MODELS
+        if db in {_cold_alias(line) for line in dbs}:
+            return cold
+        if cold:
+            return _cold_alias(db) not in settings.DATABASES
+        if db != 'default' and db in dbs:
+            return app_label == 'peltloader'
+        return None
@@ -0,0 +1,132 @@
+"""
+Downsampled trend series of one reading.
+
+A year of one point's clearcoat thickness for a colour is thousands of
+bodies, while a chart a few hundred pixels wide cannot show more than a few
+hundred of them. `series` returns at most `threshold` of the actual
+measurements, chosen to keep the shape of the curve: Largest-Triangle-
+Three-Buckets (the default), or the lowest and highest of equal time
+buckets, which keeps every spike.
+
+The full series is read a month at a time and each month is cached with
+querycache under the generation of that colour and month, so only a month
+in which a body of the colour is stored is read again: a year-long chart
+costs twelve cache reads and the downsampling, not a scan. A month is read
+over the (colour_code, date) index of CarData, from the numeric copy once
+that is complete, and from the cold database for archived bodies.
+"""
+from collections import namedtuple
+from datetime import datetime, time, timedelta
+
+from django.utils import timezone
+
+from . import numeric, querycache, tiering
+from .models import CarData, ColdBody, READING_FIELDS
+from .routers import reports_db
+
+LTTB = 'lttb'
+MINMAX = 'minmax'
+METHODS = (LTTB, MINMAX)
+# One body's value: seconds since the epoch, the same as an ISO time stamp, date, body number, value
+Point = namedtuple('Point', ['x', 't', 'date', 'body_no', 'value'])
+
+
+def months(start, end):
+    """Yield the first day of every month from `start` to `end`."""
+    month = start.replace(day=1)
+    while month <= end:
+        yield month
+        month = (month + timedelta(days=32)).replace(day=1)
+
+
+def _point(day, measured_at, body_no, value):
+    # Bodies without a gauge time stamp are placed at the start of their date
+    when = measured_at or timezone.make_aware(datetime.combine(day, time()))
+    return Point(when.timestamp(), when.isoformat(), day, body_no, value)
+
+
+def _read_month(colour_code, field, month):
+    """Return the Points of `field` for the bodies of a colour measured in a month, in time order."""
+    end = (month + timedelta(days=32)).replace(day=1)
+    hot = CarData.objects.using(reports_db()).filter(colour_code=colour_code, date__gte=month, date__lt=end)
+    column = f'numeric__{field}' if numeric.converted(hot.db) else field
+    points, seen = [], set()
+    for day, measured_at, body_no, value in hot.values_list('date', 'measured_at', 'body_no', column).iterator(chunk_size=2000):
+        seen.add((body_no, day))
+        if value not in (None, ''):
+            points.append(_point(day, measured_at, body_no, float(value)))
+
+    index = READING_FIELDS.index(field)
+    cold = ColdBody.objects.filter(colour_code=colour_code, date__gte=month, date__lt=end)
+    for day, measured_at, body_no, packed in cold.values_list('date', 'measured_at', 'body_no', 'readings').iterator(chunk_size=500):
+        if (body_no, day) not in seen:
+            value = tiering.unpack(packed)[index]
+            if value is not None:
+                points.append(_point(day, measured_at, body_no, value))
+    points.sort()
+    return points
+
+
+def month_points(colour_code, field, month):
+    """The cached Points of `field` for a colour's bodies measured in the month starting on `month`."""
+    return querycache.cached('series', colour_code, (field,), lambda: _read_month(colour_code, field, month), month=month)
+
+
+def lttb(points, threshold):
+    """Keep `threshold` of time-ordered points with Largest-Triangle-Three-Buckets."""
+    n = len(points)
+    if threshold >= n or threshold < 3:
+        return list(points)
+    sampled = [points[0]]
+    # The points between the first and the last are split into threshold - 2 buckets
+    every = (n - 2) / (threshold - 2)
+    previous = points[0]
+    for i in range(threshold - 2):
+        start, stop = int(i * every) + 1, int((i + 1) * every) + 1
+        following = points[stop:min(int((i + 2) * every) + 1, n)] or points[-1:]
+        mean_x = sum(p.x for p in following) / len(following)
+        mean_y = sum(p.value for p in following) / len(following)
+        # The point of this bucket making the largest triangle with the
+        # point kept before it and the mean of the next bucket
+        chosen = max(
+            points[start:stop],
+            key=lambda p: abs((previous.x - mean_x) * (p.value - previous.value) - (previous.x - p.x) * (mean_y - previous.value)),
+        )
+        sampled.append(chosen)
+        previous = chosen
+    sampled.append(points[-1])
+    return sampled
+
+
+def minmax(points, threshold):
+    """Keep the lowest and highest of time-ordered points in each of threshold // 2 equal time buckets."""
+    n = len(points)
+    if threshold >= n:
+        return list(points)
+    buckets = max(threshold // 2, 1)
+    first = points[0].x
+    width = (points[-1].x - first) / buckets or 1
+    extremes = {}
+    for p in points:
+        bucket = min(int((p.x - first) / width), buckets - 1)
+        low, high = extremes.get(bucket, (p, p))
+        extremes[bucket] = (p if p.value < low.value else low, p if p.value > high.value else high)
+    sampled = []
+    for bucket in sorted(extremes):
+        low, high = extremes[bucket]
+        sampled.extend([low] if low is high else sorted((low, high)))
+    return sampled
+
+
+def series(colour_code, field, start, end, threshold=500, method=LTTB):
+    """
+    Return (number of measurements, downsampled Points) of `field` for the
+    bodies of a colour measured from `start` to `end`, both dates included.
+    """
+    points = []
+    for month in months(start, end):
+        points.extend(month_points(colour_code, field, month))
+    # The first and last month may reach beyond the range
+    points = [p for p in points if start <= p.date <= end]
+    downsample = minmax if method == MINMAX else lttb
+    return len(points), downsample(points, threshold)
@@ -0,0 +1,195 @@
+"""
+In-process nearest-neighbour index over stored thickness profiles.
+
+Each body is a vector of its 172 x 3 readings, a missing reading standing
+in at its colour's running mean (see drift.py) so that it adds no distance
+of its own. The index keeps the vectors in one float32 matrix with
+precomputed squared norms, so a query is a single matrix-vector product plus
+a partial sort. It is built from CarData on first use and extended at
+ingest. Before each query it catches up with what other workers wrote: new
+rows by id, and re-measured bodies through the ingest journal (see
+journal.py), whose entries it reads past the last one it has seen. Bodies
+archived or deleted since are dropped from the index when a query finds
+them among its nearest and looks further. Each paint line (see lines.py)
+has an index of its own.
+"""
+import logging
+import threading
+
+from . import lines, readings
+from .models import CarData, JournalEntry, PointStatistics, READING_FIELDS, READING_KEYS
+from .routers import reports_db
+
+logger = logging.getLogger(__name__)
+
+DIMENSIONS = len(READING_FIELDS)
+
+
+class ProfileIndex:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._size = 0
+        self._max_id = 0
+        self._journal_id = 0  # last JournalEntry read
+        self._positions = {}  # car id -> row in the matrix
+        self._colour_ids = {}  # colour code -> small int
+        self._means = {}  # colour code -> mean per reading, for missing readings
+        self._matrix = None
+        self._norms = None
+        self._ids = None
+        self._colours = None
+
+    def __len__(self):
+        return self._size
+
+    def _grow(self, capacity):
+        import numpy as np
+
+        matrix = np.zeros((capacity, DIMENSIONS), dtype=np.float32)
+        norms = np.zeros(capacity, dtype=np.float32)
+        ids = np.zeros(capacity, dtype=np.int64)
+        colours = np.full(capacity, -1, dtype=np.int32)
+        if self._size:
+            matrix[:self._size] = self._matrix[:self._size]
+            norms[:self._size] = self._norms[:self._size]
+            ids[:self._size] = self._ids[:self._size]
+            colours[:self._size] = self._colours[:self._size]
+        self._matrix, self._norms, self._ids, self._colours = matrix, norms, ids, colours
+
+    def _colour_means(self, colour_code):
+        means = self._means.get(colour_code)
+        if means is None:
+            stats = {
+                (point, layer): mean
+                for point, layer, mean in PointStatistics.objects.using(reports_db())
+                .filter(colour_code=colour_code).values_list('point', 'layer', 'mean')
+            }
+            means = self._means[colour_code] = [stats.get((point, layer), 0.0) for point, layer, _ in READING_KEYS]
+        return means
+
+    def _put(self, car_id, colour_code, values):
+        """Add or replace a body's row; `values` in READING_FIELDS order, None where missing."""
+        import numpy as np
+
+        if None in values:
+            values = [mean if value is None else value for value, mean in zip(values, self._colour_means(colour_code))]
+        position = self._positions.get(car_id)
+        if position is None:
+            if self._matrix is None or self._size == len(self._matrix):
+                self._grow(max(1024, 2 * self._size))
+            position = self._size
+            self._positions[car_id] = position
+            self._size += 1
+        vector = np.asarray(values, dtype=np.float32)
+        self._matrix[position] = vector
+        self._norms[position] = vector @ vector
+        self._ids[position] = car_id
+        self._colours[position] = self._colour_ids.setdefault(colour_code, len(self._colour_ids))
+        self._max_id = max(self._max_id, car_id)
+
+    def _remove(self, car_id):
+        """Drop a body's row, moving the last row into its place."""
+        position = self._positions.pop(car_id, None)
+        if position is None:
+            return
+        last = self._size - 1
+        if position != last:
+            for array in (self._matrix, self._norms, self._ids, self._colours):
+                array[position] = array[last]
+            self._positions[int(self._ids[position])] = position
+        self._size = last
+
+    def _load_rows(self, queryset):
+        count = 0
+        for car_id, colour_code, values in readings.rows(queryset, fields=('id', 'colour_code')):
+            self._put(car_id, colour_code, values)
+            count += 1
+        return count
+
+    def _refresh(self):
+        """Load the index on first use, then pick up rows added and bodies re-measured since."""
+        # Colour means move with every body; they are read again at most once per query
+        self._means.clear()
+        cars = CarData.objects.using(reports_db())
+        journal = JournalEntry.objects.using(reports_db()).filter(id__gt=self._journal_id).order_by('id')
+        if not self._loaded:
+            # Read first, so that what is stored while the index loads is read again
+            self._journal_id = journal.values_list('id', flat=True).last() or 0
+            count = self._load_rows(cars.order_by('id'))
+            self._loaded = True
+            logger.info('Similarity index built with %d bodies.', count)
+            return
+        changed = set()
+        for entry_id, body_no, date in journal.values_list('id', 'body_no', 'date'):
+            changed.add((body_no, date))
+            self._journal_id = entry_id
+        if changed:
+            bodies = {body_no for body_no, _ in changed}
+            stored = cars.filter(body_no__in=bodies, id__lte=self._max_id).values_list('id', 'body_no', 'date')
+            ids = [car_id for car_id, body_no, date in stored if (body_no, date) in changed]
+            if ids:
+                self._load_rows(cars.filter(id__in=ids))
+        self._load_rows(cars.filter(id__gt=self._max_id).order_by('id'))
+
+    def add(self, car):
+        """Add or replace the profile of a saved CarData."""
+        with self._lock:
+            if self._loaded:
+                self._put(car.id, car.colour_code, readings.to_floats([getattr(car, field) for field in READING_FIELDS]))
+
+    def discard(self, car_id):
+        """Drop the profile of a deleted body."""
+        with self._lock:
+            self._remove(car_id)
+
+    def _nearest(self, vector, k, colour_code, exclude):
+        import numpy as np
+
+        q = np.asarray(vector, dtype=np.float32)
+        # ||x - q||^2 = ||x||^2 - 2 x.q + ||q||^2
+        distances = self._norms[:self._size] - 2 * (self._matrix[:self._size] @ q) + q @ q
+        if colour_code is not None:
+            colour_id = self._colour_ids.get(colour_code)
+            distances[self._colours[:self._size] != colour_id] = np.inf
+        if exclude is not None and exclude in self._positions:
+            distances[self._positions[exclude]] = np.inf
+
+        k = min(k, self._size)
+        nearest = np.argpartition(distances, k - 1)[:k]
+        nearest = nearest[np.argsort(distances[nearest])]
+        return [
+            (int(self._ids[i]), float(np.sqrt(max(distances[i], 0.0))))
+            for i in nearest if np.isfinite(distances[i])
+        ]
+
+    def query(self, vector, k=10, colour_code=None, exclude=None):
+        """Return up to k (car_id, distance) pairs nearest to `vector`, closest first."""
+        with self._lock:
+            self._refresh()
+            while self._size:
+                matches = self._nearest(vector, k, colour_code, exclude)
+                ids = [car_id for car_id, _ in matches]
+                stored = set(CarData.objects.using(reports_db()).filter(id__in=ids).values_list('id', flat=True))
+                if len(stored) == len(ids):
+                    return matches
+                # Archived or deleted since they were loaded
+                for car_id in set(ids) - stored:
+                    self._remove(car_id)
+            return []
+
+    def vector_for(self, car_id):
+        with self._lock:
+            self._refresh()
+            position = self._positions.get(car_id)
+            return None if position is None else self._matrix[position].copy()
+
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def index():
+    """Return the index of the current line's bodies."""
+    with _indexes_lock:
+        return _indexes.setdefault(lines.current(), ProfileIndex())
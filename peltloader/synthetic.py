@@ -0,0 +1,37 @@
+"""Synthetic .prn files in the gauge's format, for stress and load testing."""
+import random
+from datetime import datetime, timedelta
+
+HEADER = '"Date","Time","Revision","Operator","Job Number","Panel","Samples","Atten","Grade","Layers",'
+LINE = (
+    '"{date}","{time}",3200805.00,"{operator:<15}","{job:<15}","Point {point:03d} / {points}",0,17,"{grade:<15}",4,'
+    '"Melinex        ","10 mils        ","H2OGLY  ",0.00,0.00,     0., 0.000,  0.000,'
+    '"Clearcoat      ","O2100          ","NPA     ",0.00,0.00, 84414.,{c_raw:6.3f}, {c:6.3f},'
+    '"Synthetic      ","{colour:<15}","NPA     ",0.00,0.00, 87526.,{b_raw:6.3f}, {b:6.3f},'
+    '"Dk Grey Prime  ","{primer:<15}","NPA     ",0.00,0.00, 94027.,{p_raw:6.3f}, {p:6.3f},'
+    '"E-Coat         ","ED6670ZR       ","PKAF    ",0.00,0.00,106599.,13.918, 18.842,'
+    '"Steel          ","none           ","none    ",0.00,0.00,     0., 0.000,  0.000,'
+)
+NOMINAL = (48.0, 14.0, 40.0)  # clearcoat, basecoat, primer
+
+
+def colour_profile(colour_code, points=172):
+    """A repeatable per-point nominal profile for a colour."""
+    rng = random.Random(colour_code)
+    return [tuple(n + rng.uniform(-4, 4) for n in NOMINAL) for _ in range(points)]
+
+
+def make_prn(colour_code='8X5', primer='OP100 DG', points=172, start=None, operator='Synthetic', job='synthetic', noise=1.0, rng=None):
+    """Return the text of a .prn file for one body measured from `start`."""
+    rng = rng or random
+    start = start or datetime.now()
+    lines = [HEADER, '']
+    for point, nominal in enumerate(colour_profile(colour_code, points), start=1):
+        when = start + timedelta(seconds=6 * point)
+        c, b, p = (max(0.0, n + rng.gauss(0, noise)) for n in nominal)
+        lines.append(LINE.format(
+            date=when.strftime('%m/%d/%Y'), time=when.strftime('%H:%M:%S'), operator=operator, job=job,
+            point=point, points=points, grade=rng.randint(50, 80), colour=colour_code, primer=primer,
+            c_raw=c * 0.93, c=c, b_raw=b * 0.9, b=b, p_raw=p * 0.84, p=p,
+        ))
+    return '\n'.join(lines) + '\n'
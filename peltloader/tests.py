@@ -1,3 +1,775 @@
-from django.test import TestCase
+import io
+import math
+import random
+import shutil
+import statistics
+import tempfile
+import warnings
+from datetime import date, datetime, timedelta
 
-# Create your tests here.
+import numpy
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.core.exceptions import MiddlewareNotUsed, ValidationError
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import connection, connections
+from django.forms.models import model_to_dict
+from django.http import HttpResponse
+from django.test import LiveServerTestCase, RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from . import archive, baselines, capability, drift, heatmap, ingest, journal, lines, numeric, prn, profiling, querycache, routers, series, similarity, synthetic, throughput, tiering
+from .forms import CarDataAdminForm
+from .management.commands import stress_reports
+from .models import BodyDeviation, CarData, CarDataVersion, CarReadings, ColdBody, ColourBaseline, ColourSequence, DriftAlarm, HeatMap, JournalEntry, MeasurementSession, POINTS, PointRollup, PointStatistics, PointTiming, RawUpload, RawUploadEntry, READING_FIELDS, SpecLimit, ThroughputDaily
+
+START = datetime(2024, 3, 4, 8, 0, 0)
+DAY = date(2024, 3, 4)
+
+
+def make_prn(**kwargs):
+    kwargs.setdefault('start', START)
+    kwargs.setdefault('rng', random.Random(1))
+    return synthetic.make_prn(**kwargs)
+
+
+def without_points(content, points):
+    """Drop the data lines of `points` from a .prn file."""
+    panels = {f'"Point {point:03d} / ' for point in points}
+    return ''.join(line for line in content.splitlines(keepends=True) if not any(panel in line for panel in panels))
+
+
+class ParseTests(SimpleTestCase):
+    def errors(self, content):
+        with self.assertRaises(prn.PrnValidationError) as raised:
+            prn.parse(content)
+        return raised.exception.errors
+
+    def test_parses_every_point(self):
+        reading = prn.parse(make_prn(colour_code='1G3'))
+        self.assertEqual(reading.colour_code, '1G3')
+        self.assertEqual(reading.measured_at, datetime(2024, 3, 4, 8, 0, 6))
+        self.assertEqual(len(reading.points), POINTS)
+        self.assertNotIn(None, reading.points)
+        self.assertEqual((reading.missing, reading.duplicates), ([], []))
+
+    def test_missing_header(self):
+        errors = self.errors(make_prn().split('\n', 1)[1])
+        self.assertEqual([(error.line, error.field) for error in errors], [(1, None)])
+
+    def test_bad_thickness_is_reported_with_its_line(self):
+        lines = make_prn().split('\n')
+        fields = lines[4].split(',')
+        fields[25] = 'n/a'
+        lines[4] = ','.join(fields)
+        errors = self.errors('\n'.join(lines))
+        self.assertEqual([(error.line, error.field) for error in errors], [(5, 25)])
+        self.assertIn('not a number', errors[0].message)
+
+    def test_rejects_another_point_total(self):
+        errors = self.errors(make_prn(points=200))
+        self.assertEqual(errors[0].line, 3)
+        self.assertIn(f'is not {POINTS}', errors[0].message)
+
+    def test_stops_at_max_errors(self):
+        errors = self.errors(make_prn().replace(' / 172"', ' / 17x"'))
+        self.assertEqual(len(errors), prn.MAX_ERRORS)
+
+    def test_missing_and_repeated_points(self):
+        content = without_points(make_prn(), [5, 6])
+        lines = content.split('\n')
+        content = '\n'.join(lines + [lines[2]])
+        reading = prn.parse(content)
+        self.assertEqual(reading.missing, [5, 6])
+        self.assertEqual(reading.duplicates, [1])
+        self.assertIsNone(reading.points[4])
+
+    def test_short_line_is_an_error(self):
+        lines = make_prn().split('\n')
+        lines[6] = ','.join(lines[6].split(',')[:10])
+        errors = self.errors('\n'.join(lines))
+        self.assertEqual([error.line for error in errors], [7])
+
+    def test_bad_first_panel_after_fixed_offsets_are_learnt(self):
+        # A valid file teaches the parser this header's fixed offsets
+        prn.parse(make_prn())
+        content = make_prn().replace('"Point 001 / 172"', '"Point 0x1 / 172"', 1)
+        errors = self.errors(content)
+        self.assertEqual([(error.line, error.field) for error in errors], [(3, 5)])
+
+
+class DriftTests(SimpleTestCase):
+    def settled(self):
+        return PointStatistics(colour_code='8X5', point=1, layer='C', count=100, target_mean=50.0, target_std=1.0, ewma=50.0)
+
+    def kinds(self, stats, values):
+        config = drift.get_config()
+        return [[kind for kind, _ in drift._check(stats, x, config)] for x in values]
+
+    def test_ewma_alarms_once_per_excursion(self):
+        stats = self.settled()
+        kinds = self.kinds(stats, [55.0] * 5 + [50.0] * 10 + [55.0] * 3)
+        ewma = [i for i, raised in enumerate(kinds) if DriftAlarm.EWMA in raised]
+        self.assertEqual(ewma, [1, 16])
+
+    def test_stationary_readings_raise_no_alarm(self):
+        stats = self.settled()
+        rng = random.Random(1)
+        self.assertEqual(sum(map(len, self.kinds(stats, [rng.gauss(50.0, 1.0) for _ in range(500)]))), 0)
+
+    def test_target_waits_for_the_warmup(self):
+        stats = PointStatistics(colour_code='8X5', point=1, layer='C')
+        for i in range(drift.get_config()['warmup']):
+            drift._add(stats, 50.0 + i % 3)
+            self.assertEqual(drift._check(stats, 50.0 + i % 3, drift.get_config()), [])
+        self.assertIsNotNone(stats.target_mean)
+
+
+@override_settings(PELTLOADER_PROFILING='header', PELTLOADER_PROFILE_SECRET='s3cret')
+class ProfilingTests(SimpleTestCase):
+    def options(self, **headers):
+        middleware = profiling.ProfilingMiddleware(lambda request: HttpResponse())
+        return middleware.options_for(RequestFactory().get('/', headers=headers))
+
+    def test_header_needs_the_secret(self):
+        with self.assertLogs('peltloader.profiling', 'WARNING'):
+            self.assertIsNone(self.options(x_profile='cprofile'))
+        with self.assertLogs('peltloader.profiling', 'WARNING'):
+            self.assertIsNone(self.options(x_profile='cprofile', x_profile_key='guess'))
+        self.assertEqual(self.options(x_profile='sample,memory', x_profile_key='s3cret'), ('sample', True))
+
+    @override_settings(PELTLOADER_PROFILE_SECRET='')
+    def test_header_mode_without_a_secret_is_off(self):
+        with self.assertLogs('peltloader.profiling', 'WARNING'), self.assertRaises(MiddlewareNotUsed):
+            profiling.ProfilingMiddleware(lambda request: HttpResponse())
+
+
+class HeatMapTests(SimpleTestCase):
+    def test_deviations_skip_readings_without_a_spread(self):
+        car = CarData(**{'1C': '50.0', '1B': '20.0', '1P': '30.0', '2C': '52.0'})
+        reference = {(1, 'C'): (48.0, 2.0), (1, 'B'): (20.0, 0.0), (1, 'P'): (30.0, float('nan')), (2, 'C'): (50.0, None)}
+        self.assertEqual(heatmap.deviations(car, reference), {(1, 'C'): 1.0})
+
+    def test_svg_escapes_the_body_number(self):
+        car = CarData(body_no='<script>alert(1)</script>', colour_code='8X5&"')
+        svg = heatmap.render_svg(car, {}).decode()
+        self.assertNotIn('<script>', svg)
+        self.assertIn('&lt;script&gt;alert(1)&lt;/script&gt; (8X5&amp;") against baseline', svg)
+
+
+@override_settings(PELTLOADER_QUERY_CACHE='default', PELTLOADER_GENERATION_CACHE='default', PELTLOADER_LINES={'paint2': 'default'})
+class QueryCacheTests(TestCase):
+    def setUp(self):
+        caches['default'].clear()
+        self.computed = []
+
+    def cached(self, colour_code, month=None):
+        def compute():
+            self.computed.append((lines.current(), colour_code, month))
+            return len(self.computed)
+
+        return querycache.cached('test', colour_code, ('params',), compute, month=month)
+
+    def test_bump_replaces_only_that_colour_and_month(self):
+        march, april = date(2024, 3, 1), date(2024, 4, 1)
+        keys = [('8X5', None), ('8X5', march), ('8X5', april), ('1G3', march)]
+        first = {key: self.cached(*key) for key in keys}
+        self.assertEqual({key: self.cached(*key) for key in keys}, first)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            querycache.bump('8X5', date(2024, 3, 4))
+        self.computed.clear()
+        again = {key: self.cached(*key) for key in keys}
+        self.assertEqual([(colour, month) for _, colour, month in self.computed], [('8X5', None), ('8X5', march)])
+        self.assertEqual(again[('8X5', april)], first[('8X5', april)])
+        self.assertEqual(again[('1G3', march)], first[('1G3', march)])
+
+    def test_lines_have_keys_of_their_own(self):
+        self.assertEqual(querycache._generation_key('8X5'), 'peltloader:generation:8X5')
+        self.cached('8X5')
+        with lines.using('paint2'):
+            self.assertEqual(querycache._generation_key('8X5'), 'peltloader:line:paint2:generation:8X5')
+            self.cached('8X5')
+            self.cached('8X5')
+            with self.captureOnCommitCallbacks(execute=True):
+                querycache.bump('8X5')
+        # Bumped on paint2 only
+        self.cached('8X5')
+        self.assertEqual(self.computed, [(None, '8X5', None), ('paint2', '8X5', None)])
+
+
+class DownsampleTests(SimpleTestCase):
+    def points(self, n=1000):
+        values = [50.0 + math.sin(i / 40) for i in range(n)]
+        values[637] = 80.0
+        return [series.Point(float(i * 60), '', DAY, f'B{i}', value) for i, value in enumerate(values)]
+
+    def test_lttb_keeps_the_ends_and_the_cap(self):
+        points = self.points()
+        sampled = series.lttb(points, 100)
+        self.assertEqual(len(sampled), 100)
+        self.assertEqual((sampled[0], sampled[-1]), (points[0], points[-1]))
+        self.assertEqual(sampled, sorted(sampled))
+        self.assertIn(points[637], sampled)
+        self.assertEqual(series.lttb(points[:50], 100), points[:50])
+
+    def test_minmax_keeps_spikes_within_the_cap(self):
+        points = self.points()
+        points[200] = points[200]._replace(value=20.0)
+        sampled = series.minmax(points, 100)
+        self.assertLessEqual(len(sampled), 100)
+        self.assertEqual(sampled, sorted(sampled))
+        self.assertIn(points[637], sampled)
+        self.assertIn(points[200], sampled)
+
+
+class RouterTests(SimpleTestCase):
+    router = routers.ReportRouter()
+
+    @override_settings(PELTLOADER_LINES={'paint2': 'paint2'})
+    def test_a_line_alias_takes_only_peltloader_tables(self):
+        allow = self.router.allow_migrate
+        self.assertTrue(allow('paint2', 'peltloader', 'cardata'))
+        self.assertFalse(allow('paint2', 'auth', 'user'))
+        self.assertFalse(allow('paint2', 'contenttypes', 'contenttype'))
+        # Without a cold store of its own, archived bodies stay in the line's database
+        self.assertTrue(allow('paint2', 'peltloader', 'coldbody'))
+        self.assertIsNone(allow('default', 'auth', 'user'))
+
+    def test_cold_and_reports_aliases(self):
+        allow = self.router.allow_migrate
+        self.assertTrue(allow('cold', 'peltloader', 'coldbody'))
+        self.assertFalse(allow('cold', 'peltloader', 'cardata'))
+        self.assertFalse(allow('default', 'peltloader', 'coldbody'))
+        self.assertFalse(allow('reports', 'peltloader', 'cardata'))
+
+    @override_settings(PELTLOADER_LINES={'paint2': 'paint2'})
+    def test_queries_follow_the_current_line(self):
+        self.assertEqual(self.router.db_for_read(CarData), 'default')
+        with lines.using('paint2'):
+            self.assertEqual((self.router.db_for_read(CarData), self.router.db_for_write(CarData)), ('paint2', 'paint2'))
+            self.assertEqual(self.router.db_for_read(ColdBody), 'paint2')
+            self.assertIsNone(self.router.db_for_read(User))
+        with self.assertRaises(ValueError):
+            with lines.using('paint3'):
+                pass
+
+
+class StorageMixin:
+    databases = {'default', 'cold'}
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.root = tempfile.mkdtemp()
+        cls.enterClassContext(override_settings(
+            PELTLOADER_ARCHIVE_ROOT=cls.root,
+            PELTLOADER_HEATMAP_ROOT=cls.root,
+            PELTLOADER_HEATMAP_BACKGROUND=False,
+            PELTLOADER_EXCEL_EXPORT=False,
+            PELTLOADER_GENERATION_CACHE='default',
+        ))
+        cls.addClassCleanup(shutil.rmtree, cls.root, ignore_errors=True)
+
+    def store(self, body_no, content, day=DAY):
+        return ingest.store_reading(prn.parse(content), body_no, day, url='http://example.com/', raw=content.encode())
+
+    def rollup_counts(self):
+        return dict(PointRollup.objects.filter(period=PointRollup.DAY).values_list('point', 'count').filter(layer='C'))
+
+
+class StorageTestCase(StorageMixin, TestCase):
+    pass
+
+
+class StoreReadingTests(StorageTestCase):
+    def test_remeasure_keeps_the_sequence_and_a_version(self):
+        first, created = self.store('B1', make_prn())
+        self.assertTrue(created)
+        self.store('B2', make_prn())
+        again, created = self.store('B1', make_prn(rng=random.Random(2)))
+        self.assertFalse(created)
+        self.assertEqual(again.pk, first.pk)
+        self.assertEqual(CarData.objects.get(pk=first.pk).sequence, 1)
+        self.assertEqual(CarData.objects.get(body_no='B2').sequence, 2)
+        self.assertEqual(CarDataVersion.objects.filter(car_id=first.pk).count(), 1)
+        # The replaced readings are taken out of the rollups again
+        self.assertEqual(set(self.rollup_counts().values()), {2})
+
+    def test_partial_remeasure_merges_the_skipped_points(self):
+        self.store('B1', make_prn())
+        before = CarData.objects.get(body_no='B1')
+        self.store('B1', without_points(make_prn(rng=random.Random(2)), range(1, 101)))
+        after = CarData.objects.get(body_no='B1')
+        self.assertEqual(after.missing_points, [])
+        self.assertEqual(getattr(after, '50C'), getattr(before, '50C'))
+        self.assertNotEqual(getattr(after, '150C'), getattr(before, '150C'))
+        self.assertTrue(JournalEntry.objects.filter(body_no='B1').latest('id').merged)
+        self.assertEqual(getattr(CarReadings.objects.get(car=after), '1C'), float(getattr(after, '1C')))
+
+    def test_another_colour_gets_a_new_sequence(self):
+        self.store('B1', make_prn(colour_code='8X5'))
+        car, _ = self.store('B1', make_prn(colour_code='1G3'))
+        self.assertEqual((car.colour_code, car.sequence), ('1G3', 1))
+        self.assertEqual(CarData.objects.count(), 1)
+
+
+class UploadTests(StorageTestCase):
+    def upload(self, content, body_no='B1'):
+        upload = SimpleUploadedFile('body.prn', content.encode())
+        return self.client.post(reverse('upload_file'), {'body_no': body_no, 'date': '2024-03-04', 'file': upload})
+
+    def test_valid_file_is_stored(self):
+        self.assertRedirects(self.upload(make_prn()), reverse('success'), fetch_redirect_response=False)
+        self.assertTrue(CarData.objects.filter(body_no='B1', date=DAY).exists())
+
+    def test_invalid_file_reports_its_lines_and_stores_nothing(self):
+        response = self.upload(make_prn().replace('"Point 002 / 172"', '"Point 0x2 / 172"'))
+        self.assertContains(response, 'File failed validation.')
+        self.assertEqual([error.line for error in response.context['line_errors']], [4])
+        self.assertFalse(CarData.objects.exists())
+        self.assertFalse(JournalEntry.objects.exists())
+
+
+class EditTests(StorageTestCase):
+    def rollup(self, point=1, layer='C'):
+        return PointRollup.objects.get(period=PointRollup.DAY, point=point, layer=layer)
+
+    def test_edit_replaces_the_derived_state(self):
+        car, _ = self.store('B1', make_prn())
+        self.store('B2', make_prn(rng=random.Random(2)))
+        total = self.rollup().total
+        stored = getattr(car, '1C')
+        old = float(stored)
+        setattr(car, '1C', '99.0')
+        ingest.store_edit(car)
+
+        self.assertAlmostEqual(self.rollup().total, total - old + 99.0)
+        self.assertEqual(self.rollup().count, 2)
+        self.assertEqual(getattr(CarReadings.objects.get(car=car), '1C'), 99.0)
+        self.assertEqual(CarDataVersion.objects.get(car=car).readings['1C'], stored)
+        self.assertEqual(JournalEntry.objects.latest('id').source, JournalEntry.ADMIN)
+        stats = PointStatistics.objects.get(colour_code=car.colour_code, point=1, layer='C')
+        self.assertEqual(stats.count, 2)
+        self.assertAlmostEqual(stats.mean, (total - old + 99.0) / 2)
+
+    def test_delete_takes_the_body_out(self):
+        car, _ = self.store('B1', make_prn())
+        self.store('B2', make_prn(rng=random.Random(2)))
+        ingest.delete_car(car)
+
+        self.assertFalse(CarData.objects.filter(body_no='B1').exists())
+        self.assertEqual(set(self.rollup_counts().values()), {1})
+        self.assertEqual(set(PointStatistics.objects.filter(layer='C').values_list('count', flat=True)), {1})
+        self.assertEqual(JournalEntry.objects.latest('id').source, JournalEntry.DELETE)
+
+
+class NumericTests(StorageTestCase):
+    def setUp(self):
+        self.cars = [self.store(f'B{i}', make_prn(rng=random.Random(i)))[0] for i in range(5)]
+        # As if stored before CarReadings existed
+        CarReadings.objects.all().delete()
+        numeric.restart()
+
+    def test_batches_resume_from_the_checkpoint_and_finish(self):
+        progress = numeric.convert_batch(batch_size=2)
+        self.assertEqual((progress.rows, progress.last_id, progress.finished_at), (2, self.cars[1].pk, None))
+        self.assertFalse(numeric.converted())
+
+        output = io.StringIO()
+        call_command('convert_readings', '--batch-size', '2', '--max-batches', '1', '--pause', '0', stdout=output)
+        self.assertIn('Stopping; run again to continue.', output.getvalue())
+        self.assertEqual(numeric.checkpoint().rows, 4)
+
+        call_command('convert_readings', '--batch-size', '2', '--pause', '0', stdout=io.StringIO())
+        progress = numeric.checkpoint()
+        self.assertEqual((progress.rows, progress.last_id), (5, self.cars[-1].pk))
+        self.assertIsNotNone(progress.finished_at)
+        self.assertTrue(numeric.converted())
+        self.assertEqual(CarReadings.objects.count(), 5)
+        self.assertEqual(getattr(CarReadings.objects.get(car=self.cars[2]), '7B'), float(getattr(self.cars[2], '7B')))
+
+        output = io.StringIO()
+        call_command('convert_readings', stdout=output)
+        self.assertIn('Already converted (5 bodies)', output.getvalue())
+
+    def test_text_that_is_not_a_number_is_missing(self):
+        CarData.objects.filter(pk=self.cars[0].pk).update(**{'1C': 'n/a', '2C': 'nan'})
+        numeric.convert_batch()
+        numbers = CarReadings.objects.get(car=self.cars[0])
+        self.assertEqual((getattr(numbers, '1C'), getattr(numbers, '2C')), (None, None))
+
+    def test_edits_must_be_numbers(self):
+        data = model_to_dict(self.cars[0])
+        data.update({'1C': 'n/a', '1B': ' 21.5'})
+        form = CarDataAdminForm(data=data, instance=self.cars[0])
+        self.assertFalse(form.is_valid())
+        self.assertEqual(list(form.errors), ['1C'])
+        self.assertEqual(form.cleaned_data['1B'], '21.500')
+
+        car = CarData.objects.get(pk=self.cars[0].pk)
+        setattr(car, '1C', 'n/a')
+        with self.assertRaises(ValidationError):
+            ingest.store_edit(car)
+
+
+class ThroughputTests(StorageTestCase):
+    def test_offsets_round_trip(self):
+        offsets = [0, 6, None, -1, 2 ** 31 - 1]
+        self.assertEqual(throughput.unpack(throughput.pack(offsets)), offsets)
+
+    def test_intervals_skip_missing_points(self):
+        self.assertEqual(list(throughput.intervals([0, 6, None, 20, 26])), [(2, 6), (5, 6)])
+
+    @override_settings(PELTLOADER_BREAK_SECONDS=60)
+    def test_breaks_and_clock_steps_are_not_active(self):
+        self.assertEqual(throughput.active_seconds([0, 6, 66, 127, 130, 120]), 6 + 60 + 3)
+
+    def test_daily_totals(self):
+        self.store('B1', make_prn())
+        car, _ = self.store('B2', make_prn(start=START + timedelta(hours=1)))
+        daily = ThroughputDaily.objects.get(day=DAY)
+        self.assertEqual((daily.bodies, daily.points, daily.active_seconds), (2, 2 * POINTS, 2 * (POINTS - 1) * 6))
+        self.assertEqual(daily.first_started_at.replace(tzinfo=None), START + timedelta(seconds=6))
+        self.assertEqual(PointTiming.objects.get(point=2).count, 2)
+
+        ingest.delete_car(car)
+        daily = ThroughputDaily.objects.get(day=DAY)
+        self.assertEqual((daily.bodies, daily.points), (1, POINTS))
+        self.assertEqual(PointTiming.objects.get(point=2).count, 1)
+
+
+class AdminTests(StorageTestCase):
+    def changelist_queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('admin:peltloader_cardata_changelist'))
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_changelist_queries_do_not_grow_with_the_bodies(self):
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'admin'))
+        self.store('B1', make_prn())
+        few = self.changelist_queries()
+        for i in range(2, 6):
+            self.store(f'B{i}', make_prn(rng=random.Random(i)))
+        self.assertEqual(self.changelist_queries(), few)
+        self.assertContains(self.client.get(reverse('admin:peltloader_cardata_changelist')), '5 cars ago')
+
+
+class StressCleanupTests(StorageTestCase):
+    def test_clean_up_leaves_what_real_bodies_wrote(self):
+        self.store('B1', make_prn())
+        timings = list(PointTiming.objects.order_by('point').values_list('count', 'total'))
+        daily = list(ThroughputDaily.objects.values_list('day', 'operator', 'bodies', 'points'))
+        for i in range(6):
+            self.store(f'stress-{i}', make_prn(colour_code='STRESS', rng=random.Random(i)))
+        stress_reports.Command().clean_up('STRESS')
+
+        for model in (CarData, JournalEntry, BodyDeviation, ColourBaseline, PointRollup, PointStatistics, DriftAlarm, ColourSequence):
+            self.assertFalse(model.objects.filter(colour_code='STRESS').exists(), model.__name__)
+        self.assertEqual(MeasurementSession.objects.count(), 1)
+        self.assertEqual(list(ThroughputDaily.objects.values_list('day', 'operator', 'bodies', 'points')), daily)
+        for (count, total), (expected_count, expected_total) in zip(PointTiming.objects.order_by('point').values_list('count', 'total'), timings):
+            self.assertEqual(count, expected_count)
+            self.assertAlmostEqual(total, expected_total)
+
+
+class LoadTestTests(StorageMixin, LiveServerTestCase):
+    def test_uploads_to_a_live_server(self):
+        output = io.StringIO()
+        # One client: the live server's threads share the in-memory test database's one connection
+        call_command('loadtest', '--url', self.live_server_url + reverse('upload_file'), '--clients', '1', '--uploads', '4', '--window', '2', '--seed', '1', stdout=output)
+        self.assertIn('total 4 uploads', output.getvalue())
+        self.assertIn('errors 0.0%', output.getvalue())
+        self.assertEqual(CarData.objects.filter(body_no__startswith='load-').count(), 4)
+
+
+@override_settings(PELTLOADER_BASELINE_BODIES=12, PELTLOADER_BASELINE_REFRESH=4)
+class BaselineTests(StorageTestCase):
+    def test_refreshes_get_rarer_while_the_window_fills(self):
+        versions = []
+        for i in range(20):
+            self.store(f'B{i}', make_prn(rng=random.Random(i), noise=1.0))
+            versions.append(ColourBaseline.objects.values_list('version', flat=True).first())
+        self.assertEqual(versions[:4], [None] * 4)
+        # Refreshed at 5 to 8 bodies, then after every 2 and, with the window full, every 4
+        self.assertEqual(versions[4:], [1, 2, 3, 4, 4, 5, 5, 6, 6, 6, 6, 7, 7, 7, 7, 8])
+
+    def test_deviation_between_refreshes_matches_a_refresh(self):
+        for i in range(13):
+            car, _ = self.store(f'B{i}', make_prn(rng=random.Random(i), noise=1.0))
+        baseline = ColourBaseline.objects.get()
+        stored = BodyDeviation.objects.get(car=car)
+        self.assertEqual(stored.baseline_version, baseline.version)
+        self.assertGreater(baseline.pending, 0)
+        values = numpy.array([[float(getattr(car, field)) for field in READING_FIELDS]])
+        expected = baselines.deviations(values, baselines._array(baseline.median), baselines._array(baseline.spread))[0]
+        self.assertEqual(tiering.unpack(stored.deviations), tiering.unpack(tiering.pack_array(expected)))
+        self.assertAlmostEqual(stored.worst, float(numpy.nanmax(numpy.abs(expected))), places=9)
+        self.assertAlmostEqual(stored.rms, float(numpy.sqrt(numpy.nanmean(expected * expected))), places=9)
+
+
+class ReplayTests(StorageTestCase):
+    def test_replay_rebuilds_cars_and_rollups(self):
+        self.store('B1', make_prn())
+        self.store('B2', make_prn(rng=random.Random(2)))
+        self.store('B1', without_points(make_prn(rng=random.Random(3)), [7]))
+        cars = {car['body_no']: car for car in CarData.objects.values('body_no', 'sequence', *READING_FIELDS)}
+        rollups = self.rollup_counts()
+
+        CarData.objects.all().delete()
+        PointRollup.objects.all().delete()
+        self.assertEqual(journal.replay(targets=('cars', 'rollups')), 2)
+
+        self.assertEqual({car['body_no']: car for car in CarData.objects.values('body_no', 'sequence', *READING_FIELDS)}, cars)
+        self.assertEqual(self.rollup_counts(), rollups)
+        self.assertEqual(CarReadings.objects.count(), 2)
+
+    def test_deleted_bodies_stay_deleted(self):
+        deleted, _ = self.store('B1', make_prn())
+        self.store('B2', make_prn(rng=random.Random(2)))
+        kept, _ = self.store('B3', make_prn(rng=random.Random(3)))
+        for car in (deleted, kept):
+            journal.record_deletion(car)
+        CarData.objects.filter(pk=kept.pk).delete()
+        # Stored again after its deletion
+        self.store('B3', make_prn(rng=random.Random(4)))
+
+        self.assertEqual(journal.replay(targets=('cars', 'rollups')), 2)
+        self.assertEqual(sorted(CarData.objects.values_list('body_no', flat=True)), ['B2', 'B3'])
+        self.assertEqual(set(self.rollup_counts().values()), {2})
+
+    def test_unknown_target(self):
+        with self.assertRaises(ValueError):
+            journal.replay(targets=('cars', 'nothing'))
+
+
+class ArchiveTests(StorageTestCase):
+    def test_upload_round_trip(self):
+        content = make_prn().encode()
+        raw = archive.store(content)
+        self.assertEqual(archive.read(raw), content)
+        self.assertEqual(archive.store(content).pk, raw.pk)
+        self.assertEqual(RawUpload.objects.count(), 1)
+
+    def test_pack_round_trip(self):
+        values = (12.345, None, 0.0, 48.001)
+        self.assertEqual(tiering.unpack(tiering.pack(values)), values)
+
+
+class TierTests(StorageMixin, TransactionTestCase):
+    # Committed, so the reports connection reads the hot tier too
+    databases = {'default', 'reports', 'cold'}
+
+    def test_archived_body_round_trip(self):
+        self.store('B1', make_prn())
+        car, _ = self.store('B1', make_prn(rng=random.Random(2)))
+        stored = [float(getattr(car, field)) for field in READING_FIELDS]
+        images = [heatmap.path_for(image) for image in HeatMap.objects.all()]
+        self.assertTrue(images)
+        self.assertEqual(tiering.archive(before=date(2024, 3, 5)), 1)
+        self.assertFalse(CarData.objects.exists())
+        self.assertFalse(any(path.exists() for path in images))
+        body = ColdBody.objects.get(body_no='B1', date=DAY)
+        self.assertEqual((body.car_id, body.sequence), (car.pk, 1))
+        self.assertEqual(list(tiering.unpack(body.readings)), stored)
+        self.assertEqual(len(tiering.history(body)['versions']), 1)
+        [measurement] = tiering.measurements('B1')
+        self.assertEqual((measurement.tier, list(measurement.values)), ('cold', stored))
+
+    def test_measuring_an_archived_body_again_restores_it(self):
+        car, _ = self.store('B1', make_prn())
+        self.store('B2', make_prn())
+        DriftAlarm.objects.create(
+            car=car, body_no='B1', date=DAY, colour_code='8X5', point=1, layer='C', kind=DriftAlarm.EWMA, value=60.0, target_mean=48.0,
+        )
+        tiering.archive(before=date(2024, 3, 5))
+        self.assertEqual(DriftAlarm.objects.get().car, None)
+        self.assertEqual(RawUploadEntry.objects.filter(car=None).count(), 2)
+
+        again, created = self.store('B1', make_prn(rng=random.Random(2)))
+        self.assertFalse(created)
+        self.assertEqual((again.pk, again.sequence), (car.pk, 1))
+        self.assertFalse(ColdBody.objects.filter(body_no='B1').exists())
+        self.assertEqual(CarDataVersion.objects.filter(car=again).count(), 1)
+        self.assertEqual(DriftAlarm.objects.get().car_id, car.pk)
+        self.assertEqual(RawUploadEntry.objects.filter(car=again).count(), 2)
+        # The archived readings were replaced in the rollups, not counted twice
+        self.assertEqual(set(self.rollup_counts().values()), {2})
+
+
+    def test_reprocess_skips_archived_bodies_unless_asked(self):
+        self.store('B1', make_prn())
+        self.store('B2', make_prn(rng=random.Random(2)), day=date(2024, 3, 6))
+        tiering.archive(before=date(2024, 3, 5))
+        output = io.StringIO()
+        call_command('reprocess_archive', stdout=output)
+        self.assertIn('Reprocessed 1 uploads, 0 failed, 1 archived or deleted skipped.', output.getvalue())
+        self.assertTrue(ColdBody.objects.filter(body_no='B1').exists())
+
+        call_command('reprocess_archive', '--include-archived', stdout=io.StringIO())
+        car = CarData.objects.get(body_no='B1')
+        self.assertEqual(car.url, ingest.get_url_for_colour(car.colour_code))
+        self.assertFalse(ColdBody.objects.exists())
+
+    def test_reprocess_rejects_a_bad_date(self):
+        with self.assertRaisesMessage(CommandError, '--since must be an ISO date.'):
+            call_command('reprocess_archive', '--since', '4 March')
+
+class CapabilityTests(StorageMixin, TransactionTestCase):
+    databases = {'default', 'reports', 'cold'}
+    SAMPLE = [48.2, 51.7, 49.9, 50.4, 47.6, 52.3, 50.0, 49.1]
+
+    def statistics(self, point, layer, values):
+        stats = PointStatistics(colour_code='8X5', point=point, layer=layer)
+        for value in values:
+            drift._add(stats, value)
+        stats.save()
+        return stats
+
+    def test_running_moments_match_the_sample(self):
+        stats = self.statistics(1, 'C', self.SAMPLE + [60.0])
+        drift._remove(stats, 60.0)
+        self.assertAlmostEqual(stats.mean, statistics.mean(self.SAMPLE))
+        self.assertAlmostEqual(stats.std, statistics.stdev(self.SAMPLE))
+        mean, std = statistics.mean(self.SAMPLE), statistics.stdev(self.SAMPLE)
+        cp, cpk = capability.indices(stats.mean, stats.std, 40.0, 56.0)
+        self.assertAlmostEqual(cp, 16.0 / (6 * std))
+        self.assertAlmostEqual(cpk, min(56.0 - mean, mean - 40.0) / (3 * std))
+
+    def test_zero_variance_has_no_indices(self):
+        self.assertEqual(capability.indices(50.0, 0.0, 40.0, 60.0), (None, None))
+        self.assertEqual(capability.indices(50.0, None, 40.0, 60.0), (None, None))
+
+    def test_report_uses_the_most_specific_limit(self):
+        self.statistics(1, 'C', self.SAMPLE)
+        self.statistics(2, 'C', self.SAMPLE)
+        self.statistics(1, 'B', [20.0] * 5)
+        self.statistics(1, 'P', self.SAMPLE)
+        SpecLimit.objects.create(colour_code='', point=None, layer='C', lsl=30.0, usl=70.0)
+        SpecLimit.objects.create(colour_code='8X5', point=1, layer='C', lsl=40.0, usl=56.0)
+        SpecLimit.objects.create(colour_code='8X5', point=None, layer='B', lsl=10.0, usl=30.0)
+        rows = {(row['point'], row['layer']): row for row in capability.report('8X5')}
+
+        self.assertEqual((rows[(1, 'C')]['lsl'], rows[(1, 'C')]['usl']), (40.0, 56.0))
+        self.assertEqual((rows[(2, 'C')]['lsl'], rows[(2, 'C')]['usl']), (30.0, 70.0))
+        self.assertGreater(rows[(2, 'C')]['cp'], rows[(1, 'C')]['cp'])
+        # Zero variance, and no limit at all
+        self.assertEqual((rows[(1, 'B')]['std'], rows[(1, 'B')]['cp']), (0.0, None))
+        self.assertEqual((rows[(1, 'P')]['lsl'], rows[(1, 'P')]['cp'], rows[(1, 'P')]['cpk']), (None, None, None))
+
+
+class SeriesTests(StorageMixin, TransactionTestCase):
+    databases = {'default', 'reports', 'cold'}
+
+    def test_series_reads_archived_bodies_and_caps_the_points(self):
+        cars = [self.store(f'B{i}', make_prn(rng=random.Random(i), start=START + timedelta(days=i)), day=DAY + timedelta(days=i)) for i in range(8)]
+        tiering.archive(before=DAY + timedelta(days=3))
+        self.assertEqual(ColdBody.objects.count(), 3)
+        total, points = series.series('8X5', '1C', DAY, DAY + timedelta(days=30))
+        self.assertEqual(total, 8)
+        self.assertEqual([p.body_no for p in points], [f'B{i}' for i in range(8)])
+        self.assertEqual(points[0].value, float(getattr(cars[0][0], '1C')))
+
+        response = self.client.get(reverse('series_report', args=['8X5']), {'point': 1, 'layer': 'C', 'start': '2024-03-01', 'end': '2024-03-31', 'points': 4})
+        data = response.json()
+        self.assertEqual((data['total'], len(data['points'])), (8, 4))
+        self.assertEqual((data['points'][0]['body_no'], data['points'][-1]['body_no']), ('B0', 'B7'))
+
+
+class LineTests(StorageMixin, TransactionTestCase):
+    databases = {'default', 'reports', 'cold'}
+
+    # The line's databases are more connections to the test databases, like the reports mirror
+    LINE_ALIASES = {'paint2': 'default', 'paint2_cold': 'cold'}
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        databases = {**settings.DATABASES, **{alias: connections[source].settings_dict for alias, source in cls.LINE_ALIASES.items()}}
+        with warnings.catch_warnings():
+            # Only the routers read DATABASES once the connections exist; setUp opens the line's
+            warnings.simplefilter('ignore')
+            cls.enterClassContext(override_settings(PELTLOADER_LINES={'paint2': 'paint2'}, DATABASES=databases))
+
+    def setUp(self):
+        for alias, source in self.LINE_ALIASES.items():
+            connection = connections[source]
+            connections[alias] = type(connection)({**connection.settings_dict}, alias=alias)
+            self.addCleanup(connections.__delitem__, alias)
+            self.addCleanup(connections[alias].close)
+
+    def queries(self, func):
+        """Run func(), returning the SQL it sent to 'default' and to 'paint2'."""
+        with CaptureQueriesContext(connections['default']) as default, CaptureQueriesContext(connections['paint2']) as line:
+            func()
+        return [q['sql'] for q in default], [q['sql'] for q in line]
+
+    def test_middleware_reads_and_writes_on_the_line(self):
+        upload = SimpleUploadedFile('body.prn', make_prn().encode())
+        default, line = self.queries(lambda: self.assertRedirects(
+            self.client.post('/lines/paint2/', {'body_no': 'B1', 'date': '2024-03-04', 'file': upload}),
+            '/lines/paint2/success/', fetch_redirect_response=False,
+        ))
+        self.assertEqual(default, [])
+        self.assertTrue(any(sql.startswith('INSERT INTO "peltloader_cardata"') for sql in line))
+
+        default, line = self.queries(lambda: self.assertEqual(self.client.get('/lines/paint2/reports/drift/').status_code, 200))
+        self.assertEqual(default, [])
+        self.assertTrue(any('"peltloader_driftalarm"' in sql for sql in line))
+        self.assertEqual(self.client.get('/lines/paint3/reports/drift/').status_code, 404)
+
+    def test_run_on_line(self):
+        self.store('B1', make_prn())
+        output = io.StringIO()
+        default, line = self.queries(lambda: call_command('run_on_line', 'paint2', 'archive_bodies', '--dry-run', '--before', '2024-03-05', stdout=output))
+        self.assertIn('1 bodies measured before 2024-03-05 would be archived.', output.getvalue())
+        self.assertEqual(default, [])
+        self.assertTrue(any('"peltloader_cardata"' in sql for sql in line))
+        with self.assertRaisesMessage(CommandError, 'Unknown line paint3'):
+            call_command('run_on_line', 'paint3', 'archive_bodies', '--dry-run')
+
+
+class SimilarityTests(StorageMixin, TransactionTestCase):
+    databases = {'default', 'reports', 'cold'}
+
+    def test_catches_up_with_remeasured_bodies(self):
+        cars = [self.store(f'B{i}', make_prn(rng=random.Random(i)))[0] for i in range(3)]
+        # A worker of its own, which ingest in this process does not update
+        index = similarity.ProfileIndex()
+        self.assertEqual(len(index.query(index.vector_for(cars[0].id), k=5)), 3)
+        again, _ = self.store('B1', make_prn(colour_code='1G3', rng=random.Random(9)))
+        expected = numpy.array([float(getattr(again, field)) for field in READING_FIELDS], dtype=numpy.float32)
+        numpy.testing.assert_array_equal(index.vector_for(again.id), expected)
+        self.assertEqual(index.query(expected, k=1, colour_code='1G3')[0][0], again.id)
+
+    def test_drops_bodies_no_longer_stored(self):
+        cars = [self.store(f'B{i}', make_prn(rng=random.Random(i)))[0] for i in range(4)]
+        index = similarity.ProfileIndex()
+        vector = index.vector_for(cars[0].id)
+        CarData.objects.filter(pk__in=[cars[1].id, cars[2].id]).delete()
+        self.assertEqual([car_id for car_id, _ in index.query(vector, k=2)], [cars[0].id, cars[3].id])
+        self.assertEqual(len(index), 2)
+
+    def test_view_of_a_body_not_indexed_yet(self):
+        similarity._indexes.clear()
+        self.addCleanup(similarity._indexes.clear)
+        cars = [self.store(f'B{i}', make_prn(rng=random.Random(i)))[0] for i in range(3)]
+        response = self.client.get(reverse('similar_bodies', args=[cars[0].id]), {'k': 5})
+        self.assertEqual(sorted(match['body_no'] for match in response.json()['matches']), ['B1', 'B2'])
+        similarity.index().discard(cars[0].id)
+        response = self.client.get(reverse('similar_bodies', args=[cars[0].id]))
+        self.assertEqual((response.status_code, response['Retry-After']), (503, '5'))
+
+    def test_missing_readings_stand_in_at_the_colour_mean(self):
+        self.store('B1', make_prn())
+        with self.assertLogs('peltloader.ingest', 'WARNING'):
+            car, _ = self.store('B2', without_points(make_prn(rng=random.Random(2)), [3]))
+        index = similarity.ProfileIndex()
+        vector = index.vector_for(car.id)
+        mean = PointStatistics.objects.get(colour_code='8X5', point=3, layer='C').mean
+        self.assertAlmostEqual(float(vector[READING_FIELDS.index('3C')]), mean, places=3)
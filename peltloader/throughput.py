@@ -0,0 +1,158 @@
+"""
+Measuring throughput from the time stamp of every point.
+
+Ingest stores a MeasurementSession per body with its gauge, operator, job
+and the seconds from the first point to each point, packed as int32 (688
+bytes for 172 points). From those it keeps two summaries current, like the
+rollups: ThroughputDaily per day, gauge and operator (bodies, points, time
+spent measuring and utilisation), and PointTiming, the running time taken
+to reach and measure each point from the previous one, which shows the slow
+stations. Gaps longer than PELTLOADER_BREAK_SECONDS count as breaks and are
+left out of both.
+"""
+import array
+import logging
+import sys
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Count, Max, Min, Sum
+from django.utils import timezone
+
+from . import bulk
+from .models import MeasurementSession, PointTiming, ThroughputDaily
+
+logger = logging.getLogger(__name__)
+SESSION_FIELDS = ['gauge', 'operator', 'job', 'started_at', 'finished_at', 'points', 'active_seconds', 'point_offsets']
+
+
+def break_seconds():
+    return getattr(settings, 'PELTLOADER_BREAK_SECONDS', 600)
+
+
+# Packed in place of the offset of a point that was not measured, like tiering.MISSING
+MISSING = -2 ** 31
+
+
+def pack(offsets):
+    values = array.array('i', (MISSING if offset is None else offset for offset in offsets))
+    if sys.byteorder == 'big':
+        values.byteswap()
+    return values.tobytes()
+
+
+def unpack(data):
+    values = array.array('i')
+    values.frombytes(bytes(data))
+    if sys.byteorder == 'big':
+        values.byteswap()
+    return [None if offset == MISSING else offset for offset in values]
+
+
+def intervals(offsets):
+    """Yield (point, seconds since the previous point) for every point measured after its predecessor."""
+    for point, (before, after) in enumerate(zip(offsets, offsets[1:]), start=2):
+        if before is not None and after is not None:
+            yield point, after - before
+
+
+def active_seconds(offsets):
+    limit = break_seconds()
+    return sum(seconds for _, seconds in intervals(offsets) if 0 <= seconds <= limit)
+
+
+def merge_offsets(started_at, offsets, previous):
+    """
+    Combine the offsets of a partial session with those of a previous session.
+
+    Points in the new session win. Returns (started_at, offsets) relative to
+    whichever session started first.
+    """
+    start = min(started_at, previous.started_at)
+    shift = int((started_at - start).total_seconds())
+    previous_shift = int((previous.started_at - start).total_seconds())
+    merged = [
+        offset + shift if offset is not None else (old + previous_shift if old is not None else None)
+        for offset, old in zip(offsets, unpack(previous.point_offsets))
+    ]
+    return start, merged
+
+
+def _apply_timing(bodies, sign):
+    """Add (sign=1) or remove (sign=-1) the point intervals of bodies' offsets from PointTiming."""
+    limit = break_seconds()
+    timings = {t.point: t for t in PointTiming.objects.all()}
+    for offsets in bodies:
+        for point, seconds in intervals(offsets):
+            if 0 <= seconds <= limit:
+                timing = timings.get(point)
+                if timing is None:
+                    timing = timings[point] = PointTiming(point=point)
+                timing.count += sign
+                timing.total += sign * seconds
+                timing.total_sq += sign * seconds * seconds
+    bulk.upsert(PointTiming, timings.values(), unique_fields=['point'], update_fields=['count', 'total', 'total_sq'])
+
+
+def refresh_day(day, gauge, operator):
+    """Recompute the ThroughputDaily row of a day, gauge and operator from its sessions."""
+    totals = MeasurementSession.objects.filter(started_at__date=day, gauge=gauge, operator=operator).aggregate(
+        bodies=Count('id'), points=Sum('points'), active_seconds=Sum('active_seconds'),
+        first_started_at=Min('started_at'), last_finished_at=Max('finished_at'),
+    )
+    if not totals['bodies']:
+        ThroughputDaily.objects.filter(day=day, gauge=gauge, operator=operator).delete()
+        return
+    ThroughputDaily.objects.bulk_create(
+        [ThroughputDaily(day=day, gauge=gauge, operator=operator, **totals)],
+        update_conflicts=True, unique_fields=['day', 'gauge', 'operator'], update_fields=list(totals),
+    )
+
+
+def record(car, reading, merge=False):
+    """
+    Store the measurement session of a saved CarData and update the summaries.
+
+    With `merge`, the reading is a partial re-measurement and its point times
+    are combined with those of the body's previous session.
+    """
+    if not reading.offsets or car.measured_at is None:
+        return
+    previous = MeasurementSession.objects.filter(car_id=car.pk).first()
+    if previous is not None:
+        _apply_timing([unpack(previous.point_offsets)], -1)
+
+    started_at, offsets = car.measured_at, list(reading.offsets)
+    if merge and previous is not None and len(unpack(previous.point_offsets)) == len(offsets):
+        started_at, offsets = merge_offsets(started_at, offsets, previous)
+    measured = [offset for offset in offsets if offset is not None]
+    session = MeasurementSession(
+        car=car,
+        gauge=reading.gauge,
+        operator=reading.operator,
+        job=reading.job,
+        started_at=started_at,
+        finished_at=started_at + timedelta(seconds=max(measured)),
+        points=len(measured),
+        active_seconds=active_seconds(offsets),
+        point_offsets=pack(offsets),
+    )
+    MeasurementSession.objects.bulk_create([session], update_conflicts=True, unique_fields=['car'], update_fields=SESSION_FIELDS)
+    _apply_timing([offsets], 1)
+
+    days = {(timezone.localdate(session.started_at), session.gauge, session.operator)}
+    if previous is not None:
+        days.add((timezone.localdate(previous.started_at), previous.gauge, previous.operator))
+    for day in days:
+        refresh_day(*day)
+
+
+def remove(sessions):
+    """Delete MeasurementSessions, e.g. of bodies about to be deleted, and take them out of the summaries."""
+    sessions = list(sessions)
+    if not sessions:
+        return
+    _apply_timing([unpack(session.point_offsets) for session in sessions], -1)
+    MeasurementSession.objects.filter(pk__in=[session.pk for session in sessions]).delete()
+    for day in {(timezone.localdate(session.started_at), session.gauge, session.operator) for session in sessions}:
+        refresh_day(*day)
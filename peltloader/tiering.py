@@ -0,0 +1,243 @@
+"""
+Hot/cold tiering of stored bodies.
+
+Nearly every report looks at the last few weeks, but CarData keeps every
+body with its 516 reading columns. The archive_bodies command moves bodies
+measured more than PELTLOADER_HOT_DAYS ago into ColdBody in the separate
+'cold' database: one row per body, its readings packed as int32 thousandths
+(the gauge's resolution) and zlib-compressed, its superseded versions and
+measurement session as compressed JSON. Each batch is written to the cold
+database before it is deleted from CarData, so an interrupted run leaves
+bodies in both tiers, never in neither; the hot row wins, and running the
+command again finishes the move.
+
+`measurements` and `profiles` read both tiers, fetching and unpacking only
+the archived bodies asked for. The summary tables (rollups, point
+statistics, drift, throughput) are left alone, so reports over them still
+cover archived bodies. Drift alarms and upload manifest entries lose their
+link to the CarData row but keep the body number and date. A body's
+deviation and heat-maps go with its row, and the heat-map files no other
+body shares are deleted once the batch commits.
+
+A body measured again after it was archived is moved back by `restore`,
+with its original id, versions and session, so ingest stores the new
+measurement as a re-measurement of it: it keeps its place in the colour
+sequence and its archived readings are taken out of the summaries.
+"""
+import array
+import json
+import logging
+import sys
+import zlib
+from collections import namedtuple
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from . import bulk, heatmap, lines, numeric, prn, readings, throughput
+from .models import CarData, CarDataVersion, ColdBody, DriftAlarm, HeatMap, MeasurementSession, RawUploadEntry, READING_FIELDS
+from .routers import cold_db, reports_db
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 200
+SCALE = 1000
+# Packed in place of a missing reading
+MISSING = -2 ** 31
+
+HEADER_FIELDS = ['body_no', 'date', 'colour_code', 'primer', 'url', 'sequence', 'measured_at', 'missing_points', 'duplicate_points']
+MEASUREMENT_FIELDS = ('id', 'body_no', 'date', 'colour_code', 'primer', 'sequence', 'measured_at')
+# One stored measurement of a body from either tier; `id` is its CarData id
+Measurement = namedtuple('Measurement', ('tier',) + MEASUREMENT_FIELDS + ('values',))
+
+
+def hot_days():
+    return getattr(settings, 'PELTLOADER_HOT_DAYS', 180)
+
+
+def cutoff(today=None, days=None):
+    """Bodies measured before this date belong in the cold database; `days` overrides `hot_days()`."""
+    return (today or timezone.localdate()) - timedelta(days=hot_days() if days is None else days)
+
+
+def pack(values):
+    """Pack a body's readings (floats or None, in READING_FIELDS order) into compressed bytes."""
+    packed = array.array('i', (MISSING if value is None else round(value * SCALE) for value in values))
+    if sys.byteorder == 'big':
+        packed.byteswap()
+    return zlib.compress(packed.tobytes(), 9)
+
+
+def pack_array(values):
+    """Like `pack`, for a numpy array of floats with NaN where a reading is missing."""
+    import numpy as np
+
+    packed = np.where(np.isnan(values), MISSING, np.round(values * SCALE)).astype('<i4')
+    return zlib.compress(packed.tobytes(), 9)
+
+
+def unpack(data):
+    values = array.array('i')
+    values.frombytes(zlib.decompress(bytes(data)))
+    if sys.byteorder == 'big':
+        values.byteswap()
+    return tuple(None if value == MISSING else value / SCALE for value in values)
+
+
+def _histories(ids):
+    """Return {car id: compressed JSON of its versions and measurement session}."""
+    histories = {car_id: {'versions': [], 'session': None} for car_id in ids}
+    for version in CarDataVersion.objects.filter(car_id__in=ids).order_by('version').values(
+        'car_id', 'version', 'primer', 'colour_code', 'measured_at', 'readings', 'superseded_at',
+    ):
+        histories[version.pop('car_id')]['versions'].append(version)
+    for session in MeasurementSession.objects.filter(car_id__in=ids).values(
+        'car_id', 'gauge', 'operator', 'job', 'started_at', 'finished_at', 'points', 'active_seconds', 'point_offsets',
+    ):
+        session['point_offsets'] = throughput.unpack(session['point_offsets'])
+        histories[session.pop('car_id')]['session'] = session
+    return {car_id: zlib.compress(json.dumps(history, cls=DjangoJSONEncoder).encode(), 9) for car_id, history in histories.items()}
+
+
+def history(body):
+    """Return {'versions': [...], 'session': {...} or None} of a ColdBody."""
+    return json.loads(zlib.decompress(bytes(body.history))) if body.history else {'versions': [], 'session': None}
+
+
+@lines.atomic
+def archive_batch(before, batch_size=BATCH_SIZE):
+    """Move up to `batch_size` bodies measured before `before` to the cold database. Returns how many."""
+    batch = list(
+        CarData.objects.select_for_update().filter(date__lt=before).order_by('id')
+        .values('id', *HEADER_FIELDS, *READING_FIELDS)[:batch_size]
+    )
+    if not batch:
+        return 0
+    ids = [row['id'] for row in batch]
+    histories = _histories(ids)
+    bodies = [
+        ColdBody(
+            car_id=row['id'],
+            readings=pack(readings.to_floats([row[field] for field in READING_FIELDS])),
+            history=histories[row['id']],
+            **{field: row[field] for field in HEADER_FIELDS},
+        )
+        for row in batch
+    ]
+    # Committed before the hot rows go: a failure after this leaves the bodies in both tiers
+    with transaction.atomic(using=cold_db()):
+        bulk.upsert(
+            ColdBody, bodies, unique_fields=['body_no', 'date'],
+            update_fields=['car_id', *HEADER_FIELDS[2:], 'readings', 'history', 'archived_at'], using=cold_db(),
+        )
+    images = list(HeatMap.objects.filter(car_id__in=ids).values_list('digest', 'format'))
+    CarData.objects.filter(id__in=ids).delete()
+    if images:
+        lines.on_commit(lambda: heatmap.remove_unused(images))
+    return len(batch)
+
+
+def archive(before=None, batch_size=BATCH_SIZE):
+    """Move every body measured before `before` (default: `cutoff()`) to the cold database."""
+    before = before or cutoff()
+    moved = 0
+    while True:
+        count = archive_batch(before, batch_size)
+        if not count:
+            break
+        moved += count
+    if moved:
+        logger.info('Archived %d bodies measured before %s.', moved, before)
+    return moved
+
+
+def _restore_history(car, body):
+    """Recreate the CarDataVersions and MeasurementSession archived with a body."""
+    saved = history(body)
+    for version in saved['versions']:
+        superseded_at = parse_datetime(version.pop('superseded_at'))
+        version['measured_at'] = parse_datetime(version['measured_at']) if version['measured_at'] else None
+        created = CarDataVersion.objects.create(car=car, **version)
+        # Not the time of the restore
+        CarDataVersion.objects.filter(pk=created.pk).update(superseded_at=superseded_at)
+    session = saved['session']
+    if session is not None:
+        for field in ('started_at', 'finished_at'):
+            session[field] = parse_datetime(session[field])
+        session['point_offsets'] = throughput.pack(session['point_offsets'])
+        MeasurementSession.objects.create(car=car, **session)
+
+
+@lines.atomic
+def restore(body_no, date):
+    """
+    Move an archived body back into CarData. Returns the restored CarData,
+    or None if the body is not archived.
+
+    The cold row is deleted once the restore commits; until then the body
+    is in both tiers, where the hot row wins.
+    """
+    body = ColdBody.objects.filter(body_no=body_no, date=date).first()
+    if body is None:
+        return None
+    car = CarData(id=body.car_id, **{field: getattr(body, field) for field in HEADER_FIELDS})
+    for field, value in zip(READING_FIELDS, unpack(body.readings)):
+        setattr(car, field, None if value is None else prn.format_reading(value))
+    car.save(force_insert=True)
+    numeric.store_car(car)
+    _restore_history(car, body)
+    DriftAlarm.objects.filter(car=None, body_no=body_no, date=date).update(car=car)
+    RawUploadEntry.objects.filter(car=None, body_no=body_no, date=date).update(car=car)
+    lines.on_commit(lambda: ColdBody.objects.filter(pk=body.pk).delete())
+    logger.info('Body %s on %s restored from the cold database.', body_no, date)
+    return car
+
+
+def _cold(row):
+    *fields, packed = row
+    return Measurement('cold', *fields, unpack(packed))
+
+
+def _cold_rows(bodies):
+    return bodies.values_list('car_id', *MEASUREMENT_FIELDS[1:], 'readings')
+
+
+def measurements(body_no):
+    """Every stored measurement of a body from both tiers, latest date first."""
+    hot = [
+        Measurement('hot', *row)
+        for row in readings.rows(CarData.objects.using(reports_db()).filter(body_no=body_no), fields=MEASUREMENT_FIELDS)
+    ]
+    dates = {measurement.date for measurement in hot}
+    cold = [_cold(row) for row in _cold_rows(ColdBody.objects.filter(body_no=body_no)) if row[2] not in dates]
+    return sorted(hot + cold, key=lambda measurement: measurement.date, reverse=True)
+
+
+def profiles(colour_code=None, since=None, until=None):
+    """
+    Yield the Measurements of the bodies of a colour measured from `since` to `until`, both optional.
+
+    Hot bodies come first. Only the cold bodies in the range are fetched
+    and unpacked; for a range newer than every archived body that is a
+    single lookup of the date index.
+    """
+    hot = CarData.objects.using(reports_db()).order_by('date', 'id')
+    cold = ColdBody.objects.order_by('date', 'car_id')
+    if colour_code is not None:
+        hot, cold = hot.filter(colour_code=colour_code), cold.filter(colour_code=colour_code)
+    if since is not None:
+        hot, cold = hot.filter(date__gte=since), cold.filter(date__gte=since)
+    if until is not None:
+        hot, cold = hot.filter(date__lte=until), cold.filter(date__lte=until)
+
+    seen = set()
+    for row in readings.rows(hot, fields=MEASUREMENT_FIELDS):
+        seen.add((row[1], row[2]))
+        yield Measurement('hot', *row)
+    for row in _cold_rows(cold).iterator(chunk_size=500):
+        if (row[1], row[2]) not in seen:
+            yield _cold(row)
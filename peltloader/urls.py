@@ -7,6 +7,19 @@ from django.conf.urls.static import static
 urlpatterns = [
     path('', views.upload_file, name='upload_file'),
     path('success/', lambda request: render(request, 'peltloader/success.html'), name='success'),
+    path('bodies/<int:car_id>/similar/', views.similar_bodies, name='similar_bodies'),
+    path('bodies/<int:car_id>/heatmap.<str:fmt>', views.heatmap_image, name='heatmap_image'),
+    path('bodies/<int:car_id>/deviation/', views.body_deviation, name='body_deviation'),
+    path('bodies/number/<str:body_no>/', views.body_measurements, name='body_measurements'),
+    path('reports/<str:colour_code>/rollups/', views.rollup_report, name='rollup_report'),
+    path('reports/<str:colour_code>/series/', views.series_report, name='series_report'),
+    path('reports/<str:colour_code>/worst/', views.worst_bodies, name='worst_bodies'),
+    path('reports/drift/', views.drift_alarms, name='drift_alarms'),
+    path('reports/cache/', views.cache_stats, name='cache_stats'),
+    path('reports/throughput/', views.throughput_report, name='throughput_report'),
+    path('reports/<str:colour_code>/capability/', views.capability_report, name='capability_report'),
+    path('profiles/', views.profile_index, name='profile_index'),
+    path('profiles/<str:name>/', views.profile_download, name='profile_download'),
 ]
 
 if settings.DEBUG:
@@ -1,39 +1,18 @@
-from django.shortcuts import render, redirect
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseBadRequest, JsonResponse
+from django.shortcuts import get_object_or_404, render, redirect
+from django.utils import timezone
 from .forms import FileUploadForm
-import pandas as pd
+import heapq
 import logging
-from datetime import datetime
-from .models import CarData
-import pandas as pd
+import time
+from datetime import date as date_type, timedelta
+from .models import BodyDeviation, CarData, ColourBaseline, DriftAlarm, HeatMap, LAYERS, POINTS, PointRollup, PointTiming, READING_FIELDS, READING_KEYS, ThroughputDaily
+from . import capability, heatmap, ingest, profiling, prn, querycache, series, similarity, tiering
+from .routers import reports_db
 
 logger = logging.getLogger(__name__)
 
-def extract_point(panel_string):
-    """Extract the point number from the panel string."""
-    return panel_string.split(' ')[1] if ' ' in panel_string else panel_string
-
-def calculate_latest(df, colour_code):
-    """Calculate the latest car sequence for the same colour code in reverse order."""
-    car_sequence = df[df['Colour Code'] == colour_code].sort_index(ascending=False)
-    latest_values = {idx: f"{i+2} cars ago" for i, idx in enumerate(car_sequence.index)}
-    return latest_values
-
-def get_url_for_colour(colour_code):
-    """Get the URL for the given colour code."""
-    urls = {
-        '8X5': 'https://myteams.toyota.com/:i:/r/sites/sTRiskManagement/Shared%20Documents/General/Kaizen/Car%20Colours/8X5.png?csf=1&web=1&e=m3Egzi',
-        '085': 'https://myteams.toyota.com/:i:/r/sites/sTRiskManagement/Shared%20Documents/General/Kaizen/Car%20Colours/85.png?csf=1&web=1&e=ANCzp4',
-        '4Y5': 'https://myteams.toyota.com/:i:/r/sites/sTRiskManagement/Shared%20Documents/General/Kaizen/Car%20Colours/4Y5.png?csf=1&web=1&e=D9VUKT',
-        '6X4': 'https://myteams.toyota.com/:i:/r/sites/sTRiskManagement/Shared%20Documents/General/Kaizen/Car%20Colours/6X4.png?csf=1&web=1&e=fORxuy',
-        '223': 'https://myteams.toyota.com/:i:/r/sites/sTRiskManagement/Shared%20Documents/General/Kaizen/Car%20Colours/223.png?csf=1&web=1&e=ViEknw',
-        '3R1': 'https://myteams.toyota.com/:i:/r/sites/sTRiskManagement/Shared%20Documents/General/Kaizen/Car%20Colours/3R1.png?csf=1&web=1&e=rW3o0j',
-        '1L2': 'https://myteams.toyota.com/:i:/r/sites/sTRiskManagement/Shared%20Documents/General/Kaizen/Car%20Colours/1L2.png?csf=1&web=1&e=BtQDQn',
-        '8Y6': 'https://myteams.toyota.com/:i:/r/sites/sTRiskManagement/Shared%20Documents/General/Kaizen/Car%20Colours/1L8.png?csf=1&web=1&e=TKqqFZ',
-        '1L8': 'https://myteams.toyota.com/:i:/r/sites/sTRiskManagement/Shared%20Documents/General/Kaizen/Car%20Colours/1L2.png?csf=1&web=1&e=BtQDQn',
-        '1L1': 'https://myteams.toyota.com/:i:/r/sites/sTRiskManagement/Shared%20Documents/General/Kaizen/Car%20Colours/1L1.png?csf=1&web=1&e=BLShcb',
-    }
-    return urls.get(colour_code, '')
-
 def upload_file(request):
     if request.method == 'POST':
         form = FileUploadForm(request.POST, request.FILES)
@@ -45,102 +24,25 @@ def upload_file(request):
                     logger.error('File not uploaded.')
                     return render(request, 'peltloader/upload.html', {'form': form, 'error': 'File not uploaded.'})
 
-                file = request.FILES['file'].read().decode('utf-8')
-                lines = file.splitlines()
-                logger.debug('File read successfully. Content: %s', lines)
+                upload = request.FILES['file']
+                content = upload.read()
+                reading = prn.parse(content)
+                logger.debug('File parsed successfully: %d points.', len(reading.points))
 
-                # Retrieve form data
+                # Retrieve form data, falling back to the gauge's own date
                 body_no = form.cleaned_data['body_no']
-                date = form.cleaned_data['date']
-
-                # Define the initial columns for the DataFrame
-                columns = ['Latest', 'Primer', 'URL', 'Date', 'Body No.', 'Colour Code']
-                data_row = {}
-                point_counter = 1
-
-                # Skip the header and empty lines
-                for line in lines[1:]:  # Skip the first line (header)
-                    if not line.strip():
-                        continue
-
-                    data = line.strip().split(',')
-                    if len(data) < 42:  # Ensure there's enough data to extract
-                        logger.warning('Line skipped, not enough data: %s', line)
-                        continue
-
-                    # Define new columns dynamically based on the point number
-                    if point_counter == 1:
-                        data_row['Body No.'] = body_no
-                        data_row['Date'] = date
-                        data_row['Colour Code'] = data[27].strip('" ')
-                        data_row['Primer'] = data[35].strip('"')
-                        data_row['URL'] = get_url_for_colour(data_row['Colour Code'])
-
-                    point_number = extract_point(data[5])
-                    data_row[f'{point_counter}C'] = data[25].strip()
-                    data_row[f'{point_counter}B'] = data[33].strip()
-                    data_row[f'{point_counter}P'] = data[41].strip()
-                    point_counter += 1
+                date = form.cleaned_data['date'] or reading.measured_at.date()
 
-                columns += [f'{i}C' for i in range(1, point_counter)]
-                columns += [f'{i}B' for i in range(1, point_counter)]
-                columns += [f'{i}P' for i in range(1, point_counter)]
-
-                # Calculate the "Latest" column
-                excel_path = 'uploads/output.xlsx'
-                try:
-                    df_existing = pd.read_excel(excel_path)
-                    logger.debug('Existing Excel file found and read.')
-                except FileNotFoundError:
-                    df_existing = pd.DataFrame(columns=columns)
-                    logger.debug('Excel file not found. A new one will be created.')
-
-                latest_values = calculate_latest(df_existing, data_row['Colour Code'])
-
-                # Update all previous records to reflect the new sequence
-                for idx, value in latest_values.items():
-                    df_existing.at[idx, 'Latest'] = value
-
-                data_row['Latest'] = '1 car ago'
-
-                # Create DataFrame with the new row, ensuring "Latest", "Primer", "URL", and "Date" are first
-                df_row = pd.DataFrame([data_row], columns=['Latest', 'Primer', 'URL', 'Date'] + [col for col in columns if col not in ['Latest', 'Primer', 'URL', 'Date']])
-                logger.debug('DataFrame created from parsed data: %s', df_row)
-
-                # Append the new data
-                df_combined = pd.concat([df_existing, df_row], ignore_index=True)
-                logger.debug('Data combined with existing DataFrame: %s', df_combined)
-
-                # Save to Excel
-                df_combined.to_excel(excel_path, index=False)
-                logger.debug('DataFrame saved to Excel file.')
-
-                # Save to database
-                car_data = CarData(
-                    latest=data_row['Latest'],
-                    primer=data_row['Primer'],
-                    url=data_row['URL'],
-                    date=date,  # Directly assigning the date from the form
-                    body_no=data_row['Body No.'],
-                    colour_code=data_row['Colour Code']
-                )
-
-                for i in range(1, point_counter):
-                    setattr(car_data, f'{i}C', data_row.get(f'{i}C'))
-                    setattr(car_data, f'{i}B', data_row.get(f'{i}B'))
-                    setattr(car_data, f'{i}P', data_row.get(f'{i}P'))
-
-                car_data.save()
-
-                # Update previous entries in the database as well
-                for car in CarData.objects.filter(colour_code=data_row['Colour Code']).exclude(id=car_data.id):
-                    previous_count = int(car.latest.split()[0]) + 1
-                    car.latest = f"{previous_count} cars ago"
-                    car.save()
+                # Save to database, replacing any earlier measurement of the body on that date
+                car_data, created = ingest.store_reading(reading, body_no, date, url=ingest.get_url_for_colour(reading.colour_code), raw=content, filename=upload.name)
+                logger.debug('Body %s stored (created=%s).', body_no, created)
 
                 return redirect('success')
+            except prn.PrnValidationError as e:
+                logger.warning('File rejected: %s', e)
+                return render(request, 'peltloader/upload.html', {'form': form, 'error': 'File failed validation.', 'line_errors': e.errors})
             except Exception as e:
-                logger.error('Error processing file: %s', e)
+                logger.exception('Error processing file: %s', e)
                 return render(request, 'peltloader/upload.html', {'form': form, 'error': 'Error processing file.'})
         else:
             logger.debug('Form is not valid.')
@@ -150,6 +52,310 @@ def upload_file(request):
     return render(request, 'peltloader/upload.html', {'form': form})
 
 
+def similar_bodies(request, car_id):
+    """Return the bodies whose thickness profiles are closest to the given body, as JSON."""
+    car = get_object_or_404(CarData.objects.using(reports_db()).only('id', 'body_no', 'date', 'colour_code'), pk=car_id)
+    try:
+        k = max(1, min(int(request.GET.get('k', 10)), 100))
+    except ValueError:
+        return HttpResponseBadRequest('k must be an integer.')
+    same_colour = request.GET.get('colour') == 'same'
+
+    start = time.perf_counter()
+    index = similarity.index()
+    vector = index.vector_for(car.id)
+    if vector is None:
+        # Stored after the index last caught up, e.g. still on its way to the reports mirror
+        response = HttpResponse('This body is not in the similarity index yet; try again shortly.', status=503)
+        response['Retry-After'] = '5'
+        return response
+    matches = index.query(vector, k=k, colour_code=car.colour_code if same_colour else None, exclude=car.id)
+    elapsed_ms = (time.perf_counter() - start) * 1000
+
+    bodies = CarData.objects.using(reports_db()).only('id', 'body_no', 'date', 'colour_code').in_bulk([car_id for car_id, _ in matches])
+    return JsonResponse({
+        'id': car.id,
+        'body_no': car.body_no,
+        'colour_code': car.colour_code,
+        'elapsed_ms': round(elapsed_ms, 2),
+        'matches': [
+            {
+                'id': match_id,
+                'body_no': bodies[match_id].body_no,
+                'date': bodies[match_id].date,
+                'colour_code': bodies[match_id].colour_code,
+                'distance': round(distance, 3),
+            }
+            for match_id, distance in matches if match_id in bodies
+        ],
+    })
+
+
+def rollup_report(request, colour_code):
+    """
+    Return the daily or weekly rollups of a colour as JSON.
+
+    Query parameters: period (day or week, default week), start and end
+    (ISO dates), point and layer to narrow the report.
+    """
+    period = request.GET.get('period', PointRollup.WEEK)
+    if period not in (PointRollup.DAY, PointRollup.WEEK):
+        return HttpResponseBadRequest('period must be day or week.')
+    try:
+        start = date_type.fromisoformat(request.GET['start']) if 'start' in request.GET else None
+        end = date_type.fromisoformat(request.GET['end']) if 'end' in request.GET else None
+        point = int(request.GET['point']) if 'point' in request.GET else None
+    except ValueError:
+        return HttpResponseBadRequest('start and end must be ISO dates and point an integer.')
+    layer = request.GET.get('layer')
+
+    def query():
+        rollups = PointRollup.objects.using(reports_db()).filter(colour_code=colour_code, period=period)
+        if start is not None:
+            rollups = rollups.filter(period_start__gte=start)
+        if end is not None:
+            rollups = rollups.filter(period_start__lte=end)
+        if point is not None:
+            rollups = rollups.filter(point=point)
+        if layer is not None:
+            rollups = rollups.filter(layer=layer)
+        return [
+            {
+                'period_start': r.period_start,
+                'point': r.point,
+                'layer': r.layer,
+                'count': r.count,
+                'mean': r.mean,
+                'std': r.std,
+                'p05': r.percentile(5),
+                'p50': r.percentile(50),
+                'p95': r.percentile(95),
+            }
+            for r in rollups.order_by('period_start', 'point', 'layer')
+        ]
+
+    rows = querycache.cached('rollups', colour_code, (period, start, end, point, layer), query)
+    return JsonResponse({'colour_code': colour_code, 'period': period, 'rows': rows})
+
+
+def series_report(request, colour_code):
+    """
+    Return a downsampled series of one reading of a colour's bodies as JSON, for trend charts.
+
+    Query parameters: point and layer (required), start and end (ISO dates,
+    default the last year), points, the most measurements to return
+    (default 500), and method, lttb (default) or minmax.
+    """
+    try:
+        point = int(request.GET['point'])
+        layer = request.GET['layer']
+        end = date_type.fromisoformat(request.GET['end']) if 'end' in request.GET else timezone.localdate()
+        start = date_type.fromisoformat(request.GET['start']) if 'start' in request.GET else end - timedelta(days=365)
+        threshold = max(3, min(int(request.GET.get('points', 500)), 5000))
+    except (KeyError, ValueError):
+        return HttpResponseBadRequest('point and layer are required, start and end must be ISO dates and point and points integers.')
+    method = request.GET.get('method', series.LTTB)
+    if not 1 <= point <= POINTS or layer not in LAYERS or method not in series.METHODS or start > end:
+        return HttpResponseBadRequest(f'point must be 1-{POINTS}, layer one of {", ".join(LAYERS)}, method one of {", ".join(series.METHODS)} and start not after end.')
+
+    total, points = series.series(colour_code, f'{point}{layer}', start, end, threshold, method)
+    return JsonResponse({
+        'colour_code': colour_code,
+        'point': point,
+        'layer': layer,
+        'start': start,
+        'end': end,
+        'method': method,
+        'total': total,
+        'points': [{'t': p.t, 'body_no': p.body_no, 'value': p.value} for p in points],
+    })
+
+
+def body_deviation(request, car_id):
+    """Return a body's deviation from its colour's baseline as JSON, its k furthest readings first."""
+    deviations = BodyDeviation.objects.using(reports_db()).select_related('car').only(
+        'car__body_no', 'date', 'colour_code', 'baseline_version', 'deviations', 'worst', 'worst_field', 'rms',
+    )
+    deviation = get_object_or_404(deviations, pk=car_id)
+    try:
+        k = max(1, min(int(request.GET.get('k', 10)), len(READING_FIELDS)))
+    except ValueError:
+        return HttpResponseBadRequest('k must be an integer.')
+    devs = tiering.unpack(deviation.deviations)
+    furthest = heapq.nlargest(k, ((abs(z), key, z) for key, z in zip(READING_KEYS, devs) if z is not None))
+    return JsonResponse({
+        'id': deviation.car_id,
+        'body_no': deviation.car.body_no,
+        'date': deviation.date,
+        'colour_code': deviation.colour_code,
+        'baseline_version': deviation.baseline_version,
+        'worst': deviation.worst,
+        'worst_field': deviation.worst_field,
+        'rms': deviation.rms,
+        'readings': [{'point': point, 'layer': layer, 'deviation': z} for _, (point, layer, _), z in furthest],
+    })
+
+
+def worst_bodies(request, colour_code):
+    """
+    Return the bodies of a colour furthest from its baseline as JSON.
+
+    Query parameters: n, how many (default 20), and since, an ISO date to
+    leave out bodies measured before.
+    """
+    try:
+        n = max(1, min(int(request.GET.get('n', 20)), 500))
+        since = date_type.fromisoformat(request.GET['since']) if 'since' in request.GET else None
+    except ValueError:
+        return HttpResponseBadRequest('n must be an integer and since an ISO date.')
+    deviations = BodyDeviation.objects.using(reports_db()).filter(colour_code=colour_code).order_by('-worst')
+    if since is not None:
+        deviations = deviations.filter(date__gte=since)
+    baseline = ColourBaseline.objects.using(reports_db()).filter(colour_code=colour_code).values('version', 'bodies', 'updated_at').first()
+    return JsonResponse({
+        'colour_code': colour_code,
+        'baseline': baseline,
+        'bodies': [
+            {
+                'id': car_id,
+                'body_no': body_no,
+                'date': date,
+                'worst': worst,
+                'worst_field': worst_field,
+                'rms': rms,
+                'baseline_version': version,
+            }
+            for car_id, body_no, date, worst, worst_field, rms, version in deviations.values_list(
+                'car_id', 'car__body_no', 'date', 'worst', 'worst_field', 'rms', 'baseline_version',
+            )[:n]
+        ],
+    })
+
+
+def drift_alarms(request):
+    """Return the most recent unacknowledged drift alarms as JSON, optionally for one colour."""
+    alarms = DriftAlarm.objects.using(reports_db()).filter(acknowledged=False).order_by('-raised_at')
+    if 'colour' in request.GET:
+        alarms = alarms.filter(colour_code=request.GET['colour'])
+    return JsonResponse({'alarms': [
+        {
+            'id': a.id,
+            'body_no': a.body_no,
+            'date': a.date,
+            'colour_code': a.colour_code,
+            'point': a.point,
+            'layer': a.layer,
+            'kind': a.kind,
+            'value': a.value,
+            'target_mean': a.target_mean,
+            'raised_at': a.raised_at,
+        }
+        for a in alarms[:200]
+    ]})
+
+
+def capability_report(request, colour_code):
+    """Return Cp/Cpk for every point and layer of a colour as JSON."""
+    return JsonResponse({'colour_code': colour_code, 'rows': capability.report(colour_code)})
+
+
+def throughput_report(request):
+    """
+    Return measuring throughput per day, gauge and operator, and the slowest points, as JSON.
+
+    Query parameters: start and end (ISO dates), gauge and operator to narrow
+    the days, and stations, the number of slowest points to list (default 10).
+    """
+    days = ThroughputDaily.objects.using(reports_db()).order_by('day', 'gauge', 'operator')
+    try:
+        if 'start' in request.GET:
+            days = days.filter(day__gte=date_type.fromisoformat(request.GET['start']))
+        if 'end' in request.GET:
+            days = days.filter(day__lte=date_type.fromisoformat(request.GET['end']))
+        stations = max(1, min(int(request.GET.get('stations', 10)), 172))
+    except ValueError:
+        return HttpResponseBadRequest('start and end must be ISO dates and stations an integer.')
+    for field in ('gauge', 'operator'):
+        if field in request.GET:
+            days = days.filter(**{field: request.GET[field]})
+
+    timings = sorted(PointTiming.objects.using(reports_db()).filter(count__gt=0), key=lambda t: t.mean, reverse=True)
+    return JsonResponse({
+        'days': [
+            {
+                'day': d.day,
+                'gauge': d.gauge,
+                'operator': d.operator,
+                'bodies': d.bodies,
+                'points': d.points,
+                'active_seconds': d.active_seconds,
+                'seconds_per_body': d.active_seconds / d.bodies if d.bodies else None,
+                'seconds_per_point': d.active_seconds / d.points if d.points else None,
+                'utilisation': d.utilisation,
+            }
+            for d in days
+        ],
+        'slowest_points': [
+            {'point': t.point, 'count': t.count, 'mean_seconds': t.mean, 'std_seconds': t.std}
+            for t in timings[:stations]
+        ],
+    })
+
+
+def cache_stats(request):
+    """Return this process's report cache hit and miss counts as JSON."""
+    return JsonResponse({'namespaces': querycache.stats()})
+
+
+def heatmap_image(request, car_id, fmt):
+    """Serve a body's cached heat-map against its colour baseline, rendering it if there is none yet."""
+    if fmt not in heatmap.RENDERERS:
+        raise Http404('Unknown image format.')
+    car = get_object_or_404(CarData, pk=car_id)
+    image = heatmap.current(car, fmt)
+    if request.headers.get('If-None-Match') == f'"{image.digest}"':
+        response = HttpResponse(status=304)
+    else:
+        response = FileResponse(open(heatmap.path_for(image), 'rb'), content_type='image/svg+xml' if fmt == HeatMap.SVG else 'image/png')
+    response['ETag'] = f'"{image.digest}"'
+    return response
+
+
+def body_measurements(request, body_no):
+    """Return every stored measurement of a body number as JSON, archived ones included."""
+    measurements = tiering.measurements(body_no)
+    if not measurements:
+        raise Http404('No measurements of this body.')
+    return JsonResponse({'body_no': body_no, 'measurements': [
+        {
+            'id': m.id,
+            'tier': m.tier,
+            'date': m.date,
+            'colour_code': m.colour_code,
+            'primer': m.primer,
+            'sequence': m.sequence,
+            'measured_at': m.measured_at,
+            'readings': dict(zip(READING_FIELDS, m.values)),
+        }
+        for m in measurements
+    ]})
+
+
+@staff_member_required
+def profile_index(request):
+    """List the stored request profiles, newest first (see profiling.py)."""
+    return render(request, 'peltloader/profiles.html', {'profiles': profiling.index(), 'mode': profiling.mode()})
+
+
+@staff_member_required
+def profile_download(request, name):
+    """Download a stored profile's artifact."""
+    path = profiling.artifact_path(name)
+    if path is None:
+        raise Http404('No such profile.')
+    return FileResponse(open(path, 'rb'), as_attachment=True, filename=path.name)
+
+
 """
 import logging
 
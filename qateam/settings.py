@@ -41,6 +41,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'peltloader.profiling.ProfilingMiddleware',
+    'peltloader.lines.LineMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -78,7 +80,83 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
-    }
+        'OPTIONS': {
+            # Background workers (heat-map rendering) write too: take the write
+            # lock at BEGIN and wait for it rather than failing on upgrade.
+            'transaction_mode': 'IMMEDIATE',
+            'timeout': 20,
+            # WAL lets the reports connection read while ingest writes
+            'init_command': 'PRAGMA journal_mode=WAL;',
+        },
+    },
+    # Read-only connection to the same file for reporting queries, so long
+    # reports never hold the lock ingest needs (see peltloader/routers.py)
+    'reports': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'db.sqlite3',
+        'OPTIONS': {
+            'init_command': 'PRAGMA query_only=1;',
+            'timeout': 20,
+        },
+        'TEST': {
+            'MIRROR': 'default',
+        },
+    },
+    # Bodies moved out of CarData by the retention policy (see
+    # peltloader/tiering.py); create it with `migrate --database cold`
+    'cold': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'cold.sqlite3',
+        'OPTIONS': {
+            'timeout': 20,
+            'init_command': 'PRAGMA journal_mode=WAL;',
+        },
+    },
+}
+
+# Paint lines with databases of their own, see peltloader/lines.py: {line:
+# database alias}, e.g. {'paint1': 'default', 'paint2': 'line_paint2'}. Each
+# alias other than 'default' gets a database file, a read-only connection and
+# a cold store here; create them with `migrate --database line_paint2` and
+# `migrate --database line_paint2_cold`
+PELTLOADER_LINES = {}
+
+for _alias in set(PELTLOADER_LINES.values()) - {'default'}:
+    DATABASES.setdefault(_alias, {
+        **DATABASES['default'],
+        'NAME': BASE_DIR / f'{_alias}.sqlite3',
+    })
+    DATABASES.setdefault(f'{_alias}_reports', {
+        **DATABASES['reports'],
+        'NAME': DATABASES[_alias]['NAME'],
+        'TEST': {'MIRROR': _alias},
+    })
+    DATABASES.setdefault(f'{_alias}_cold', {
+        **DATABASES['cold'],
+        'NAME': BASE_DIR / f'{_alias}_cold.sqlite3',
+    })
+
+DATABASE_ROUTERS = ['peltloader.routers.ReportRouter']
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.1/topics/cache/
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    # Report query results, per process with least recently used eviction
+    'queries': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'peltloader-queries',
+        'OPTIONS': {'MAX_ENTRIES': 2000},
+    },
+    # Per-colour generation tokens, shared by every worker process
+    'generations': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': BASE_DIR / 'uploads' / 'cache',
+    },
 }
 
 
@@ -123,3 +201,52 @@ STATICFILES_DIRS = [ BASE_DIR / "static",]
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+# peltloader
+
+# Regenerate uploads/output.xlsx from the database in the background after
+# uploads (see peltloader/export.py)
+PELTLOADER_EXCEL_EXPORT = True
+PELTLOADER_EXCEL_PATH = 'uploads/output.xlsx'
+
+# EWMA/CUSUM drift detection, see peltloader/drift.py for the defaults
+PELTLOADER_DRIFT = {
+    'warmup': 100,
+    'lambda': 0.2,
+    'ewma_limit': 5.0,
+    'cusum_k': 0.75,
+    'cusum_h': 10.0,
+}
+
+# Rendered body heat-maps, stored by content hash
+PELTLOADER_HEATMAP_ROOT = BASE_DIR / 'uploads' / 'heatmaps'
+PELTLOADER_HEATMAP_BACKGROUND = True
+
+# Uploaded .prn files, compressed and stored by content hash
+PELTLOADER_ARCHIVE_ROOT = BASE_DIR / 'uploads' / 'archive'
+
+# Gaps between points longer than this are breaks, not measuring time
+PELTLOADER_BREAK_SECONDS = 600
+
+# Bodies measured longer ago than this many days are moved to the cold
+# database by the archive_bodies command
+PELTLOADER_HOT_DAYS = 180
+
+# Each colour's baseline profile is the median of its last this many bodies,
+# computed again after every this many more (see peltloader/baselines.py)
+PELTLOADER_BASELINE_BODIES = 200
+PELTLOADER_BASELINE_REFRESH = 20
+
+# On-demand request profiling, see peltloader/profiling.py: 'off', 'header'
+# (requests sending X-Profile: cprofile, sample and/or memory, and the secret
+# in X-Profile-Key) or 'always'
+PELTLOADER_PROFILING = 'off'
+PELTLOADER_PROFILE_SECRET = ''
+PELTLOADER_PROFILER = 'cprofile'
+PELTLOADER_PROFILE_MEMORY = False
+PELTLOADER_PROFILE_ROOT = BASE_DIR / 'uploads' / 'profiles'
+PELTLOADER_PROFILE_KEEP = 50
+
+# Report query cache, see peltloader/querycache.py
+PELTLOADER_QUERY_CACHE = 'queries'
+PELTLOADER_GENERATION_CACHE = 'generations'